@@ -0,0 +1,70 @@
+"""Benchmark the clamd log parsers on a generated clamd.log.
+
+    python benchmarks/bench_log_parser.py --size-mb 1024 --density 0.001
+
+Compares the original regex-per-line ``parse_infected_files_from_text``
+against ``parse_detections`` (line iterator with FOUND pre-filter) and
+``parse_detection_file`` (mmap + ``find``).
+"""
+from __future__ import annotations
+import argparse, os, re, sys, tempfile, time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from clamui.log_parser import parse_detection_file, parse_detections
+from generators import generate_clamd_log
+
+LEGACY_PATTERN = re.compile(r"^.*->\s+([^:]+):.*FOUND$")
+
+def legacy_parse_infected_files_from_text(text: str) -> List[str]:
+    """The parser as it shipped in 0.4.0, kept as the baseline."""
+    infected: List[str] = []
+    for line in text.splitlines():
+        m = LEGACY_PATTERN.match(line.strip())
+        if m:
+            infected.append(m.group(1))
+    return infected
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    res = fn(*args)
+    return time.perf_counter() - t, res
+
+def run(path: str) -> dict:
+    size = os.path.getsize(path)
+    t_legacy, legacy = timed(lambda p: legacy_parse_infected_files_from_text(
+        open(p, errors="ignore").read()), path)
+    t_lines, recs = timed(lambda p: parse_detections(open(p, errors="ignore")), path)
+    t_mmap, recs_mm = timed(parse_detection_file, path)
+    assert len(recs) == len(recs_mm)
+    mb = size / (1 << 20)
+    return {
+        "size_mb": round(mb, 1),
+        "found": len(recs_mm),
+        "legacy_found": len(legacy),        # paths are cut at the first ":"
+        "legacy_s": round(t_legacy, 3),
+        "lines_s": round(t_lines, 3),
+        "mmap_s": round(t_mmap, 3),
+        "legacy_mb_s": round(mb / t_legacy, 1),
+        "mmap_mb_s": round(mb / t_mmap, 1),
+        "speedup_lines": round(t_legacy / t_lines, 2),
+        "speedup_mmap": round(t_legacy / t_mmap, 2),
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--size-mb", type=int, default=1024)
+    ap.add_argument("--density", type=float, default=0.001, help="fraction of FOUND lines")
+    ap.add_argument("--log", help="use an existing clamd.log instead of generating one")
+    args = ap.parse_args(argv)
+
+    if args.log:
+        print(run(args.log))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clamd.log")
+        generate_clamd_log(path, args.size_mb, args.density)
+        print(run(path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""A small in-process stand-in for clamd, speaking enough of its protocol.
+
+Supports PING, VERSION, SCAN, CONTSCAN, MULTISCAN and INSTREAM, with or
+without IDSESSION. A file is reported infected when it contains the EICAR
+test string.
+"""
+from __future__ import annotations
+import os, socket, struct, tempfile, threading
+from typing import Optional
+
+from generators import EICAR
+
+VERSION = "ClamAV 1.4.3/27790/Sat Oct 18 08:00:00 2025"
+
+def _verdict(name: str, data: bytes) -> str:
+    return f"{name}: Eicar-Signature FOUND" if EICAR in data else f"{name}: OK"
+
+def _read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+class FakeClamd:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.mkdtemp(prefix="fake-clamd-"), "clamd.ctl")
+        self._srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._srv.bind(self.path)
+        self._srv.listen(128)
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.connections = 0
+
+    def __enter__(self) -> "FakeClamd":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._srv.close()
+        try: os.unlink(self.path)
+        except OSError: pass
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._srv.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        buf = b""
+        def recv_exact(n: int) -> bytes:
+            nonlocal buf
+            while len(buf) < n:
+                data = conn.recv(65536)
+                if not data:
+                    raise EOFError
+                buf += data
+            out, buf = buf[:n], buf[n:]
+            return out
+        def command() -> Optional[str]:
+            nonlocal buf
+            while b"\0" not in buf:
+                data = conn.recv(65536)
+                if not data:
+                    return None
+                buf += data
+            cmd, _, buf = buf.partition(b"\0")
+            return cmd[1:].decode("utf-8", "surrogateescape")
+        session, n = False, 0
+        try:
+            while True:
+                cmd = command()
+                if cmd is None or cmd == "END":
+                    return
+                if cmd == "IDSESSION":
+                    session = True
+                    continue
+                if cmd == "PING":
+                    replies = ["PONG"]
+                elif cmd == "VERSION":
+                    replies = [VERSION]
+                elif cmd.startswith("SCAN "):
+                    data = _read_file(cmd[5:])
+                    replies = [_verdict(cmd[5:], data) if data is not None
+                               else f"{cmd[5:]}: lstat() failed. ERROR"]
+                elif cmd.startswith(("CONTSCAN ", "MULTISCAN ")):
+                    root = cmd.split(" ", 1)[1]
+                    replies = [_verdict(os.path.join(d, f), _read_file(os.path.join(d, f)) or b"")
+                               for d, _s, files in os.walk(root) for f in files]
+                    replies = [r for r in replies if not r.endswith(": OK")] or [f"{root}: OK"]
+                elif cmd == "INSTREAM":
+                    data = b""
+                    while True:
+                        (size,) = struct.unpack("!L", recv_exact(4))
+                        if size == 0:
+                            break
+                        data += recv_exact(size)
+                    replies = [_verdict("stream", data)]
+                else:
+                    replies = ["UNKNOWN COMMAND"]
+                n += 1
+                for r in replies:
+                    conn.sendall(((f"{n}: " if session else "") + r).encode("utf-8", "surrogateescape") + b"\0")
+                if not session:
+                    return
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
@@ -0,0 +1,65 @@
+"""Synthetic inputs for the benchmarks: clamd.log, freshclam.log and file trees."""
+from __future__ import annotations
+import os, random, time
+
+# The standard antivirus test string; harmless, detected by every engine.
+EICAR = rb"X5O!P%@AP[4\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*"
+
+CLEAN_LINES = (
+    "SelfCheck: Database status OK.",
+    "/home/user/.cache/thumbnails/normal/{n:08x}.png: OK",
+    "Client disconnected (FD 12)",
+    "No stats for Database check - forcing reload",
+)
+
+def _stamp(t: float) -> str:
+    return time.strftime("%a %b %e %H:%M:%S %Y", time.localtime(t))
+
+def generate_clamd_log(path: str, size_mb: float, density: float, seed: int = 1) -> int:
+    """Write roughly ``size_mb`` of clamd.log with ``density`` FOUND lines; returns hits."""
+    rnd = random.Random(seed)
+    target = int(size_mb * (1 << 20))
+    written = hits = 0
+    t0 = 1_700_000_000
+    with open(path, "w") as fh:
+        while written < target:
+            stamp = _stamp(t0 + (written >> 12))     # one stamp per chunk keeps generation fast
+            chunk = []
+            for i in range(10000):
+                if rnd.random() < density:
+                    hits += 1
+                    body = (f"/home/user/Downloads/dir:{i}/file_{rnd.randrange(10**6)}.exe: "
+                            f"Win.Test.EICAR_HDB-1 FOUND")
+                else:
+                    body = rnd.choice(CLEAN_LINES).format(n=rnd.randrange(1 << 32))
+                chunk.append(f"{stamp} -> {body}\n")
+            data = "".join(chunk)
+            fh.write(data)
+            written += len(data)
+    return hits
+
+FRESHCLAM_BLOCK = """{stamp} -> --------------------------------------
+{stamp} -> ClamAV update process started at {stamp}
+{stamp} -> daily.cld database is up-to-date (version: {daily}, sigs: 2,075,432, f-level: 90, builder: raynman)
+{stamp} -> main.cvd database is up-to-date (version: 62, sigs: 6,647,427, f-level: 90, builder: sigmgr)
+{stamp} -> bytecode.cvd database is up-to-date (version: 335, sigs: 86, f-level: 90, builder: raynman)
+"""
+
+def generate_freshclam_log(path: str, updates: int, start: float = 1_700_000_000,
+                           interval: float = 3600.0) -> None:
+    """Write ``updates`` hourly update blocks, like months of freshclam history."""
+    with open(path, "w") as fh:
+        for i in range(updates):
+            fh.write(FRESHCLAM_BLOCK.format(stamp=_stamp(start + i * interval), daily=27000 + i // 24))
+
+def generate_tree(root: str, files: int, infected: int, fanout: int = 32,
+                  size: int = 4096, seed: int = 1) -> None:
+    """Create ``files`` files under ``root``, ``infected`` of them containing EICAR."""
+    rnd = random.Random(seed)
+    bad = set(rnd.sample(range(files), min(infected, files)))
+    payload = bytes(rnd.randrange(256) for _ in range(size))
+    for i in range(files):
+        d = os.path.join(root, f"d{i % fanout:02d}", f"s{(i // fanout) % fanout:02d}")
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"f{i:07d}.bin"), "wb") as fh:
+            fh.write(EICAR if i in bad else payload)
@@ -0,0 +1,195 @@
+"""Run the clamui benchmark suite headless and write a JSON report.
+
+    python benchmarks/run.py                       # default sizes
+    python benchmarks/run.py --quick               # small inputs, for CI
+    python benchmarks/run.py --only scan,freshclam --output out.json
+
+Each benchmark generates its own inputs in a temporary directory; scans
+run against ``fake_clamd.FakeClamd``, so neither clamd nor a display is
+needed. Reports land in ``benchmarks/results/`` by default and can be
+compared between runs.
+"""
+from __future__ import annotations
+import argparse, json, os, platform, re, subprocess, sys, tempfile, time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+sys.path.insert(0, HERE)
+
+import bench_log_parser
+from generators import generate_clamd_log, generate_freshclam_log, generate_tree
+from fake_clamd import FakeClamd
+
+def timed(fn: Callable, *args):
+    t = time.perf_counter()
+    res = fn(*args)
+    return round(time.perf_counter() - t, 4), res
+
+def legacy_parse_freshclam_log(log_text: List[str]) -> List[str]:
+    """The freshclam parser as it shipped in 0.4.0 (full reversed copy, re.search per line)."""
+    update_time_pattern = r'^(\w+ \w+ \s*\d+ \d{2}:\d{2}:\d{2} \d{4}) -> ClamAV update process started'
+    component_pattern = (r'-> (\w+\.\w+) database is (up-to-date|outdated) \(version: (\d+), '
+                         r'sigs: ([\d,]+), f-level: (\d+), builder: (\w+)\)')
+    reversed_lines = list(reversed(log_text))
+    component_log = reversed_lines[0:3]
+    out = []
+    for line in reversed_lines[3:]:
+        m = re.search(update_time_pattern, line)
+        if m:
+            out.append(m.group(1))
+            break
+        component_log.append(line)
+    return out + re.findall(component_pattern, "\n".join(component_log))
+
+# benchmarks
+
+def bench_clamd_log(tmp: str, size: Dict) -> Dict:
+    path = os.path.join(tmp, "clamd.log")
+    generate_clamd_log(path, size["clamd_log_mb"], size["density"])
+    return bench_log_parser.run(path)
+
+def bench_freshclam(tmp: str, size: Dict) -> Dict:
+    from clamui.log_parser import parse_freshclam_file, _freshclam_cache
+    path = os.path.join(tmp, "freshclam.log")
+    generate_freshclam_log(path, size["freshclam_updates"])
+    t_legacy, _ = timed(lambda: legacy_parse_freshclam_log(open(path, errors="ignore").readlines()))
+    _freshclam_cache.clear()
+    t_reverse, summary = timed(parse_freshclam_file, path)
+    t_cached, _ = timed(parse_freshclam_file, path)
+    return {"updates": size["freshclam_updates"], "size_mb": round(os.path.getsize(path) / (1 << 20), 2),
+            "components": len(summary.components), "legacy_s": t_legacy,
+            "reverse_s": t_reverse, "cached_s": t_cached}
+
+def bench_refresh(tmp: str, size: Dict) -> Dict:
+    """``Dashboard.refresh`` minus rendering: one cold and one incremental collection."""
+    from clamui.collector import StatusCollector
+    from clamui.detections import DetectionStore
+    clamd_log = os.path.join(tmp, "refresh-clamd.log")
+    freshclam_log = os.path.join(tmp, "refresh-freshclam.log")
+    generate_clamd_log(clamd_log, size["refresh_log_mb"], size["density"])
+    generate_freshclam_log(freshclam_log, size["freshclam_updates"])
+    collector = StatusCollector(clamd_log, freshclam_log, DetectionStore(":memory:"))
+    collector.daemon_active = lambda: True
+    t_cold, snap = timed(collector.collect)
+    with open(clamd_log, "a") as fh:
+        fh.write("Sat Oct 18 10:00:00 2025 -> /tmp/new.exe: Win.Test.EICAR_HDB-1 FOUND\n" * 100)
+    t_incr, snap2 = timed(collector.collect)
+    t_idle, _ = timed(collector.collect)
+    return {"log_mb": size["refresh_log_mb"], "cold_s": t_cold, "incremental_s": t_incr,
+            "idle_s": t_idle, "detections": snap2.infected, "error": snap2.error}
+
+def bench_list(tmp: str, size: Dict) -> Dict:
+    """List updates; needs PyGObject with GTK 4 (skipped otherwise)."""
+    try:
+        from clamui.widgets import compute_splices
+    except (ImportError, ValueError) as e:
+        return {"skipped": str(e)}
+    n = size["list_rows"]
+    old = [f"line {i}" for i in range(n)]
+    ring = old[50:] + [f"line {i}" for i in range(n, n + 50)]
+    grown = old + [f"line {i}" for i in range(n, n + 50)]
+    t_ring, ops_ring = timed(compute_splices, old, ring)
+    t_grow, ops_grow = timed(compute_splices, old, grown)
+    out = {"rows": n, "ring_diff_s": t_ring, "ring_ops": len(ops_ring),
+           "append_diff_s": t_grow, "append_ops": len(ops_grow)}
+    try:
+        from gi.repository import Gtk
+        if not Gtk.init_check():
+            return out
+        from clamui.widgets import VirtualList
+    except Exception:
+        return out
+
+    class LegacyList(Gtk.ScrolledWindow):
+        """The dashboard list as it shipped in 0.4.0 (rebuilds every row per update)."""
+        def __init__(self):
+            super().__init__()
+            self.listbox = Gtk.ListBox()
+            self.set_child(self.listbox)
+
+        def set_items(self, items):
+            child = self.listbox.get_first_child()
+            while child is not None:
+                nxt = child.get_next_sibling()
+                self.listbox.remove(child)
+                child = nxt
+            for s in items:
+                self.listbox.append(Gtk.Label(label=s, xalign=0))
+
+    for name, cls in (("simple_list", LegacyList), ("virtual_list", VirtualList)):
+        w = cls()
+        out[f"{name}_initial_s"], _ = timed(w.set_items, old)
+        out[f"{name}_ring_s"], _ = timed(w.set_items, ring)
+    return out
+
+def bench_scan(tmp: str, size: Dict) -> Dict:
+    from clamui.scan_engine import ParallelScanner
+    from clamui.verdict_cache import VerdictCache
+    root = os.path.join(tmp, "tree")
+    generate_tree(root, size["tree_files"], size["tree_infected"])
+    out: Dict = {"files": size["tree_files"]}
+    with FakeClamd() as clamd:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            t, st = timed(ParallelScanner(clamd.path, workers=workers).run, root)
+            out[f"workers_{workers}_s"] = t
+            out[f"workers_{workers}_files_s"] = round(st.files / t, 1)
+            out["infected"] = st.infected
+        cache = VerdictCache(os.path.join(tmp, "verdicts.sqlite"))
+        out["cache_cold_s"], _ = timed(ParallelScanner(clamd.path, cache=cache).run, root)
+        out["cache_warm_s"], st = timed(ParallelScanner(clamd.path, cache=cache).run, root)
+        out["cache_warm_skipped"] = st.skipped
+    return out
+
+BENCHMARKS = {
+    "clamd_log": bench_clamd_log,
+    "freshclam": bench_freshclam,
+    "refresh": bench_refresh,
+    "list": bench_list,
+    "scan": bench_scan,
+}
+
+SIZES = {
+    "default": {"clamd_log_mb": 256, "density": 0.001, "freshclam_updates": 24 * 180,
+                "refresh_log_mb": 64, "list_rows": 100000, "tree_files": 20000, "tree_infected": 20},
+    "quick": {"clamd_log_mb": 8, "density": 0.001, "freshclam_updates": 24 * 7,
+              "refresh_log_mb": 4, "list_rows": 10000, "tree_files": 1000, "tree_infected": 5},
+}
+
+def git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="clamui benchmark suite")
+    ap.add_argument("--quick", action="store_true", help="small inputs")
+    ap.add_argument("--only", help="comma separated subset of: " + ",".join(BENCHMARKS))
+    ap.add_argument("--output", help="JSON report path (default: benchmarks/results/<time>.json)")
+    args = ap.parse_args(argv)
+
+    size = SIZES["quick" if args.quick else "default"]
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    report = {"meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "git": git_rev(),
+                       "python": platform.python_version(), "platform": platform.platform(),
+                       "cpus": os.cpu_count(), "sizes": size},
+              "results": {}}
+    with tempfile.TemporaryDirectory(prefix="clamui-bench-") as tmp:
+        for name in names:
+            print(f"running {name}...", file=sys.stderr)
+            try:
+                report["results"][name] = BENCHMARKS[name](tmp, size)
+            except Exception as e:
+                report["results"][name] = {"error": f"{type(e).__name__}: {e}"}
+            print(json.dumps(report["results"][name]), file=sys.stderr)
+
+    output = args.output or os.path.join(HERE, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(output)
+
+if __name__ == "__main__":
+    main()
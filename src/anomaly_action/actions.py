@@ -0,0 +1,62 @@
+"""Remediation actions on detected files, independent of the UI."""
+from __future__ import annotations
+import os
+from typing import Dict, Optional
+
+from clamui.journal import ActionJournal, DEFAULT_JOURNAL, writable_journal
+from clamui.quarantine import DEFAULT_QUARANTINE as QUARANTINE_DIR, QuarantineStore
+from clamui.utils import load_conf
+
+_journal: Optional[ActionJournal] = None
+
+def action_journal() -> ActionJournal:
+    """The process-wide journal, configured from ``[journal]``."""
+    global _journal
+    if _journal is None:
+        conf = load_conf()
+        _journal = ActionJournal(
+            writable_journal(conf.get("journal", "path", fallback=DEFAULT_JOURNAL)),
+            max_bytes=conf.getint("journal", "max-size-mb", fallback=8) << 20,
+            max_age=conf.getfloat("journal", "max-age-days", fallback=7) * 86400,
+            backups=conf.getint("journal", "backups", fallback=5),
+            fsync=conf.getboolean("journal", "fsync", fallback=True))
+    return _journal
+
+def log_action(filename: str, virusname: str, action: str, **detail):
+    """Append the action to the journal; written in batches, see ``ActionJournal``."""
+    try:
+        action_journal().record(filename, virusname, action, **detail)
+    except Exception as e:
+        print(f"Failed to write log: {e}")
+
+def clean_file(filename: str, virusname: str) -> str:
+    """Delete the infected file; raises OSError on failure."""
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"File not found: {filename}")
+    os.remove(filename)
+    log_action(filename, virusname, "deleted")
+    return "deleted"
+
+_stores: Dict[str, QuarantineStore] = {}
+
+def quarantine_store(quarantine_dir: str = QUARANTINE_DIR, compress: bool = False) -> QuarantineStore:
+    """One store per directory and process; opening it creates the catalog."""
+    store = _stores.get(quarantine_dir)
+    if store is None:
+        store = _stores[quarantine_dir] = QuarantineStore(quarantine_dir, compress=compress)
+    return store
+
+def quarantine_file(filename: str, virusname: str, quarantine_dir: str = QUARANTINE_DIR,
+                    compress: bool = False) -> str:
+    """Move the file into the quarantine store; raises OSError on failure."""
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"File not found: {filename}")
+    entry = quarantine_store(quarantine_dir, compress).add(filename, virusname)
+    log_action(filename, virusname, "quarantined", id=entry.id, sha256=entry.sha256)
+    return f"quarantined as #{entry.id}"
+
+def ignore_file(filename: str, virusname: str) -> str:
+    log_action(filename, virusname, "ignored")
+    return "ignored"
+
+ACTIONS = {"clean": clean_file, "quarantine": quarantine_file, "ignore": ignore_file}
@@ -0,0 +1,161 @@
+"""Aggregated review window for queued detections."""
+from __future__ import annotations
+import threading
+from typing import Callable, Dict, List, Sequence
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, Gio, GLib
+
+from clamui.detections import Detection
+from clamui.widgets import compute_splices
+
+PAGE_SIZE = 100
+
+class ReviewWindow(Gtk.Window):
+    """One non-modal window listing every pending detection.
+
+    Detections are appended in batches; only the current page is materialized
+    in the list model, so the window stays responsive with thousands queued.
+    Bulk actions apply to the selected rows, or to every pending detection
+    with the "all" toggle, and run on a worker thread. Closing the window
+    records whatever is still undecided as ignored.
+    """
+
+    def __init__(self, actions: Dict[str, Callable[[str, str], str]], page_size: int = PAGE_SIZE):
+        super().__init__(title="Virus Detected")
+        self.set_default_size(720, 480)
+        self.actions = actions
+        self.page_size = page_size
+        self.page = 0
+        self.items: List[Detection] = []
+        self._labels: List[str] = []
+        self._running: List[Detection] = []
+        self.busy = False
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10, margin_top=20,
+                       margin_bottom=20, margin_start=20, margin_end=20)
+        title_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        warning_icon = Gtk.Image.new_from_icon_name("dialog-warning-symbolic")
+        warning_icon.set_pixel_size(32)
+        self.lbl_title = Gtk.Label(xalign=0)
+        title_box.append(warning_icon); title_box.append(self.lbl_title)
+
+        self.model = Gio.ListStore(item_type=Gtk.StringObject)
+        self.selection = Gtk.MultiSelection(model=self.model)
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", lambda _f, li: li.set_child(Gtk.Label(xalign=0)))
+        factory.connect("bind", lambda _f, li: li.get_child().set_label(li.get_item().get_string()))
+        view = Gtk.ListView(model=self.selection, factory=factory)
+        scroller = Gtk.ScrolledWindow(vexpand=True)
+        scroller.set_child(view)
+
+        pager = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.btn_prev = Gtk.Button(icon_name="go-previous-symbolic")
+        self.btn_prev.connect("clicked", lambda _b: self._turn(-1))
+        self.btn_next = Gtk.Button(icon_name="go-next-symbolic")
+        self.btn_next.connect("clicked", lambda _b: self._turn(1))
+        self.lbl_page = Gtk.Label(hexpand=True, xalign=0)
+        self.chk_all = Gtk.CheckButton(label="Apply to all pending")
+        for w in (self.btn_prev, self.lbl_page, self.btn_next, self.chk_all):
+            pager.append(w)
+
+        button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10, halign=Gtk.Align.CENTER)
+        self.buttons = []
+        for label, action, css in (("Clean (Delete)", "clean", "destructive-action"),
+                                   ("Quarantine", "quarantine", None), ("Ignore", "ignore", None)):
+            btn = Gtk.Button.new_with_label(label)
+            btn.connect("clicked", lambda _b, a=action: self._apply(a))
+            if css:
+                btn.add_css_class(css)
+            button_box.append(btn); self.buttons.append(btn)
+        self.lbl_status = Gtk.Label(xalign=0, wrap=True, selectable=True)
+
+        for w in (title_box, scroller, pager, button_box, self.lbl_status):
+            vbox.append(w)
+        self.set_child(vbox)
+        self._render()
+
+    def add_detections(self, found: Sequence[Detection]):
+        self.items.extend(found)
+        self._render()
+
+    def _turn(self, delta: int):
+        self.page = max(0, self.page + delta)
+        self._render()
+
+    def _render(self):
+        last_page = max(0, (len(self.items) - 1) // self.page_size)
+        self.page = min(self.page, last_page)
+        start = self.page * self.page_size
+        rows = self.items[start:start + self.page_size]
+        # Minimal splices: appending to a partly filled page keeps the selection.
+        labels = [d.label() for d in rows]
+        for pos, n_removed, added in compute_splices(self._labels, labels):
+            self.model.splice(pos, n_removed, [Gtk.StringObject.new(s) for s in added])
+        self._labels = labels
+        n = len(self.items)
+        self.lbl_title.set_markup(f"<b>{n} detection{'s' if n != 1 else ''} pending review</b>")
+        self.lbl_page.set_text(f"{start + 1 if rows else 0}-{start + len(rows)} of {n}")
+        self.btn_prev.set_sensitive(self.page > 0)
+        self.btn_next.set_sensitive(self.page < last_page)
+        for btn in self.buttons:
+            btn.set_sensitive(bool(self.items) and not self.busy)
+
+    def _targets(self) -> List[Detection]:
+        if self.chk_all.get_active():
+            return list(self.items)
+        start = self.page * self.page_size
+        bits = self.selection.get_selection()
+        return [self.items[start + bits.get_nth(i)] for i in range(bits.get_size())]
+
+    def _apply(self, action: str):
+        targets = self._targets()
+        if not targets:
+            self.lbl_status.set_text("Select detections first, or tick \"Apply to all pending\".")
+            return
+        self.busy = True
+        self._running = targets
+        self._render()
+        self.lbl_status.set_text(f"Running {action} on {len(targets)} file(s)...")
+        threading.Thread(target=self._run, args=(action, targets), daemon=True).start()
+
+    def _run(self, action: str, targets: List[Detection]):
+        fn = self.actions[action]
+        done: List[Detection] = []
+        errors: List[str] = []
+        for d in targets:
+            try:
+                fn(d.path, d.signature)
+                done.append(d)
+            except OSError as e:
+                errors.append(f"{d.path}: {e.strerror or e}")
+        GLib.idle_add(self._done, action, done, errors)
+
+    def _done(self, action: str, done: List[Detection], errors: List[str]) -> bool:
+        # Failed rows stay queued so they can be retried or handled otherwise.
+        handled = {id(d) for d in done}
+        self.items = [d for d in self.items if id(d) not in handled]
+        self._running = []
+        self.busy = False
+        self.chk_all.set_active(False)
+        self._render()
+        msg = f"{action}: {len(done)} done, {len(errors)} failed"
+        self.lbl_status.set_text("\n".join([msg] + errors[:10]))
+        if not self.items and not errors:
+            self.close()
+        return False
+
+    def dismiss_pending(self) -> int:
+        """Record every undecided detection as ignored, so none is dropped unlogged.
+
+        Rows handed to a running action are left to it. Returns how many
+        were recorded.
+        """
+        running = {id(d) for d in self._running}
+        left = [d for d in self.items if id(d) not in running]
+        ignore = self.actions["ignore"]
+        for d in left:
+            ignore(d.path, d.signature)
+        self.items = [d for d in self.items if id(d) in running]
+        return len(left)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import os, socket, struct
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+DEFAULT_SOCKET = "/run/clamav/clamd.ctl"
+CHUNK_SIZE = 64 * 1024
+
+class ClamdError(Exception):
+    """Raised when clamd cannot be reached or returns a malformed reply."""
+
+@dataclass(frozen=True)
+class ScanResult:
+    path: str
+    status: str                 # "OK", "FOUND" or "ERROR"
+    detail: str = ""            # signature name for FOUND, message for ERROR
+
+    @property
+    def infected(self) -> bool:
+        return self.status == "FOUND"
+
+def parse_reply(line: str) -> ScanResult:
+    """Parse one clamd reply line such as ``/p: Eicar-Test-Signature FOUND``."""
+    if line.endswith(" FOUND"):
+        path, _, sig = line[:-6].rpartition(": ")
+        return ScanResult(path, "FOUND", sig)
+    if line.endswith(" ERROR"):
+        # Paths may contain ": " too, so split at the last one, except inside
+        # clamd's own "lstat() failed: <strerror>." style messages.
+        path, _, msg = line[:-6].rpartition(": ")
+        while path.endswith(" failed") and ": " in path:
+            path, _, call = path.rpartition(": ")
+            msg = f"{call}: {msg}"
+        return ScanResult(path, "ERROR", msg)
+    if line.endswith(": OK"):
+        return ScanResult(line[:-4], "OK")
+    raise ClamdError(f"Unexpected clamd reply: {line!r}")
+
+def parse_address(address: str) -> Tuple[int, Union[str, Tuple[str, int]]]:
+    """``/path/to/clamd.ctl`` selects a UNIX socket, ``host:port`` selects TCP."""
+    if not address.startswith("/") and ":" in address:
+        host, _, port = address.rpartition(":")
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+class ClamdClient:
+    """Minimal clamd protocol client.
+
+    Single-reply commands (SCAN, INSTREAM, VERSION, PING) are sent inside an
+    ``IDSESSION`` so the connection is reused between calls. CONTSCAN and
+    MULTISCAN are not allowed in a session and use their own connection.
+    Instances are not thread safe; use one client per thread.
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        self.address = address
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._buf = b""
+        self._next_id = 1
+
+    # connection handling
+
+    def _connect(self) -> socket.socket:
+        family, addr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+        except OSError as e:
+            sock.close()
+            raise ClamdError(f"Cannot connect to clamd at {self.address}: {e}") from e
+        return sock
+
+    def _session(self) -> socket.socket:
+        if self._sock is None:
+            self._sock = self._connect()
+            self._sock.sendall(b"zIDSESSION\0")
+            self._buf = b""; self._next_id = 1
+        return self._sock
+
+    def close(self):
+        if self._sock is not None:
+            try: self._sock.sendall(b"zEND\0")
+            except OSError: pass
+            self._sock.close()
+        self._sock = None
+
+    def __enter__(self) -> "ClamdClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _read_reply(sock: socket.socket, buf: bytes) -> Tuple[Optional[str], bytes]:
+        while b"\0" not in buf:
+            data = sock.recv(CHUNK_SIZE)
+            if not data:
+                return None, buf
+            buf += data
+        reply, _, rest = buf.partition(b"\0")
+        # surrogateescape: reply paths round-trip to the bytes of non-UTF-8 names.
+        return reply.decode("utf-8", "surrogateescape"), rest
+
+    def _session_call(self, command: bytes, payload: Optional[BinaryIO] = None) -> str:
+        """Send one command in the session and return its reply (without id)."""
+        for attempt in (0, 1):
+            try:
+                sock = self._session()
+                sock.sendall(b"z" + command + b"\0")
+                if payload is not None:
+                    self._send_stream(sock, payload)
+                reply, self._buf = self._read_reply(sock, self._buf)
+                if reply is None:
+                    raise ClamdError("clamd closed the session")
+                break
+            except (OSError, ClamdError) as e:
+                # Stale session (clamd restarted, idle timeout): reconnect once,
+                # unless a stream was already partially consumed.
+                self.close()
+                if attempt or payload is not None:
+                    if isinstance(e, ClamdError):
+                        raise
+                    raise ClamdError(f"clamd connection failed: {e}") from e
+        req_id, _, body = reply.partition(": ")
+        if req_id != str(self._next_id):
+            self.close()
+            raise ClamdError(f"Out of order clamd reply: {reply!r}")
+        self._next_id += 1
+        return body
+
+    @staticmethod
+    def _send_stream(sock: socket.socket, fh: BinaryIO):
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+        sock.sendall(struct.pack("!L", 0))
+
+    # commands
+
+    def ping(self) -> bool:
+        try:
+            sock = self._connect()
+            try:
+                sock.sendall(b"zPING\0")
+                reply, _ = self._read_reply(sock, b"")
+            finally:
+                sock.close()
+        except (OSError, ClamdError):
+            return False
+        return reply == "PONG"
+
+    def version(self) -> str:
+        return self._session_call(b"VERSION")
+
+    def scan_file(self, path: str) -> ScanResult:
+        return parse_reply(self._session_call(b"SCAN " + os.fsencode(path)))
+
+    def instream(self, fh: BinaryIO) -> ScanResult:
+        return parse_reply(self._session_call(b"INSTREAM", fh))
+
+    def _multi(self, command: bytes, path: str) -> List[ScanResult]:
+        sock = self._connect()
+        results: List[ScanResult] = []
+        try:
+            sock.sendall(b"z" + command + b" " + os.fsencode(path) + b"\0")
+            buf = b""
+            while True:
+                reply, buf = self._read_reply(sock, buf)
+                if reply is None:
+                    break
+                results.append(parse_reply(reply))
+        except OSError as e:
+            raise ClamdError(f"clamd connection failed: {e}") from e
+        finally:
+            sock.close()
+        return results
+
+    def contscan(self, path: str) -> List[ScanResult]:
+        return self._multi(b"CONTSCAN", path)
+
+    def multiscan(self, path: str) -> List[ScanResult]:
+        return self._multi(b"MULTISCAN", path)
@@ -0,0 +1,297 @@
+"""Command line entry point.
+
+``clamui`` starts the GTK dashboard; ``clamui status [--json]`` prints the
+health information the dashboard or ``clamui metrics`` last collected,
+without importing GTK, parsing logs or writing to the history, for
+monitoring systems that poll every few seconds, and ``clamui metrics`` exports it continuously in
+OpenMetrics format. ``clamui quarantine`` lists, restores and purges
+quarantined files, and ``clamui schedule`` runs recurring, resumable scans
+of the watch-dirs. ``--trace FILE`` before any of them writes timing
+spans as Chrome trace JSON. Modules are imported lazily so each
+subcommand only pays for what it uses.
+"""
+from __future__ import annotations
+import sys
+from typing import List, Optional
+
+# Exit codes for ``clamui status``
+EXIT_OK, EXIT_INFECTED, EXIT_DAEMON_DOWN = 0, 1, 2
+
+def _current_log_detections(history, clamd_log: str) -> int:
+    """Detections in the live clamd.log as of the last collection pass.
+
+    The count is saved with the log position by the dashboard and ``clamui
+    metrics``; it only applies while that file is still the live log.
+    """
+    import os
+    saved, infected = history.get_meta("clamd_log_state"), history.get_meta("clamd_log_infected")
+    if not saved or not infected:
+        return 0
+    dev, ino, _offset = (int(x) for x in saved.split(":"))
+    try:
+        st = os.stat(clamd_log)
+    except OSError:
+        return 0
+    return int(infected) if (st.st_dev, st.st_ino) == (dev, ino) else 0
+
+def collect_status(recent: int = 10) -> dict:
+    """Health from the saved collector state; reads the history but never writes it."""
+    import os, sqlite3, time
+    from .clamd import ClamdClient, DEFAULT_SOCKET
+    from .dbinfo import DEFAULT_DB_DIR, probe_metadata
+    from .detections import DEFAULT_HISTORY, DetectionStore
+    from .log_parser import parse_freshclam_file
+    from .utils import load_conf
+
+    conf = load_conf()
+    clamd_log = conf.get("logs", "clamd-log", fallback="/var/log/clamav/clamd.log")
+    freshclam_log = conf.get("logs", "freshclam-log", fallback="/var/log/clamav/freshclam.log")
+    socket_path = conf.get("clamd", "socket", fallback=DEFAULT_SOCKET)
+    errors: List[str] = []
+    try:
+        history = DetectionStore(os.path.expanduser(conf.get("history", "db", fallback=str(DEFAULT_HISTORY))),
+                                 readonly=True)
+        current_log = _current_log_detections(history, clamd_log)
+    except (sqlite3.Error, ValueError) as e:
+        errors.append(f"history: {e}")
+        history = DetectionStore(":memory:")
+        current_log = 0
+
+    # PING over the socket: no fork, and it proves clamd actually answers.
+    active = ClamdClient(socket_path, timeout=2.0).ping()
+
+    now = time.time()
+    meta = probe_metadata(conf.get("paths", "database-dir", fallback=DEFAULT_DB_DIR), socket_path)
+    try:
+        fc = parse_freshclam_file(freshclam_log)
+    except OSError as e:
+        fc = None
+        errors.append(f"freshclam log: {e}")
+
+    return {
+        "time": int(now),
+        "daemon": {"active": active, "engine": meta.engine},
+        "health": "unknown" if not active else ("infected" if current_log else "healthy"),
+        "detections": {
+            "current_log": current_log,
+            "total": history.count(),
+            "by_signature": dict(history.counts_by_signature(limit=10)),
+            "recent": [{"ts": d.ts, "path": d.path, "signature": d.signature, "source": d.source}
+                       for d in history.query(limit=recent)],
+        },
+        "database": {
+            "signatures": meta.sigs,
+            "age_seconds": int(now - meta.newest_build) if meta.newest_build else None,
+            "components": {name: {"version": c.version, "sigs": c.sigs, "f_level": c.f_level,
+                                  "builder": c.builder, "build_time": c.build_time}
+                           for name, c in meta.components.items()},
+        },
+        "last_update": {
+            "time": fc.last_update if fc else "",
+            "components": {name: {"status": c.status, "version": c.version}
+                           for name, c in fc.components.items()} if fc else {},
+        },
+        "errors": errors,
+    }
+
+def status_main(argv: List[str]) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(prog="clamui status", description="Print ClamAV health without the GUI.",
+                                 epilog="Exit status: 0 healthy, 1 infected, 2 daemon down.")
+    ap.add_argument("--json", action="store_true", help="print a single JSON document")
+    ap.add_argument("--recent", type=int, default=10, help="number of recent detections to include")
+    args = ap.parse_args(argv)
+
+    status = collect_status(args.recent)
+    if args.json:
+        import json
+        print(json.dumps(status, separators=(",", ":")))
+    else:
+        db = status["database"]
+        age = f"{db['age_seconds'] // 3600} h" if db["age_seconds"] is not None else "unknown"
+        print(f"daemon:     {'running' if status['daemon']['active'] else 'offline'} ({status['daemon']['engine']})")
+        print(f"health:     {status['health']}")
+        print(f"detections: {status['detections']['current_log']} in current log, {status['detections']['total']} total")
+        print(f"database:   {db['signatures']} signatures, {age} old")
+        print(f"updated:    {status['last_update']['time'] or 'unknown'}")
+        for err in status["errors"]:
+            print(f"error:      {err}", file=sys.stderr)
+    if not status["daemon"]["active"]:
+        return EXIT_DAEMON_DOWN
+    return EXIT_INFECTED if status["health"] == "infected" else EXIT_OK
+
+def metrics_main(argv: List[str]) -> int:
+    import argparse, os, time
+    from .clamd import ClamdClient, DEFAULT_SOCKET
+    from .collector import StatusCollector
+    from .dbinfo import DEFAULT_DB_DIR, cache_key, probe_metadata
+    from .detections import DEFAULT_HISTORY, DetectionStore
+    from .log_parser import parse_freshclam_file
+    from .metrics import ClamavMetrics, parse_listen, serve_http, write_textfile
+    from .utils import load_conf
+
+    conf = load_conf()
+    ap = argparse.ArgumentParser(prog="clamui metrics", description="Export ClamAV health as OpenMetrics.")
+    ap.add_argument("--listen", default=conf.get("metrics", "listen", fallback=""),
+                    help="serve /metrics on HOST:PORT")
+    ap.add_argument("--textfile", default=conf.get("metrics", "textfile", fallback=""),
+                    help="write a node_exporter textfile collector file instead")
+    ap.add_argument("--interval", type=float, default=conf.getfloat("metrics", "interval", fallback=15.0),
+                    help="seconds between collection passes")
+    args = ap.parse_args(argv)
+    if not args.listen and not args.textfile:
+        ap.error("one of --listen or --textfile is required")
+
+    clamd_log = conf.get("logs", "clamd-log", fallback="/var/log/clamav/clamd.log")
+    freshclam_log = conf.get("logs", "freshclam-log", fallback="/var/log/clamav/freshclam.log")
+    socket_path = conf.get("clamd", "socket", fallback=DEFAULT_SOCKET)
+    db_dir = conf.get("paths", "database-dir", fallback=DEFAULT_DB_DIR)
+    history = DetectionStore(os.path.expanduser(conf.get("history", "db", fallback=str(DEFAULT_HISTORY))))
+    metrics = ClamavMetrics(history)
+    # Same incremental collector as the dashboard: each pass only reads the
+    # new log tail, and scrapes are served from the metric state in between.
+    collector = StatusCollector(clamd_log, freshclam_log, history, log_lines=1,
+                                daemon_probe=lambda: ClamdClient(socket_path, timeout=2.0).ping(),
+                                daemon_unit=conf.get("systemd", "daemon-unit", fallback="clamav-daemon.service"))
+    if args.listen:
+        serve_http(metrics, *parse_listen(args.listen))
+    db_key = None
+    while True:
+        snap = collector.collect()
+        metrics.set_daemon(snap.daemon_active, snap.infected)
+        metrics.sync_detections(history)
+        try:
+            metrics.set_freshclam(parse_freshclam_file(freshclam_log))
+        except OSError:
+            pass
+        key = cache_key(db_dir)
+        if key != db_key:
+            db_key = key
+            metrics.set_database(probe_metadata(db_dir))
+        if args.textfile:
+            try:
+                write_textfile(metrics, args.textfile)
+            except OSError as e:
+                print(f"Unable to write {args.textfile}: {e}", file=sys.stderr)
+        time.sleep(args.interval)
+
+def quarantine_main(argv: List[str]) -> int:
+    import argparse, time
+    from .quarantine import DEFAULT_QUARANTINE, QuarantineStore
+    from .utils import load_conf
+
+    ap = argparse.ArgumentParser(prog="clamui quarantine", description="Manage quarantined files.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ls = sub.add_parser("list", help="list entries, newest first")
+    ls.add_argument("query", nargs="?", default="", help="/path prefix, sha:HASH prefix or signature prefix")
+    ls.add_argument("--offset", type=int, default=0)
+    ls.add_argument("--limit", type=int, default=50)
+    rs = sub.add_parser("restore", help="restore an entry to its original path")
+    rs.add_argument("id", type=int)
+    rs.add_argument("--to", help="restore to this path instead")
+    rs.add_argument("--force", action="store_true", help="overwrite an existing file")
+    pg = sub.add_parser("purge", help="delete entries for good")
+    pg.add_argument("ids", type=int, nargs="*")
+    pg.add_argument("--older-than", type=float, metavar="DAYS")
+    args = ap.parse_args(argv)
+
+    conf = load_conf()
+    store = QuarantineStore(conf.get("paths", "quarantine-dir", fallback=DEFAULT_QUARANTINE),
+                            compress=conf.getboolean("quarantine", "compress", fallback=False))
+    if args.cmd == "list":
+        for e in store.list(args.offset, args.limit, args.query):
+            print(e.label())
+        print(f"{store.count(args.query)} entries", file=sys.stderr)
+    elif args.cmd == "restore":
+        try:
+            print(f"restored to {store.restore(args.id, args.to, args.force)}")
+        except OSError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+    else:
+        if not args.ids and args.older_than is None:
+            ap.error("purge needs entry ids and/or --older-than")
+        cutoff = time.time() - args.older_than * 86400 if args.older_than is not None else None
+        print(f"purged {store.purge(args.ids or None, cutoff)} entries")
+    return 0
+
+def schedule_main(argv: List[str]) -> int:
+    import argparse, os, signal, time
+    from .clamd import DEFAULT_SOCKET
+    from .detections import DEFAULT_HISTORY, Detection, DetectionStore
+    from .scheduler import DEFAULT_STATE, ScanScheduler, lower_priority, parse_quiet_hours
+    from .utils import load_conf, parse_list
+    from .verdict_cache import DEFAULT_CACHE, VerdictCache
+    from .walker import filter_from_conf
+
+    conf = load_conf()
+    ap = argparse.ArgumentParser(prog="clamui schedule", description="Recurring, resumable scans of watch-dirs.")
+    ap.add_argument("roots", nargs="*", help="directories to scan (default: [paths] watch-dirs)")
+    ap.add_argument("--once", action="store_true", help="scan what is due, then exit")
+    ap.add_argument("--now", action="store_true", help="treat every root as due")
+    args = ap.parse_args(argv)
+
+    roots = args.roots or parse_list(conf.get("paths", "watch-dirs", fallback=""))
+    if not roots:
+        ap.error("no roots given and no [paths] watch-dirs configured")
+    lower_priority(conf.getint("schedule", "nice", fallback=10),
+                   conf.getboolean("schedule", "io-idle", fallback=True))
+    history = DetectionStore(os.path.expanduser(conf.get("history", "db", fallback=str(DEFAULT_HISTORY))))
+    cache = None
+    if conf.getboolean("scan", "cache", fallback=True):
+        cache = VerdictCache(os.path.expanduser(conf.get("scan", "cache-file", fallback=str(DEFAULT_CACHE))))
+    clamav = conf.get("paths", "clamav", fallback="")
+    scheduler = ScanScheduler(
+        roots, conf.get("clamd", "socket", fallback=DEFAULT_SOCKET),
+        interval=conf.getfloat("schedule", "interval-hours", fallback=24) * 3600,
+        state_path=os.path.expanduser(conf.get("schedule", "state-file", fallback=DEFAULT_STATE)),
+        files_per_s=conf.getfloat("schedule", "files-per-second", fallback=0),
+        mb_per_s=conf.getfloat("schedule", "mb-per-second", fallback=0),
+        quiet_hours=parse_quiet_hours(conf.get("schedule", "quiet-hours", fallback="")),
+        workers=conf.getint("schedule", "workers", fallback=2),
+        batch_size=conf.getint("scan", "batch-size", fallback=64),
+        clamscan=os.path.join(clamav, "clamscan") if clamav else None, cache=cache,
+        on_result=lambda r: r.infected and history.add([Detection(time.time(), r.path, r.detail, "scan")]),
+        filters=filter_from_conf(conf))
+    if args.now:
+        from dataclasses import replace
+        scheduler.states = {r: replace(st, last_complete=0.0) for r, st in scheduler.states.items()}
+    # SIGTERM (systemd stop, shutdown) keeps the checkpoint for the next start.
+    signal.signal(signal.SIGTERM, lambda *_a: scheduler.cancel())
+    try:
+        if args.once:
+            scheduler.run_once()
+        else:
+            scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.cancel()
+    for root in roots:
+        st = scheduler.states.get(root)
+        if st is not None:
+            print(f"{root}: {st.status}, {st.progress}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv if argv is None else argv)
+    if "--trace" in argv[1:-1]:
+        # Global option: write Chrome trace events of every span (see tracing).
+        i = argv.index("--trace", 1)
+        from .tracing import enable
+        enable(argv[i + 1])
+        del argv[i:i + 2]
+    if len(argv) > 1 and argv[1] == "status":
+        return status_main(argv[2:])
+    if len(argv) > 1 and argv[1] == "schedule":
+        return schedule_main(argv[2:])
+    if len(argv) > 1 and argv[1] == "quarantine":
+        return quarantine_main(argv[2:])
+    if len(argv) > 1 and argv[1] == "metrics":
+        try:
+            return metrics_main(argv[2:])
+        except KeyboardInterrupt:
+            return 0
+    from .app import main as gui_main
+    return gui_main(argv)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
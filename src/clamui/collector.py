@@ -0,0 +1,174 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from .detections import Detection, DetectionStore
+from .log_parser import (format_freshclam_summary, parse_detection_file, parse_detections,
+                         parse_freshclam_file)
+from .log_set import LogSet
+from .log_tail import LogTail
+from .tracing import span
+from .utils import try_run
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable result of one collection pass, rendered by the dashboard."""
+    daemon_active: bool
+    infected: int = 0                   # detections in the current clamd.log generation
+    new_detections: int = 0             # rows added to the history by this pass
+    log: Tuple[str, ...] = ()
+    db_info: Tuple[str, ...] = ()
+    error: Optional[str] = None
+
+class StatusCollector:
+    """Gathers daemon state, detections and freshclam info.
+
+    Holds the incremental log state, so it must only be driven from one
+    thread at a time (see ``CoalescingWorker``). Detections are appended to
+    ``history``, together with the log position, so a restart resumes where
+    the previous run stopped instead of re-parsing the log. With
+    ``rotated_logs``, detections in logrotate's older (possibly compressed)
+    generations are merged into the history too, each generation once.
+    """
+
+    def __init__(self, clamd_log: str, freshclam_log: str, history: DetectionStore,
+                 log_lines: int = 200, daemon_probe: Optional[Callable[[], Optional[bool]]] = None,
+                 rotated_logs: bool = True, daemon_unit: str = "clamav-daemon.service"):
+        self.daemon_probe = daemon_probe
+        self.daemon_unit = daemon_unit
+        self.clamd_tail = LogTail(clamd_log, max_lines=log_lines)
+        self.freshclam_log = freshclam_log
+        self.history = history
+        self.infected = 0
+        saved = history.get_meta("clamd_log_state")
+        if saved:
+            dev, ino, offset = (int(x) for x in saved.split(":"))
+            if self.clamd_tail.restore((dev, ino, offset)):
+                self.infected = int(history.get_meta("clamd_log_infected") or 0)
+        self.log_set = (LogSet.from_json(clamd_log, history.get_meta("clamd_log_generations"))
+                        if rotated_logs else None)
+        self._log_set_saved = ""
+
+    def _ingest(self) -> int:
+        with span("clamd_log.poll") as sp:
+            reset, new_lines = self.clamd_tail.poll()
+            sp.set(lines=len(new_lines), reset=reset)
+        if reset:
+            self.infected = 0
+        added = 0
+        state = self.clamd_tail.state()
+        if new_lines or reset:
+            records = parse_detections(new_lines)
+            if reset and self.clamd_tail.skipped:
+                # The tail only returned the end of the file; scan the rest in one pass.
+                with span("clamd_log.head"):
+                    records = parse_detection_file(self.clamd_tail.path, 0,
+                                                   end=self.clamd_tail.skipped) + records
+            found = [Detection(ts, path, sig, "clamd") for ts, path, sig in records]
+            self.infected += len(found)
+            added = self.history.add(found)
+            if state is not None:
+                self.history.set_meta("clamd_log_state", ":".join(str(x) for x in state))
+                self.history.set_meta("clamd_log_infected", str(self.infected))
+        if self.log_set is not None:
+            added += self._ingest_rotated(state)
+        return added
+
+    def _ingest_rotated(self, live_state) -> int:
+        """Parse new rotated generations; the live file's position marks what is already read."""
+        if live_state is not None:
+            self.log_set.mark(*live_state)
+        if self.clamd_tail.rotated is not None:
+            # The tail finished the old generation itself; don't parse it again.
+            self.log_set.mark(*self.clamd_tail.rotated)
+        added = 0
+        def sink(records):
+            nonlocal added
+            added += self.history.add(Detection(ts, path, sig, "clamd") for ts, path, sig in records)
+        with span("clamd_log.rotated"):
+            self.log_set.ingest(sink)
+        data = self.log_set.to_json()
+        if data != self._log_set_saved:
+            self.history.set_meta("clamd_log_generations", data)
+            self._log_set_saved = data
+        return added
+
+    def daemon_active(self) -> bool:
+        """Ask ``daemon_probe``; if it has no answer (None), ask systemctl about ``daemon_unit``."""
+        if self.daemon_probe is not None:
+            active = self.daemon_probe()
+            if active is not None:
+                return active
+        with span("systemctl"):
+            rc, out, _err = try_run(["systemctl", "is-active", self.daemon_unit])
+        return rc == 0 and out == "active"
+
+    def collect(self) -> Snapshot:
+        with span("collect"):
+            return self._collect()
+
+    def _collect(self) -> Snapshot:
+        with span("daemon_probe"):
+            active = self.daemon_active()
+        if not active:
+            return Snapshot(daemon_active=False,
+                            log=("(unable to read daemon log)",),
+                            db_info=("<b>LAST UPDATE:</b> Not found!",))
+        added = 0
+        try:
+            added = self._ingest()
+
+            with span("freshclam_log"):
+                db_info = format_freshclam_summary(parse_freshclam_file(self.freshclam_log))
+        except Exception as e:
+            return Snapshot(daemon_active=True,
+                            infected=self.infected,
+                            new_detections=added,
+                            log=tuple(self.clamd_tail.lines),
+                            db_info=("<b>LAST UPDATE:</b> Not found!",),
+                            error=f"Unable to read log file: {e}")
+        return Snapshot(daemon_active=True,
+                        infected=self.infected,
+                        new_detections=added,
+                        log=tuple(self.clamd_tail.lines),
+                        db_info=tuple(db_info))
+
+class CoalescingWorker:
+    """Runs ``job`` on a background thread, at most one at a time.
+
+    Requests that arrive while a run is in progress are folded into a single
+    follow-up run. Each result is passed to ``deliver`` from the worker
+    thread; GUI callers should hop back to the main loop inside it.
+    """
+
+    def __init__(self, job: Callable[[], Snapshot], deliver: Callable[[Snapshot], None]):
+        self._job = job
+        self._deliver = deliver
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = False
+
+    @property
+    def busy(self) -> bool:
+        return self._running
+
+    def request(self):
+        with self._lock:
+            if self._running:
+                self._pending = True
+                return
+            self._running = True
+        threading.Thread(target=self._loop, name="clamui-collect", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                self._deliver(self._job())
+            except Exception as e:
+                print(f"Collection failed: {e}")
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
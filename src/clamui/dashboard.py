@@ -1,13 +1,31 @@
 from __future__ import annotations
 import gi
-import subprocess
 import os
+import threading
+import time
 gi.require_version('Gtk', '4.0'); gi.require_version('Gio', '2.0')
 from gi.repository import Gtk, Gio, GLib
+from typing import Optional
 
-from .widgets import Card, IconSideBar, CommonStatusBadge, SimpleList, install_css
-from .log_parser import parse_freshclam_log, parse_infected_files_from_text
-from .utils import load_conf, try_run
+from .widgets import (Card, IconSideBar, CommonStatusBadge, VirtualList, ScanResultsWindow, DetectionHistory,
+                      ActionHistory, JobsPanel, PerfPanel, install_css)
+from .collector import StatusCollector, CoalescingWorker, Snapshot
+from .monitor import DebouncedFileMonitor
+from .clamd import DEFAULT_SOCKET, ScanResult
+from .jobs import JobManager, ScanJob
+from .walker import conf_size, filter_from_conf
+from .verdict_cache import VerdictCache, DEFAULT_CACHE
+from .detections import Detection, DetectionStore, DEFAULT_HISTORY
+from .watcher import TreeWatcher, WatchStats
+from .dbinfo import (ClamavMetadata, DEFAULT_DB_DIR, load_cached_metadata, probe_metadata,
+                     save_cached_metadata)
+from .metrics import ClamavMetrics, parse_listen, serve_http
+from .log_parser import parse_freshclam_file
+from .journal import DEFAULT_JOURNAL, readable_journal
+from .systemd import UnitStatus, UnitWatcher
+from .scheduler import DEFAULT_STATE as SCHEDULE_STATE, load_state
+from .tracing import enable as enable_tracing, enabled as tracing_enabled, span
+from .utils import load_conf, parse_list
 
 APP_TITLE = "ClamAV"
 
@@ -22,6 +40,45 @@ class Dashboard(Gtk.ApplicationWindow):
         self.clamav = self.conf.get("paths", "clamav")
 
         self.clamscan = self.clamav + "/clamscan"
+        self.db_dir = self.conf.get("paths", "database-dir", fallback=DEFAULT_DB_DIR)
+        self.clamd_socket = self.conf.get("clamd", "socket", fallback=DEFAULT_SOCKET)
+        self.scan_workers = self.conf.getint("scan", "workers", fallback=0)
+        self.scan_batch_size = self.conf.getint("scan", "batch-size", fallback=64)
+        self.scan_filter = filter_from_conf(self.conf)
+        self.verdict_cache = None
+        if self.conf.getboolean("scan", "cache", fallback=True):
+            try:
+                self.verdict_cache = VerdictCache(
+                    os.path.expanduser(self.conf.get("scan", "cache-file", fallback=str(DEFAULT_CACHE))))
+            except Exception as e:
+                print(f"Scan cache disabled: {e}")
+        try:
+            self.history = DetectionStore(
+                os.path.expanduser(self.conf.get("history", "db", fallback=str(DEFAULT_HISTORY))))
+        except Exception as e:
+            print(f"Detection history not persisted: {e}")
+            self.history = DetectionStore(":memory:")
+        self.metrics = ClamavMetrics(self.history)
+        self.metrics_server = None
+        listen = self.conf.get("metrics", "listen", fallback="")
+        if listen:
+            try:
+                self.metrics_server = serve_http(self.metrics, *parse_listen(listen))
+            except (OSError, ValueError) as e:
+                print(f"Metrics endpoint disabled: {e}")
+        # Unit state is pushed over D-Bus; the collector only forks systemctl
+        # until systemd has answered, or if the bus is unavailable.
+        self.daemon_unit = self.conf.get("systemd", "daemon-unit", fallback="clamav-daemon.service")
+        self.freshclam_unit = self.conf.get("systemd", "freshclam-unit", fallback="clamav-freshclam.service")
+        self._daemon_state: Optional[str] = None
+        self.units = UnitWatcher([self.daemon_unit, self.freshclam_unit], self._on_unit_status,
+                                 on_error=lambda msg: print(f"systemd D-Bus unavailable, polling instead: {msg}"),
+                                 on_unit_error=lambda unit, msg: print(f"Cannot follow {unit}: {msg}"))
+        self.collector = StatusCollector(self.clamd_log, self.freshclam_log, self.history, log_lines=200,
+                                         daemon_probe=self._daemon_probe,
+                                         rotated_logs=self.conf.getboolean("logs", "rotated", fallback=True),
+                                         daemon_unit=self.daemon_unit)
+        self.refresher = CoalescingWorker(self.collector.collect, self._on_snapshot)
                 
         root = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12,
                        margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
@@ -50,16 +107,20 @@ class Dashboard(Gtk.ApplicationWindow):
         self.card_watch.set_size_request(400, -1)
         self.lbl_watch = Gtk.Label(xalign=0); 
         self.card_watch.body.append(self.lbl_watch)
+        self.lbl_schedule = Gtk.Label(xalign=0, wrap=True)
+        self.card_watch.body.append(self.lbl_schedule)
+        self.schedule_state = os.path.expanduser(self.conf.get("schedule", "state-file", fallback=SCHEDULE_STATE))
+        self._show_schedule()
 
         self.card_system = Card("SYSTEM"); 
         self.card_system.set_size_request(300, -1)
         
-        clamav_version = self.get_clamav_version()
-        
-        lbl_sys_ver = Gtk.Label()
-        lbl_sys_ver.set_markup(
-            f"\n<b>PACKAGE:</b> ClamAV\n<b>VERSION:</b> {clamav_version}\n")
-        lbl_sys_ver.set_halign(Gtk.Align.START)
+        # Show cached version info at once; probe for fresh values in the background.
+        self.lbl_sys_ver = Gtk.Label()
+        self.lbl_sys_ver.set_halign(Gtk.Align.START)
+        self.cached_meta = load_cached_metadata(self.db_dir, [self.clamscan])
+        self._render_metadata(self.cached_meta)
+        threading.Thread(target=self._probe_metadata, name="clamui-metadata", daemon=True).start()
 
         lbl_db_tag = Gtk.Label()
         lbl_db_tag.set_markup(f"<b>VIRUS DATABASE</b>")
@@ -68,7 +129,7 @@ class Dashboard(Gtk.ApplicationWindow):
         self.lbl_db_info = Gtk.Label()
         self.lbl_db_info.set_halign(Gtk.Align.START)
         
-        self.card_system.body.append(lbl_sys_ver)
+        self.card_system.body.append(self.lbl_sys_ver)
         self.card_system.body.append(lbl_db_tag)
         self.card_system.body.append(self.lbl_db_info)        
 
@@ -81,19 +142,53 @@ class Dashboard(Gtk.ApplicationWindow):
         self.daemon_badge = CommonStatusBadge() 
         self.daemon_badge.set_status("offline", "Offline")
         self.card_daemon.body.append(self.daemon_badge)
+        self.lbl_units = Gtk.Label(xalign=0)
+        self.card_daemon.body.append(self.lbl_units)
                 
         self.card_infected = Card("INFECTED FILES"); 
         grid.attach(self.card_infected, 0, 2, 4, 1)
-        self.list_infected = SimpleList(height=200); 
+        self.list_infected = DetectionHistory(self.history, height=200)
         self.card_infected.set_size_request(-1, 240)
         self.card_infected.body.append(self.list_infected)
+        GLib.idle_add(self.list_infected.reload)
 
         self.card_logs = Card("DAEMON LOG"); 
         grid.attach(self.card_logs, 0, 3, 4, 1)
-        self.list_logs = SimpleList(height=250); 
+        self.list_logs = VirtualList(height=250); 
         self.card_logs.set_size_request(-1, 240)
         self.card_logs.body.append(self.list_logs)
 
+        self.journal_path = readable_journal(self.conf.get("journal", "path", fallback=DEFAULT_JOURNAL))
+        self.card_actions = Card("REMEDIATION HISTORY")
+        grid.attach(self.card_actions, 0, 4, 4, 1)
+        self.list_actions = ActionHistory(self.journal_path, height=160)
+        self.card_actions.body.append(self.list_actions)
+        self.list_actions.reload()
+
+        # Scans run as background jobs: several at once, each cancellable and bounded.
+        self.job_views = {}
+        self.jobs = JobManager(
+            self.clamd_socket, max_jobs=self.conf.getint("scan", "max-jobs", fallback=2),
+            timeout=self.conf.getfloat("scan", "job-timeout-minutes", fallback=0) * 60,
+            memory_limit=conf_size(self.conf, "scan", "job-memory-limit"),
+            clamscan=self.clamscan, workers=self.scan_workers, batch_size=self.scan_batch_size,
+            cache=self.verdict_cache, filters=self.scan_filter, on_batch=self.metrics.observe_batch,
+            on_change=self._on_job_change, on_result=self._on_job_result)
+        self.card_jobs = Card("SCAN JOBS")
+        grid.attach(self.card_jobs, 0, 5, 4, 1)
+        self.jobs_panel = JobsPanel(on_cancel=self.jobs.cancel, on_details=self._show_job_details,
+                                    on_clear=self.jobs.clear_finished)
+        self.card_jobs.body.append(self.jobs_panel)
+
+        # Span latencies; always on with CLAMUI_TRACE, otherwise opt-in since it records every span.
+        self.perf_panel = None
+        if self.conf.getboolean("ui", "perf-panel", fallback=False) or tracing_enabled():
+            enable_tracing()
+            self.card_perf = Card("PERFORMANCE")
+            grid.attach(self.card_perf, 0, 6, 4, 1)
+            self.perf_panel = PerfPanel(height=160)
+            self.card_perf.body.append(self.perf_panel)
+
         actionbar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         actionbar.add_css_class("actionbar"); 
         root.append(actionbar)
@@ -106,60 +201,153 @@ class Dashboard(Gtk.ApplicationWindow):
         self.btn_scan.connect("clicked",  lambda btn: self.on_scan())
         self.refresh()
 
+        # Live updates: refresh when either log changes, debounced so a burst
+        # of detections results in a single collection pass.
+        self.log_monitor = DebouncedFileMonitor(
+            [self.clamd_log, self.freshclam_log], self.refresh,
+            debounce_ms=self.conf.getint("ui", "refresh-debounce-ms", fallback=250),
+            min_interval_ms=self.conf.getint("ui", "refresh-min-interval-ms", fallback=1000))
+        # "clamui schedule" checkpoints its progress into this file every few seconds.
+        self.schedule_monitor = DebouncedFileMonitor([self.schedule_state], self._show_schedule,
+                                                     debounce_ms=500, min_interval_ms=2000)
+        self.journal_monitor = DebouncedFileMonitor([self.journal_path], self.list_actions.reload,
+                                                    debounce_ms=1000, min_interval_ms=2000)
+        self.watcher = self._start_watcher()
+        self.connect("close-request", self._on_close_request)
+
+    def _on_close_request(self, _win) -> bool:
+        self.jobs.shutdown()
+        self.log_monitor.cancel()
+        self.units.close()
+        self.journal_monitor.cancel()
+        self.schedule_monitor.cancel()
+        if self.perf_panel is not None:
+            self.perf_panel.stop()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        return False
+
+    def _start_watcher(self):
+        """Scan files under ``paths.watch-dirs`` as they change."""
+        roots = parse_list(self.conf.get("paths", "watch-dirs", fallback=""))
+        if not roots:
+            self.lbl_watch.set_text("No watch-dirs configured")
+            return None
+        self.lbl_watch.set_text("\n".join(roots))
+        watcher = TreeWatcher(
+            roots, self.clamd_socket,
+            workers=self.conf.getint("watch", "workers", fallback=2),
+            settle=self.conf.getfloat("watch", "settle-seconds", fallback=2.0),
+            queue_size=self.conf.getint("watch", "queue-size", fallback=1024),
+            max_pending=self.conf.getint("watch", "max-pending", fallback=100000),
+            on_result=lambda r: self._record_scan_detections([r], source="watch"),
+            on_stats=lambda st: GLib.idle_add(self._show_watch_stats, roots, st))
+        try:
+            watcher.start()
+        except OSError as e:
+            self.lbl_watch.set_text(f"Watcher unavailable: {e}")
+            return None
+        return watcher
+
+    def _show_watch_stats(self, roots, stats: WatchStats) -> bool:
+        self.lbl_watch.set_text("\n".join(roots) + "\n\n" + stats.summary())
+        return False
+
+    def _show_schedule(self):
+        states = load_state(self.schedule_state)
+        lines = []
+        for root, st in sorted(states.items()):
+            last = time.strftime("%Y-%m-%d %H:%M", time.localtime(st.last_complete)) if st.last_complete else "never"
+            line = f"<b>{GLib.markup_escape_text(root)}:</b> {st.status}, last complete {last}"
+            if st.status in ("running", "paused", "cancelled"):
+                line += f"\n  {st.files} files, {st.infected} infected. {GLib.markup_escape_text(st.progress)}"
+            lines.append(line)
+        self.lbl_schedule.set_markup("\n<b>SCHEDULED SCANS</b>\n" + "\n".join(lines) if lines else "")
+
     def refresh(self):
-        rc, out, err2 = try_run(["systemctl", "is-active", "clamav-daemon.service"])
-        log = ["(unable to read daemon log)"]
-        infected_files = ["(service not active)"]
-        db_info = ["<b>LAST UPDATE:</b> Not found!"]
-        if rc==0 and out == "active":
+        """Request a background collection; overlapping requests are coalesced."""
+        self.refresher.request()
+        self.units.refresh()
+
+    def _daemon_probe(self) -> Optional[bool]:
+        status = self.units.get(self.daemon_unit)
+        return status.active if status is not None else None
+
+    def _on_unit_status(self, status: UnitStatus):
+        # Runs on the main loop as soon as systemd reports a change.
+        if status.unit == self.daemon_unit:
+            if status.active_state != self._daemon_state:
+                # Started or stopped: the health badge and log need a fresh pass.
+                self._daemon_state = status.active_state
+                self.refresher.request()
+            if status.active:
+                self.daemon_badge.set_status("running", "Running")
+            else:
+                self.daemon_badge.set_status("offline", status.active_state.capitalize())
+        lines = []
+        for unit, title in ((self.daemon_unit, "clamd"), (self.freshclam_unit, "freshclam")):
+            st = self.units.get(unit)
+            if st is not None:
+                lines.append(f"<b>{title}:</b> {GLib.markup_escape_text(st.summary())}")
+        self.lbl_units.set_markup("\n".join(lines))
+
+    def _on_snapshot(self, snap: Snapshot):
+        # Called on the collector thread; render on the main loop.
+        self.metrics.set_daemon(snap.daemon_active, snap.infected)
+        self.metrics.sync_detections(self.history)     # scans and the watcher add rows too
+        try:
+            self.metrics.set_freshclam(parse_freshclam_file(self.freshclam_log))
+        except OSError:
+            pass
+        GLib.idle_add(self._apply_snapshot, snap)
+
+    def _apply_snapshot(self, snap: Snapshot) -> bool:
+        with span("apply_snapshot"):
+            return self._render_snapshot(snap)
+
+    def _render_snapshot(self, snap: Snapshot) -> bool:
+        if snap.error:
+            print(snap.error)
+        if snap.daemon_active:
             self.daemon_badge.set_status("running", "Running")
-            try:
-                with open(self.clamd_log, "r", errors="ignore") as fh:
-                    text = fh.read()
-                    infected_files = parse_infected_files_from_text(text)
-
-                    if len(infected_files):
-                        self.health_badge.set_status("infected", "Infected")
-                    else:
-                        self.health_badge.set_status("healthy", "No threats detected")
-                        
-                    fh.seek(0)
-                    log = fh.readlines()[-200:]
-
-                with open(self.freshclam_log, "r", errors="ignore") as fd:
-                    fc_log = fd.readlines()
-                    db_info = parse_freshclam_log(fc_log)
-                
-            except Exception:
-                print(f"Unable to read log file")
-            
+            if snap.infected:
+                self.health_badge.set_status("infected", "Infected")
+            else:
+                self.health_badge.set_status("healthy", "No threats detected")
         else:
             self.daemon_badge.set_status("offline", "Offline")
             self.health_badge.set_status("unknown", "Unknown")
-            
-        self.list_logs.set_items([l.rstrip() for l in log])
-        self.list_infected.set_items([l.rstrip() for l in infected_files])
-        self.lbl_db_info.set_markup("\n".join(db_info))
 
-    def get_clamav_version(self):
-        try:
-            print(self.clamscan)
-            if not os.path.exists(self.clamscan):
-                return "Unknown"
-            
-            result = subprocess.run(
-                [self.clamscan, '--version'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
-        
-        except subprocess.CalledProcessError as e:
-            return "Unknown"
-        except Exception as e:
-            return "Unknown"
-            
+        self.list_logs.set_items(snap.log)
+        if snap.new_detections:
+            self.list_infected.reload()
+        self.lbl_db_info.set_markup("\n".join(snap.db_info))
+        return False
+
+    def _render_metadata(self, meta: Optional[ClamavMetadata]) -> bool:
+        if meta is None:
+            version, extra = "Loading...", ""
+        else:
+            version = GLib.markup_escape_text(meta.engine)
+            extra = "".join(f"<b>{GLib.markup_escape_text(c.name).upper()}:</b> {c.version} ({c.build_time})\n"
+                            for c in meta.components.values())
+            if meta.components:
+                extra += f"<b>SIGNATURES:</b> {meta.sigs:,}\n"
+        self.lbl_sys_ver.set_markup(f"\n<b>PACKAGE:</b> ClamAV\n<b>VERSION:</b> {version}\n{extra}")
+        return False
+
+    def _probe_metadata(self):
+        """Refresh engine and database info off the main loop."""
+        meta = probe_metadata(self.db_dir, self.clamd_socket)
+        if meta.engine != "Unknown":
+            save_cached_metadata(meta, self.db_dir, [self.clamscan])
+        elif self.cached_meta is not None:
+            # clamd is down: keep the cached engine version, but fresh DB headers.
+            meta = ClamavMetadata(self.cached_meta.engine, meta.components)
+        self.metrics.set_database(meta)
+        GLib.idle_add(self._render_metadata, meta)
 
     def on_scan(self):
         """Simple method to select either file or folder"""
@@ -179,58 +367,57 @@ class Dashboard(Gtk.ApplicationWindow):
             print("Selection cancelled")
 
 
-    def _show_scan_report(self, title: str, message: str) -> bool:
-        dlg = Gtk.MessageDialog(
-            transient_for=self,
-            modal=True,
-            message_type=Gtk.MessageType.INFO,
-            buttons=Gtk.ButtonsType.CLOSE,
-            text=title,
-            secondary_text=message,
-        )
-        dlg.connect("response", lambda d, _r: d.destroy())
-        dlg.present()
-        return False
-    
     def run_scan(self, path: str):
-        scanning_dlg = Gtk.MessageDialog(
-            transient_for=self,
-            modal=True,
-            message_type=Gtk.MessageType.INFO,
-            buttons=Gtk.ButtonsType.NONE,
-            text="Scanning...",
-            secondary_text=f"Scanning: {path}\n\nThis may take a few moments...",
-        )
+        """Queue ``path``; it runs in the background and shows up in SCAN JOBS."""
+        self.jobs.submit(path)
 
-        scanning_dlg.present()
+    def _on_job_change(self, job: ScanJob):
+        # Called on job threads.
+        if job.done and os.path.isdir(job.target) and job.state == "done":
+            self.metrics.observe_scan(job.elapsed)
+        GLib.idle_add(self._show_job, job)
 
-        proc = Gio.Subprocess.new(
-            [self.clamscan, "--stdout", "-r", "--infected", path],
-            Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_PIPE
-        )
+    def _show_job(self, job: ScanJob) -> bool:
+        self.jobs_panel.update(job)
+        view = self.job_views.get(job.id)
+        if view is not None:
+            view.set_progress(job.progress or job.state)
+            if job.done:
+                self._finish_view(job, view)
+        return False
 
-        proc.communicate_utf8_async(None, None, self._on_scan_complete, (scanning_dlg, path))
+    def _on_job_result(self, job: ScanJob, r: ScanResult):
+        self._record_scan_detections([r])
+        view = self.job_views.get(job.id)
+        if view is not None:
+            GLib.idle_add(view.add_result, r)
 
-    def _on_scan_complete(self, proc, result, data):
-        scanning_dlg, path = data
+    def _finish_view(self, job: ScanJob, view: ScanResultsWindow):
+        # Findings were already streamed; account for clean and cached files at the end.
+        view.count_clean(max(0, job.files - job.infected - job.errors))
+        view.finish(job.summary)
+        self.job_views.pop(job.id, None)
 
-        try:
-            success, stdout, stderr = proc.communicate_utf8_finish(result)
-            result_text = stdout if success else f"Error: {stderr}"
-            scanning_dlg.destroy()
-            self._show_scan_report("Scan Result", result_text)
+    def _show_job_details(self, job_id: int):
+        """Open a results window for a job, replaying what it has found so far."""
+        job = self.jobs.jobs.get(job_id)
+        if job is None:
+            return
+        view = ScanResultsWindow(self, job.target)
+        for r in list(job.results):
+            view.add_result(r)
+        view.present()
+        if job.done:
+            self._finish_view(job, view)
+        else:
+            self.job_views[job.id] = view
+            view.connect("close-request", self._forget_view, job_id)
 
-        except Exception as e:
-            print(f"Scan error: {e}")
-            scanning_dlg.destroy()
-            self._show_scan_report("Scan Error", str(e))
-
-    def _on_io(self, din: Gio.DataInputStream, stream, cond):
-        if cond & GLib.IOCondition.IN:
-            try: line, _ = din.read_line_utf8(None)
-            except GLib.Error: line = None
-            if line is not None:
-                self._captured += line + "\n"
-                return True
+    def _forget_view(self, _view, job_id: int) -> bool:
+        self.job_views.pop(job_id, None)
         return False
 
+    def _record_scan_detections(self, results, source: str = "scan"):
+        found = [Detection(time.time(), r.path, r.detail, source) for r in results if r.infected]
+        if found and self.history.add(found):
+            GLib.idle_add(self.list_infected.reload)
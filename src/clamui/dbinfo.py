@@ -0,0 +1,120 @@
+from __future__ import annotations
+import json, os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .clamd import ClamdClient, ClamdError
+from .tracing import traced
+
+DEFAULT_DB_DIR = "/var/lib/clamav"
+DEFAULT_METADATA_CACHE = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "clamui" / "metadata.json"
+DB_COMPONENTS = ("main", "daily", "bytecode")
+CVD_HEADER_SIZE = 512
+
+@dataclass(frozen=True)
+class CvdInfo:
+    """Fields of the 512-byte ``ClamAV-VDB:`` header of a .cvd/.cld file."""
+    name: str
+    build_time: str
+    version: int
+    sigs: int
+    f_level: int
+    builder: str
+    stime: int = 0              # build time as a UNIX timestamp
+
+@dataclass(frozen=True)
+class ClamavMetadata:
+    engine: str = "Unknown"
+    components: Dict[str, CvdInfo] = field(default_factory=dict)
+
+    @property
+    def sigs(self) -> int:
+        return sum(c.sigs for c in self.components.values())
+
+    @property
+    def newest_build(self) -> int:
+        return max((c.stime for c in self.components.values()), default=0)
+
+def read_cvd_header(path: str) -> Optional[CvdInfo]:
+    """Parse the header of a signature database without reading the body."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(CVD_HEADER_SIZE).decode("ascii", "replace")
+    except OSError:
+        return None
+    parts = head.split(":")
+    if len(parts) > 2 and not parts[2].strip().isdigit():
+        parts[1:3] = [f"{parts[1]}:{parts[2]}"]     # "14 Nov 2023 07:37 -0500"
+    if len(parts) < 8 or parts[0] != "ClamAV-VDB":
+        return None
+    try:
+        stime = parts[8].split()[0] if len(parts) > 8 and parts[8].split() else "0"
+        return CvdInfo(os.path.basename(path), parts[1], int(parts[2]), int(parts[3]),
+                       int(parts[4]), parts[7].strip(), int(stime) if stime.isdigit() else 0)
+    except ValueError:
+        return None
+
+def database_files(db_dir: str) -> List[str]:
+    """The newest file per component; .cld (incrementally updated) wins over .cvd."""
+    out = []
+    for comp in DB_COMPONENTS:
+        for ext in (".cld", ".cvd"):
+            p = os.path.join(db_dir, comp + ext)
+            if os.path.exists(p):
+                out.append(p)
+                break
+    return out
+
+def cache_key(db_dir: str, extra: List[str] = ()) -> Dict[str, int]:
+    """mtimes of the database files (and e.g. the clamscan binary) the cache depends on."""
+    key = {}
+    for p in database_files(db_dir) + list(extra):
+        try: key[p] = os.stat(p).st_mtime_ns
+        except OSError: pass
+    return key
+
+@traced("probe_metadata")
+def probe_metadata(db_dir: str, clamd_address: Optional[str] = None) -> ClamavMetadata:
+    """Engine version from clamd's VERSION command, DB info from CVD headers."""
+    engine = "Unknown"
+    if clamd_address:
+        try:
+            with ClamdClient(clamd_address, timeout=2.0) as client:
+                engine = client.version().split("/")[0]
+        except ClamdError:
+            pass
+    comps = {}
+    for p in database_files(db_dir):
+        info = read_cvd_header(p)
+        if info is not None:
+            comps[info.name] = info
+    return ClamavMetadata(engine, comps)
+
+def load_cached_metadata(db_dir: str, extra: List[str] = (),
+                         path: Path = DEFAULT_METADATA_CACHE) -> Optional[ClamavMetadata]:
+    """Cached metadata, or None when missing or any database file changed."""
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if data.get("key") != cache_key(db_dir, extra):
+        return None
+    try:
+        return ClamavMetadata(data["engine"], {k: CvdInfo(**v) for k, v in data["components"].items()})
+    except (KeyError, TypeError):
+        return None
+
+def save_cached_metadata(meta: ClamavMetadata, db_dir: str, extra: List[str] = (),
+                         path: Path = DEFAULT_METADATA_CACHE):
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"key": cache_key(db_dir, extra), "engine": meta.engine,
+                       "components": {k: asdict(v) for k, v in meta.components.items()}}, fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Unable to cache ClamAV metadata: {e}")
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import os, sqlite3, threading, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+DEFAULT_HISTORY = Path(os.environ.get("XDG_DATA_HOME", "~/.local/share")).expanduser() / "clamui" / "detections.sqlite"
+
+SOURCES = ("clamd", "scan", "watch", "anomaly_action")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    path TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    source TEXT NOT NULL,
+    UNIQUE (ts, path, signature, source)
+);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS detections_path ON detections (path, ts);
+CREATE INDEX IF NOT EXISTS detections_sig ON detections (signature, ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+@dataclass(frozen=True)
+class Detection:
+    ts: float
+    path: str
+    signature: str
+    source: str = "clamd"
+
+    def label(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ts))
+        return f"{when}  {self.path}  [{self.signature}]"
+
+def _prefix_range(column: str, prefix: str) -> Tuple[str, Tuple[str, str]]:
+    """Index-friendly ``column LIKE 'prefix%'``."""
+    return f"{column} >= ? AND {column} < ?", (prefix, prefix + "\U0010ffff")
+
+class DetectionStore:
+    """Indexed, persistent history of detection events.
+
+    Filled incrementally from the clamd log, dashboard scans and
+    anomaly_action; duplicate events are ignored, so re-ingesting a log
+    region is harmless. Thread safe. With ``readonly`` an existing store is
+    opened for queries only; nothing is created or written.
+    """
+
+    def __init__(self, path: Path = DEFAULT_HISTORY, readonly: bool = False):
+        if readonly:
+            self._db = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True,
+                                       check_same_thread=False, isolation_level=None, timeout=5.0)
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, events: Iterable[Detection]) -> int:
+        """Insert ``events``; returns how many were new."""
+        rows = [(e.ts, e.path, e.signature, e.source) for e in events]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR IGNORE INTO detections (ts, path, signature, source) "
+                                     "VALUES (?, ?, ?, ?)", rows)
+            except BaseException:
+                self._db.execute("ROLLBACK")    # don't leave the shared connection in a transaction
+                raise
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    @staticmethod
+    def _where(query: str = "", source: Optional[str] = None) -> Tuple[str, tuple]:
+        """Filter on a path prefix (``/...``) or a signature prefix."""
+        clauses: List[str] = []
+        args: tuple = ()
+        if query:
+            clause, rng = _prefix_range("path" if query.startswith("/") else "signature", query)
+            clauses.append(clause); args += rng
+        if source:
+            clauses.append("source = ?"); args += (source,)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def query(self, offset: int = 0, limit: int = 200, query: str = "",
+              source: Optional[str] = None) -> List[Detection]:
+        """One page of detections, newest first."""
+        where, args = self._where(query, source)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT ts, path, signature, source FROM detections{where} "
+                f"ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?", args + (limit, offset)).fetchall()
+        return [Detection(*r) for r in rows]
+
+    def count(self, query: str = "", source: Optional[str] = None) -> int:
+        where, args = self._where(query, source)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM detections{where}", args).fetchone()[0]
+
+    def counts_since(self, after_id: int = 0) -> Tuple[int, List[Tuple[str, int]]]:
+        """Rows inserted after row ``after_id`` by signature, most frequent first, and the last row id.
+
+        Covers every writer of the store, including other processes, and
+        only rows that were actually inserted (duplicates are ignored).
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT signature, COUNT(*) AS n, MAX(id) FROM detections WHERE id > ? "
+                "GROUP BY signature ORDER BY n DESC", (after_id,)).fetchall()
+        return max((r[2] for r in rows), default=after_id), [(r[0], r[1]) for r in rows]
+
+    def counts_by_signature(self, limit: int = 10) -> List[Tuple[str, int]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT signature, COUNT(*) AS n FROM detections GROUP BY signature "
+                "ORDER BY n DESC LIMIT ?", (limit,)).fetchall()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
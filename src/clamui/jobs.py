@@ -0,0 +1,260 @@
+"""Queue of scan jobs run in the background, a few at a time.
+
+Each target becomes a ``ScanJob``. ``JobManager`` starts queued jobs while
+fewer than ``max_jobs`` are running. Every job can be cancelled on its
+own, and it is cancelled automatically after ``timeout`` seconds.
+Directories go through ``ParallelScanner``; single files are streamed to
+clamd, or scanned by a clamscan subprocess when clamd is down. clamscan
+runs in its own process group, so cancelling kills it together with its
+children, and its address space is capped at ``memory_limit`` bytes.
+clamd is a shared daemon and is not capped.
+"""
+from __future__ import annotations
+import itertools, os, subprocess, threading, time
+from typing import Callable, Dict, List, Optional
+
+from .clamd import ClamdError, ScanResult, parse_reply
+from .scan_engine import ParallelScanner
+from .scanner import scan_with_clamd
+from .tracing import span
+from .utils import kill_group, spawn_group
+from .verdict_cache import VerdictCache
+from .walker import WalkFilter
+
+FINISHED = ("done", "cancelled", "timeout", "failed")
+
+class ScanJob:
+    """One scan target and its progress. Fields are written by the job's thread."""
+
+    def __init__(self, job_id: int, target: str, max_results: int = 10000):
+        self.id = job_id
+        self.target = target
+        self.state = "queued"       # queued | running | done | cancelled | timeout | failed
+        self.progress = ""
+        self.summary = ""
+        self.files = self.infected = self.errors = 0
+        self.results: List[ScanResult] = []     # findings and errors, newest ``max_results``
+        self.max_results = max_results
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._reason = "cancelled"
+        self._scanner: Optional[ParallelScanner] = None
+        self._proc: Optional[subprocess.Popen] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def cancel(self, reason: str = "cancelled"):
+        """Stop the job; a queued job never starts. Safe from any thread."""
+        if self._cancel.is_set() or self.done:
+            return
+        self._reason = reason
+        self._cancel.set()
+        scanner, proc = self._scanner, self._proc
+        if scanner is not None:
+            scanner.cancel()
+        if proc is not None:
+            kill_group(proc)
+
+    def label(self) -> str:
+        text = self.summary if self.done else (self.progress or self.state)
+        return f"#{self.id}  {self.state.upper():<9}  {self.target}  {text}"
+
+class JobManager:
+    """Runs submitted scan jobs, at most ``max_jobs`` at once.
+
+    ``on_change(job)`` is called from job threads when a job starts, makes
+    progress (throttled) and once when it finishes; ``on_result(job, r)``
+    for every finding or error. GUI callers should hop to the main loop.
+    """
+
+    def __init__(self, address: str, max_jobs: int = 2, timeout: float = 0, memory_limit: int = 0,
+                 clamscan: Optional[str] = None, workers: int = 0, batch_size: int = 64,
+                 cache: Optional[VerdictCache] = None, filters: Optional[WalkFilter] = None,
+                 on_change: Optional[Callable[[ScanJob], None]] = None,
+                 on_result: Optional[Callable[[ScanJob, ScanResult], None]] = None,
+                 on_batch: Optional[Callable[[int, int, float], None]] = None,
+                 progress_interval: float = 0.5):
+        self.address = address
+        self.max_jobs = max(1, max_jobs)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.clamscan = clamscan
+        self.workers = workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self.filters = filters
+        self.on_change = on_change
+        self.on_result = on_result
+        self.on_batch = on_batch
+        self.progress_interval = progress_interval
+        self.jobs: Dict[int, ScanJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def submit(self, target: str) -> ScanJob:
+        job = ScanJob(next(self._ids), os.path.abspath(target))
+        with self._lock:
+            self.jobs[job.id] = job
+        self._changed(job)
+        self._start_ready()
+        return job
+
+    def cancel(self, job_id: int):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        with self._lock:               # not while _start_ready is picking it up
+            job.cancel()
+            queued = job.state == "queued"
+            if queued:
+                job.state = "cancelled"
+        if queued:
+            self._finish(job, counted=False)
+
+    def shutdown(self):
+        """Cancel every queued and running job."""
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+
+    def clear_finished(self) -> List[int]:
+        with self._lock:
+            gone = [i for i, j in self.jobs.items() if j.done]
+            for i in gone:
+                del self.jobs[i]
+        return gone
+
+    def _start_ready(self):
+        with self._lock:
+            ready = []
+            for job in self.jobs.values():
+                if self._running + len(ready) >= self.max_jobs:
+                    break
+                if job.state == "queued" and not job.cancelled:
+                    job.state = "running"
+                    ready.append(job)
+            self._running += len(ready)
+        for job in ready:
+            threading.Thread(target=self._run, args=(job,), name=f"clamui-job-{job.id}", daemon=True).start()
+
+    def _changed(self, job: ScanJob):
+        if self.on_change:
+            self.on_change(job)
+
+    def _result(self, job: ScanJob, r: ScanResult):
+        if r.infected: job.infected += 1
+        elif r.status == "ERROR": job.errors += 1
+        job.results.append(r)
+        del job.results[:-job.max_results]
+        if self.on_result:
+            self.on_result(job, r)
+
+    def _run(self, job: ScanJob):
+        job.started = time.time()
+        self._changed(job)
+        timer = None
+        if self.timeout:
+            timer = threading.Timer(self.timeout, job.cancel, ("timeout",))
+            timer.daemon = True
+            timer.start()
+        try:
+            with span("scan.job", target=job.target):
+                if job.cancelled:
+                    pass
+                elif os.path.isdir(job.target):
+                    self._scan_tree(job)
+                else:
+                    self._scan_file(job)
+        except Exception as e:
+            job.state = "failed"
+            job.summary = str(e)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        self._finish(job)
+
+    def _finish(self, job: ScanJob, counted: bool = True):
+        if job.cancelled:
+            job.state = job._reason
+            job.summary = f"{job._reason} after {job.elapsed:.0f} s; {job.files} files, {job.infected} infected"
+        elif job.state != "failed":
+            job.state = "done"
+        job.finished = time.time()
+        job._scanner = job._proc = None
+        self._changed(job)
+        if counted:
+            with self._lock:
+                self._running -= 1
+            self._start_ready()
+
+    def _scan_tree(self, job: ScanJob):
+        def on_progress(st):
+            job.files = st.files
+            job.progress = st.summary()
+            self._changed(job)
+        scanner = ParallelScanner(self.address, workers=self.workers, batch_size=self.batch_size,
+                                  clamscan=self.clamscan, cache=self.cache, filters=self.filters,
+                                  memory_limit=self.memory_limit, on_batch=self.on_batch,
+                                  on_result=lambda r: self._result(job, r), on_progress=on_progress,
+                                  progress_interval=self.progress_interval)
+        job._scanner = scanner
+        if job.cancelled:           # cancelled between start and here
+            return
+        stats = scanner.run(job.target)
+        job.files = stats.files
+        job.summary = stats.summary()
+
+    def _scan_file(self, job: ScanJob):
+        try:
+            results = scan_with_clamd(self.address, job.target)
+        except ClamdError:
+            if not self.clamscan:
+                raise
+            return self._clamscan(job)
+        for r in results:
+            if r.status != "OK":
+                self._result(job, r)
+        job.files = len(results)
+        job.summary = f"{job.files} files, {job.infected} infected, {job.errors} errors"
+
+    def _clamscan(self, job: ScanJob):
+        proc = spawn_group([self.clamscan, "--stdout", "--no-summary", job.target], self.memory_limit,
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                           encoding="utf-8", errors="surrogateescape")
+        job._proc = proc
+        if job.cancelled:
+            kill_group(proc)
+        last = 0.0
+        for line in proc.stdout:
+            line = line.rstrip("\n")
+            try:
+                r = parse_reply(line)
+            except ClamdError:
+                if not line.endswith(": Empty file"):
+                    continue
+                r = ScanResult(line[:-12], "OK")
+            job.files += 1
+            if r.status != "OK":
+                self._result(job, r)
+            if time.monotonic() - last >= self.progress_interval:
+                last = time.monotonic()
+                job.progress = f"{job.files} files, {job.infected} infected (clamscan)"
+                self._changed(job)
+        rc = proc.wait()
+        if rc not in (0, 1) and not job.cancelled:
+            raise OSError(f"clamscan exited with status {rc} after {job.files} files")
+        job.summary = f"{job.files} files, {job.infected} infected, {job.errors} errors (clamscan)"
@@ -0,0 +1,201 @@
+"""Structured journal of remediation actions.
+
+Records are JSON lines (``{"ts", "path", "signature", "action", ...}``)
+appended in batches: ``record`` only buffers, and the buffer is written
+(and optionally fsynced) once it holds ``batch_size`` records or is
+``flush_interval`` seconds old, so a storm of thousands of actions costs
+a handful of writes. Files rotate by size and age to ``path.1`` ...
+``path.N``. Each file has a ``.idx`` sidecar with one ``ts offset`` line
+per batch, which lets readers seek straight to a time range.
+"""
+from __future__ import annotations
+import atexit, json, os, threading, time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_JOURNAL = "/var/log/clamav/anomalies.jsonl"
+FALLBACK_JOURNAL = os.path.join(os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state")),
+                                "clamui", "anomalies.jsonl")
+
+@dataclass(frozen=True)
+class ActionRecord:
+    ts: float
+    path: str
+    signature: str
+    action: str
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+    def label(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ts))
+        return f"{when}  {self.action.upper():<10}  {self.path}  [{self.signature}]"
+
+def _index_path(path: str) -> str:
+    return path + ".idx"
+
+class ActionJournal:
+    """Buffered, rotating JSONL writer. Thread safe; call ``close`` on exit."""
+
+    def __init__(self, path: str = DEFAULT_JOURNAL, max_bytes: int = 8 << 20,
+                 max_age: float = 7 * 86400, backups: int = 5, batch_size: int = 256,
+                 flush_interval: float = 1.0, fsync: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buf: List[str] = []
+        self._first_ts = 0.0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atexit.register(self.close)
+
+    def record(self, path: str, signature: str, action: str, ts: Optional[float] = None, **detail):
+        ts = time.time() if ts is None else ts
+        rec = {"ts": round(ts, 6), "path": path, "signature": signature, "action": action}
+        if detail:
+            rec["detail"] = detail
+        line = json.dumps(rec, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._buf:
+                self._first_ts = ts
+            self._buf.append(line)
+            if len(self._buf) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buf:
+            return
+        data = "".join(self._buf).encode("utf-8")
+        self._maybe_rotate(len(data))
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            offset = os.fstat(fd).st_size
+            os.write(fd, data)
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        with open(_index_path(self.path), "a") as idx:
+            idx.write(f"{self._first_ts:.6f} {offset}\n")
+        self._buf = []
+
+    def _maybe_rotate(self, incoming: int):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        first = _first_indexed(self.path)
+        too_old = first is not None and time.time() - first > self.max_age
+        if st.st_size + incoming <= self.max_bytes and not too_old:
+            return
+        if self.backups <= 0:
+            # No generations to keep: start over instead of leaving an unpruned .1.
+            for name in (self.path, _index_path(self.path)):
+                try:
+                    os.unlink(name)
+                except FileNotFoundError:
+                    pass
+            return
+        for i in range(self.backups - 1, 0, -1):
+            for suffix in ("", ".idx"):
+                src = f"{self.path}.{i}{suffix}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}{suffix}")
+        os.replace(self.path, f"{self.path}.1")
+        if os.path.exists(_index_path(self.path)):
+            os.replace(_index_path(self.path), _index_path(f"{self.path}.1"))
+
+def _read_index(path: str) -> List[Tuple[float, int]]:
+    try:
+        with open(_index_path(path)) as fh:
+            return [(float(ts), int(off)) for ts, off in (l.split() for l in fh if l.strip())]
+    except (OSError, ValueError):
+        return []
+
+def _first_indexed(path: str) -> Optional[float]:
+    try:
+        with open(_index_path(path)) as fh:
+            return float(fh.readline().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+def writable_journal(path: str = DEFAULT_JOURNAL) -> str:
+    """``path`` if its directory is writable, else the per-user journal."""
+    return path if os.access(os.path.dirname(path) or ".", os.W_OK) else FALLBACK_JOURNAL
+
+def readable_journal(path: str = DEFAULT_JOURNAL) -> str:
+    return path if os.path.exists(path) else FALLBACK_JOURNAL
+
+def journal_files(path: str) -> List[str]:
+    """Journal generations, newest first."""
+    out = [path] if os.path.exists(path) else []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        out.append(f"{path}.{i}"); i += 1
+    return out
+
+def _read_segment(path: str, start: int, end: int) -> List[ActionRecord]:
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    out = []
+    for raw in data.splitlines():
+        try:
+            d = json.loads(raw)
+            out.append(ActionRecord(d["ts"], d["path"], d["signature"], d["action"], d.get("detail", {})))
+        except (ValueError, KeyError, TypeError):
+            continue                    # torn or foreign line
+    return out
+
+def query_journal(path: str, since: Optional[float] = None, until: Optional[float] = None,
+                  query: str = "", action: Optional[str] = None, limit: int = 200) -> List[ActionRecord]:
+    """Newest-first records in ``[since, until]`` matching a path or signature prefix.
+
+    Files are read backwards one indexed batch at a time, so a page of
+    recent history costs a few batches, and batches outside the time range
+    are never read.
+    """
+    out: List[ActionRecord] = []
+    for f in journal_files(path):
+        try:
+            size = os.path.getsize(f)
+        except OSError:
+            continue
+        idx = [(ts, off) for ts, off in _read_index(f) if off < size]
+        if not idx or idx[0][1] != 0:
+            idx.insert(0, (0.0, 0))     # unindexed head, e.g. a hand-written file
+        bounds = [off for _, off in idx] + [size]
+        for i in range(len(idx) - 1, -1, -1):
+            batch_ts = idx[i][0]
+            if until is not None and batch_ts > until:
+                continue
+            for rec in reversed(_read_segment(f, bounds[i], bounds[i + 1])):
+                if (since is not None and rec.ts < since) or (until is not None and rec.ts > until):
+                    continue
+                if action and rec.action != action:
+                    continue
+                if query and not (rec.path if query.startswith("/") else rec.signature).startswith(query):
+                    continue
+                out.append(rec)
+                if len(out) >= limit:
+                    return out
+            if since is not None and batch_ts < since:
+                return out              # everything older is before ``since``
+    return out
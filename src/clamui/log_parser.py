@@ -1,63 +1,212 @@
 from __future__ import annotations
-import re, time
+import os, re, time
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List, Iterable
 
-INFECTED_PATTERN = re.compile(r"^.*->\s+([^:]+):.*FOUND$")
+from .tracing import traced
 
-import re
+DETECTION_PATTERN = re.compile(
+    r"^(?:(\w{3} \w{3} +\d+ \d{2}:\d{2}:\d{2} \d{4}) -> )?(.+): (\S+) FOUND$")
 
-def parse_freshclam_log(log_text):
-    summary = {
-        'last_update': '',
-        'components': {}
-    }
-    summary_str = []
-    
-    update_time_pattern = r'^(\w+ \w+ \s*\d+ \d{2}:\d{2}:\d{2} \d{4}) -> ClamAV update process started'
-    component_pattern = r'-> (\w+\.\w+) database is (up-to-date|outdated) \(version: (\d+), sigs: ([\d,]+), f-level: (\d+), builder: (\w+)\)'
-    
-    reversed_lines = list(reversed(log_text))
-    
-    component_log = reversed_lines[0:3]
-    
-    for i, line in enumerate(reversed_lines[3:]):
-        update_time_match = re.search(update_time_pattern, line)
-        if update_time_match:
-            summary_str.append(f"<b>UPDATER:</b> FreshClam")
-            summary_str.append(f"<b>LAST UPDATE:</b> {update_time_match.group(1)}")
-            break
+UPDATE_TIME_PATTERN = re.compile(
+    r'^(\w+ \w+ \s*\d+ \d{2}:\d{2}:\d{2} \d{4}) -> ClamAV update process started')
+COMPONENT_PATTERN = re.compile(
+    r'-> (\w+\.\w+) (?:database is )?(up-to-date|outdated|updated) \(version: (\d+), '
+    r'sigs: ([\d,]+), f-level: (\d+), builder: (\w+)\)')
+UPDATE_MARKER = b"ClamAV update process started"
+REVERSE_CHUNK = 64 * 1024
+MAX_REVERSE_BYTES = 4 << 20
+
+@dataclass(frozen=True)
+class ComponentInfo:
+    status: str
+    version: int
+    sigs: int
+    f_level: int
+    builder: str
+
+@dataclass(frozen=True)
+class FreshclamSummary:
+    last_update: str = ""
+    components: Dict[str, ComponentInfo] = field(default_factory=dict)
+
+def summarize_freshclam_lines(lines: Iterable[str]) -> FreshclamSummary:
+    """Summarize the last update block found in ``lines`` (oldest first)."""
+    last_update = ""
+    block: List[str] = []
+    for line in lines:
+        m = UPDATE_TIME_PATTERN.match(line)
+        if m:
+            last_update = m.group(1)
+            block = []
         else:
-            component_log.append(line)
-    
-    # Find all component statuses
-    component_matches = re.findall(component_pattern, "\n".join(component_log))
-    
-    for match in component_matches:
-        component_name, status, version, _signatures, _f_level, _builder = match
-        summary['components'][component_name] = {
-            'status': status,
-            'version': version,
-        }
-        
-    if summary['components']:
-        summary_str.append("\n<b>COMPONENTS:</b>")
-        for component, details in summary['components'].items():
-            status_icon = "✅ " if details['status'] == 'up-to-date' else "❌"
-            summary_str.append(f"{status_icon} {component}  (Version: {details['version']})")
+            block.append(line)
+    components: Dict[str, ComponentInfo] = {}
+    for line in block:
+        m = COMPONENT_PATTERN.search(line)
+        if m:
+            name, status, version, sigs, f_level, builder = m.groups()
+            components[name] = ComponentInfo(status, int(version), int(sigs.replace(",", "")),
+                                             int(f_level), builder)
+    return FreshclamSummary(last_update, components)
 
-    if len(summary_str) == 0:             
+def read_last_update_block(path: str, chunk_size: int = REVERSE_CHUNK,
+                           max_bytes: int = MAX_REVERSE_BYTES) -> List[str]:
+    """Read ``path`` backwards from EOF up to the most recent update marker.
+
+    Returns the lines from the marker to the end of the file. Reading stops
+    at ``max_bytes`` if no marker is found, so the cost does not grow with
+    the length of the log's history.
+    """
+    with open(path, "rb") as fh:
+        pos = fh.seek(0, 2)
+        buf = b""
+        while pos > 0 and len(buf) < max_bytes:
+            step = min(chunk_size, pos)
+            pos -= step
+            fh.seek(pos)
+            buf = fh.read(step) + buf
+            idx = buf.rfind(UPDATE_MARKER)
+            if idx >= 0:
+                start = buf.rfind(b"\n", 0, idx) + 1
+                if start > 0 or pos == 0:
+                    buf = buf[start:]
+                    break
+        else:
+            if pos > 0:
+                buf = buf[buf.find(b"\n") + 1:]    # drop the partial first line
+    return buf.decode("utf-8", "ignore").splitlines()
+
+_freshclam_cache: Dict[str, Tuple[Tuple[int, int, int], FreshclamSummary]] = {}
+
+@traced("parse_freshclam_file")
+def parse_freshclam_file(path: str) -> FreshclamSummary:
+    """Summary of the last freshclam update, cached by inode and file size."""
+    st = os.stat(path)
+    key = (st.st_dev, st.st_ino, st.st_size)
+    cached = _freshclam_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    summary = summarize_freshclam_lines(read_last_update_block(path))
+    _freshclam_cache[path] = (key, summary)
+    return summary
+
+def format_freshclam_summary(summary: FreshclamSummary) -> List[str]:
+    """Render a summary as the markup lines shown in the SYSTEM card."""
+    summary_str = []
+    if summary.last_update:
+        summary_str.append(f"<b>UPDATER:</b> FreshClam")
+        summary_str.append(f"<b>LAST UPDATE:</b> {summary.last_update}")
+    if summary.components:
+        summary_str.append("\n<b>COMPONENTS:</b>")
+        for component, details in summary.components.items():
+            status_icon = "✅ " if details.status != 'outdated' else "❌"
+            summary_str.append(f"{status_icon} {component}  (Version: {details.version})")
+    if len(summary_str) == 0:
         summary_str.append("Last Update: Not found in log")
-        
     return summary_str
 
+def parse_freshclam_log(log_text: Iterable[str]) -> List[str]:
+    """Markup summary of the last update block in freshclam log lines."""
+    return format_freshclam_summary(summarize_freshclam_lines(log_text))
 
-def parse_infected_files_from_text(text: str) -> List[str]:
-    """Parse infected file paths from clamdscan output text."""
-    infected: List[str] = []
-    for line in text.splitlines():
-        m = INFECTED_PATTERN.match(line.strip())
+
+class DetectionRecord:
+    """One FOUND line from a clamd log: timestamp, path and signature."""
+    __slots__ = ("ts", "path", "signature")
+
+    def __init__(self, ts: float, path: str, signature: str):
+        self.ts = ts; self.path = path; self.signature = signature
+
+    def __iter__(self):
+        return iter((self.ts, self.path, self.signature))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DetectionRecord) and tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        return f"DetectionRecord({self.ts!r}, {self.path!r}, {self.signature!r})"
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+def _stamp_to_ts(stamp: str, memo: Dict[str, float]) -> float:
+    """Convert a clamd LogTime stamp; detections come in bursts, so memoize."""
+    ts = memo.get(stamp)
+    if ts is None:
+        try:
+            _dow, mon, day, hms, year = stamp.split()
+            h, m, s = hms.split(":")
+            ts = datetime(int(year), _MONTHS[mon], int(day), int(h), int(m), int(s)).timestamp()
+        except (ValueError, KeyError):
+            ts = time.time()
+        if len(memo) > 4096:
+            memo.clear()
+        memo[stamp] = ts
+    return ts
+
+def _record(m: "re.Match", memo: Dict[str, float], now: float) -> DetectionRecord:
+    stamp, path, sig = m.groups()
+    return DetectionRecord(_stamp_to_ts(stamp, memo) if stamp else now, path, sig)
+
+@traced("parse_detections")
+def parse_detections(lines: Iterable[str]) -> List[DetectionRecord]:
+    """Parse detection records from clamd log lines.
+
+    Lines are pre-filtered with a substring test so the regex only runs on
+    FOUND lines. Lines without a LogTime prefix are stamped with the
+    current time.
+    """
+    out: List[DetectionRecord] = []
+    memo: Dict[str, float] = {}
+    now = time.time()
+    match = DETECTION_PATTERN.match
+    for line in lines:
+        if "FOUND" not in line:
+            continue
+        m = match(line.rstrip())
         if m:
-            infected.append(m.group(1))
-    return infected
+            out.append(_record(m, memo, now))
+    return out
+
+@traced("parse_detection_buffer")
+def parse_detection_buffer(buf, offset: int = 0, stamped_only: bool = False,
+                           end: Optional[int] = None) -> List[DetectionRecord]:
+    """Parse detection records from a bytes-like buffer (bytes, mmap, ...).
+
+    Scans for ``FOUND`` line endings with ``find`` and decodes only those
+    lines, so the cost on a mostly clean log is close to a memory scan.
+    With ``stamped_only``, lines without a LogTime prefix are skipped
+    instead of being stamped with the current time. ``end`` limits the scan
+    to whole lines before that offset.
+    """
+    out: List[DetectionRecord] = []
+    memo: Dict[str, float] = {}
+    now = time.time()
+    match = DETECTION_PATTERN.match
+    find, rfind = buf.find, buf.rfind
+    limit = len(buf) if end is None else end
+    pos = find(b" FOUND", offset, limit)
+    while pos >= 0:
+        eol = find(b"\n", pos, limit)
+        if eol < 0:
+            eol = limit
+        start = max(rfind(b"\n", offset, pos) + 1, offset)
+        m = match(buf[start:eol].decode("utf-8", "replace").rstrip())
+        if m and (m.group(1) or not stamped_only):
+            out.append(_record(m, memo, now))
+        pos = find(b" FOUND", eol, limit)
+    return out
+
+def parse_detection_file(path: str, offset: int = 0, stamped_only: bool = False,
+                         end: Optional[int] = None) -> List[DetectionRecord]:
+    """Memory-map ``path`` and parse detections from ``offset`` onwards (up to ``end``)."""
+    import mmap
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size <= offset:
+            return []
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_detection_buffer(mm, offset, stamped_only, end)
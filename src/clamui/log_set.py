@@ -0,0 +1,141 @@
+"""Detections from the rotated generations of a log.
+
+logrotate leaves ``clamd.log.1``, ``clamd.log.2.gz``, ... (or dateext
+names such as ``clamd.log-20240101.xz``) next to the live file.
+``LogSet`` finds them, streams compressed ones through the matching
+decompressor in fixed-size chunks, and remembers each generation by
+``(dev, inode)`` and the size it had when parsed, so a generation is read
+once rather than on every refresh.
+
+Compressing a generation gives it a new inode, so it is read once more.
+Stamped detections are deduplicated by the history store; lines without a
+LogTime stamp cannot be, as they are dated when parsed, so rotated
+generations skip them. The live file's tail has recorded those already.
+"""
+from __future__ import annotations
+import importlib, json, os, re
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .log_parser import DetectionRecord, parse_detection_buffer, parse_detection_file
+
+READ_CHUNK = 1 << 20
+# Decompressor modules by extension, imported on first use.
+_OPENERS: Dict[str, str] = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma", ".bz2": "bz2"}
+
+def rotated_logs(path: str) -> List[str]:
+    """Rotated generations of ``path``, oldest first."""
+    directory, base = os.path.split(os.path.abspath(path))
+    pattern = re.compile(re.escape(base) + r"[.-][\d-]+(?:\.(?:gz|xz|lzma|bz2))?$")
+    out = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if pattern.match(entry.name) and entry.is_file(follow_symlinks=False):
+                    out.append((entry.stat().st_mtime, entry.path))
+    except OSError:
+        return []
+    return [p for _mtime, p in sorted(out)]
+
+def open_log(path: str) -> BinaryIO:
+    """``path`` opened for binary reading, decompressing by extension."""
+    module = _OPENERS.get(os.path.splitext(path)[1])
+    return importlib.import_module(module).open(path, "rb") if module else open(path, "rb")
+
+def iter_detections(path: str, offset: int = 0,
+                    stamped_only: bool = False) -> Iterator[List[DetectionRecord]]:
+    """Detections in ``path`` as chunk-sized lists, in constant memory.
+
+    Plain files are memory-mapped from ``offset``; compressed ones are
+    decompressed a chunk at a time and always read from the start.
+    ``stamped_only`` skips lines without a LogTime stamp.
+    """
+    if os.path.splitext(path)[1] not in _OPENERS:
+        yield parse_detection_file(path, offset, stamped_only)
+        return
+    partial = b""
+    with open_log(path) as fh:
+        while True:
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                break
+            buf = partial + chunk
+            cut = buf.rfind(b"\n") + 1
+            partial = buf[cut:]
+            yield parse_detection_buffer(buf[:cut], stamped_only=stamped_only)
+    if partial:
+        yield parse_detection_buffer(partial, stamped_only=stamped_only)
+
+def _lzma_error() -> type:
+    import lzma
+    return lzma.LZMAError
+
+class LogSet:
+    """Tracks which rotated generations of a log have been parsed.
+
+    ``seen`` maps ``"dev:ino"`` to the number of bytes already parsed (the
+    file size, for compressed generations). The live file's position can be
+    recorded with ``mark``, so when it is rotated to ``.1`` only the lines
+    written after the last poll are read.
+    """
+
+    def __init__(self, path: str, seen: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.seen: Dict[str, int] = dict(seen or {})
+
+    @classmethod
+    def from_json(cls, path: str, data: Optional[str]) -> "LogSet":
+        try:
+            seen = {str(k): int(v) for k, v in json.loads(data).items()} if data else {}
+        except (ValueError, TypeError, AttributeError):
+            seen = {}
+        return cls(path, seen)
+
+    def to_json(self) -> str:
+        return json.dumps(self.seen, separators=(",", ":"))
+
+    def mark(self, dev: int, ino: int, offset: int):
+        self.seen[f"{dev}:{ino}"] = offset
+
+    def pending(self) -> List[Tuple[str, str, int, int]]:
+        """``(path, key, start, size)`` of generations with unparsed bytes, oldest first."""
+        out = []
+        for p in rotated_logs(self.path):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            key = f"{st.st_dev}:{st.st_ino}"
+            done = self.seen.get(key, -1)
+            if done >= st.st_size:
+                continue
+            compressed = os.path.splitext(p)[1] in _OPENERS
+            out.append((p, key, 0 if compressed or done < 0 else done, st.st_size))
+        return out
+
+    def ingest(self, sink: Callable[[List[DetectionRecord]], None]) -> int:
+        """Parse every pending generation into ``sink``; returns how many files were read.
+
+        A generation that fails to decompress (e.g. still being written by
+        logrotate) is left pending and retried on the next call.
+        """
+        n = 0
+        live = set()
+        for p, key, start, size in self.pending():
+            try:
+                for records in iter_detections(p, start, stamped_only=True):
+                    if records:
+                        sink(records)
+            except (OSError, EOFError, _lzma_error()) as e:
+                print(f"Unable to read rotated log {p}: {e}")
+                continue
+            self.seen[key] = size
+            n += 1
+        # Forget generations that logrotate has deleted, but keep the live file.
+        for p in [self.path] + rotated_logs(self.path):
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            live.add(f"{st.st_dev}:{st.st_ino}")
+        self.seen = {k: v for k, v in self.seen.items() if k in live}
+        return n
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import os
+from collections import deque
+from typing import Deque, List, Optional, Tuple, BinaryIO
+
+READ_CHUNK = 1 << 20
+
+class LogTail:
+    """Incremental reader for an append-only log file.
+
+    Remembers the byte offset and inode of the file between polls so that
+    only newly appended bytes are read. Rotation (the path now points to a
+    different inode) and truncation (the file shrank below our offset) are
+    detected and restart reading from the beginning of the new file. The
+    last ``max_lines`` complete lines are kept in a bounded ring buffer.
+
+    When a file is opened, only its last ``backfill`` bytes are returned, so
+    the first poll of a large log stays small; ``skipped`` is the offset
+    where the returned lines start, for callers that need to account for
+    the rest in one pass of their own (e.g. ``parse_detection_file``).
+    """
+
+    def __init__(self, path: str, max_lines: int = 200, backfill: int = 64 * 1024):
+        self.path = path
+        self.backfill = backfill
+        self.skipped = 0
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self._fh: Optional[BinaryIO] = None
+        self._ident: Optional[Tuple[int, int]] = None
+        self._offset = 0
+        self._partial = b""
+        self.rotated: Optional[Tuple[int, int, int]] = None   # final state of the last rotated generation
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def state(self) -> Optional[Tuple[int, int, int]]:
+        """``(dev, inode, offset)`` of the last complete line read, for persisting."""
+        if self._ident is None:
+            return None
+        return (*self._ident, self._offset - len(self._partial))
+
+    def restore(self, state: Tuple[int, int, int], backfill: int = 64 * 1024) -> bool:
+        """Resume at a saved ``state`` if the file is still the same generation.
+
+        The ring buffer is refilled from up to ``backfill`` bytes before the
+        saved offset. Returns False (and leaves the tail unopened, so the
+        next poll starts from scratch) when the file was rotated or truncated.
+        """
+        dev, ino, offset = state
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if (st.st_dev, st.st_ino) != (dev, ino) or st.st_size < offset:
+            return False
+        if not self._open():
+            return False
+        start = max(0, offset - backfill)
+        self._fh.seek(start)
+        head = self._fh.read(offset - start).split(b"\n")
+        if start > 0:
+            head = head[1:]             # first piece is a partial line
+        self.lines.extend(p.decode("utf-8", "ignore").rstrip("\r") for p in head[:-1])
+        self._offset = offset
+        return True
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+        self._fh = None; self._ident = None
+        self._offset = 0; self._partial = b""
+
+    def _open(self) -> bool:
+        try:
+            fh = open(self.path, "rb")
+        except OSError:
+            return False
+        st = os.fstat(fh.fileno())
+        self._fh = fh; self._ident = (st.st_dev, st.st_ino)
+        self._offset = 0; self._partial = b""
+        return True
+
+    def _seek_tail(self):
+        """Start at the first whole line within ``backfill`` bytes of EOF."""
+        size = os.fstat(self._fh.fileno()).st_size
+        start = max(0, size - self.backfill)
+        if start > 0:
+            self._fh.seek(start - 1)
+            nl = self._fh.read(self.backfill + 1).find(b"\n")
+            start = size if nl < 0 else start + nl
+        self._offset = self.skipped = start
+
+    def _drain(self) -> List[str]:
+        """Read everything between our offset and EOF of the open handle."""
+        assert self._fh is not None
+        self._fh.seek(self._offset)
+        out: List[str] = []
+        while True:
+            chunk = self._fh.read(READ_CHUNK)
+            if not chunk:
+                break
+            self._offset += len(chunk)
+            parts = (self._partial + chunk).split(b"\n")
+            self._partial = parts.pop()
+            out.extend(p.decode("utf-8", "ignore").rstrip("\r") for p in parts)
+        self.lines.extend(out)
+        return out
+
+    def poll(self) -> Tuple[bool, List[str]]:
+        """Return ``(reset, new_lines)`` for what was appended since the last poll.
+
+        ``reset`` is True when the file was (re)opened, i.e. on the first
+        poll and after rotation or truncation; callers that keep derived
+        state should drop it before applying ``new_lines``, and account for
+        the ``skipped`` bytes before them. After a rotation ``new_lines``
+        starts with what was still unread in the old generation.
+        """
+        reset = False
+        tail: List[str] = []
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+
+        if self._fh is not None and st is not None and (st.st_dev, st.st_ino) != self._ident:
+            # Rotated: finish the old generation, whose handle is still valid,
+            # then follow the new file from its start.
+            tail = self._drain()
+            if self._partial:
+                tail.append(self._partial.decode("utf-8", "ignore").rstrip("\r"))
+            self.rotated = (*self._ident, self._offset)
+            self.close()
+        elif self._fh is not None and os.fstat(self._fh.fileno()).st_size < self._offset:
+            # Truncated in place (copytruncate).
+            self._offset = self.skipped = 0; self._partial = b""
+            reset = True
+
+        if self._fh is None:
+            if st is None or not self._open():
+                return reset, tail
+            self._seek_tail()
+            reset = True
+
+        if reset:
+            self.lines.clear()
+        return reset, tail + self._drain()
@@ -0,0 +1,233 @@
+"""OpenMetrics export of ClamAV health and scan performance.
+
+Values are updated incrementally as the collector ingests new log lines,
+as new rows reach the detection history and as scans report batches; a scrape only renders the current values
+(and reuses the previous rendering when nothing changed), so scraping is
+cheap regardless of log size or scrape rate.
+"""
+from __future__ import annotations
+import bisect, os, threading, time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .dbinfo import ClamavMetadata
+from .detections import DetectionStore
+from .log_parser import FreshclamSummary
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SCAN_DURATION_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 4 * 3600, 12 * 3600)
+FILE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+MAX_SIGNATURE_SERIES = 1000
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+def _component(filename: str) -> str:
+    """``daily.cld`` and ``daily.cvd`` are the same component."""
+    return filename.split(".")[0]
+
+class Histogram:
+    """Cumulative-bucket histogram with O(log buckets) observations."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)      # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, n: int = 1):
+        self.counts[bisect.bisect_left(self.bounds, value)] += n
+        self.sum += value * n
+        self.count += n
+
+    def render(self, name: str) -> List[str]:
+        out, acc = [], 0
+        for bound, c in zip(self.bounds + (float("inf"),), self.counts):
+            acc += c
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            out.append(f'{name}_bucket{{le="{le}"}} {acc}')
+        out.append(f"{name}_count {self.count}")
+        out.append(f"{name}_sum {self.sum}")
+        return out
+
+class ClamavMetrics:
+    """Thread-safe metric state fed by the collector and the scan engine."""
+
+    def __init__(self, history: Optional[DetectionStore] = None):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._rendered: Dict[bool, Tuple[int, str, float]] = {}
+        self.daemon_up = 0
+        self.current_log_detections = 0
+        self.detections: Dict[str, int] = {}
+        self._last_detection_id = 0
+        self.components: Dict[str, Tuple[int, int, int]] = {}      # name -> (version, sigs, build stime)
+        self.last_update = 0.0
+        self.scan_files = 0
+        self.scan_bytes = 0
+        self.scans = 0
+        self.scan_duration = Histogram(SCAN_DURATION_BUCKETS)
+        self.file_latency = Histogram(FILE_LATENCY_BUCKETS)
+        if history is not None:
+            self.sync_detections(history)
+
+    def _changed(self):
+        self._version += 1
+
+    # updates
+
+    def set_daemon(self, up: bool, current_log_detections: int):
+        with self._lock:
+            if (self.daemon_up, self.current_log_detections) != (int(up), current_log_detections):
+                self.daemon_up, self.current_log_detections = int(up), current_log_detections
+                self._changed()
+
+    def sync_detections(self, history: DetectionStore):
+        """Count the rows added to ``history`` since the last call, from any source.
+
+        The first call seeds the counters. Signatures beyond
+        ``MAX_SIGNATURE_SERIES`` are counted under ``other``.
+        """
+        last, counts = history.counts_since(self._last_detection_id)
+        if not counts:
+            return
+        with self._lock:
+            self._last_detection_id = last
+            for sig, n in counts:
+                if sig not in self.detections and len(self.detections) >= MAX_SIGNATURE_SERIES:
+                    sig = "other"
+                self.detections[sig] = self.detections.get(sig, 0) + n
+            self._changed()
+
+    def set_database(self, meta: ClamavMetadata):
+        """Versions, signature counts and build times from the CVD headers."""
+        comps = {_component(c.name): (c.version, c.sigs, c.stime) for c in meta.components.values()}
+        with self._lock:
+            if comps != self.components:
+                self.components = comps
+                self._changed()
+
+    def set_freshclam(self, summary: FreshclamSummary):
+        """Last update time; versions freshclam reported fill in until headers are read."""
+        try:
+            ts = datetime.strptime(" ".join(summary.last_update.split()), "%a %b %d %H:%M:%S %Y").timestamp()
+        except ValueError:
+            ts = 0.0
+        with self._lock:
+            comps = dict(self.components)
+            for name, c in summary.components.items():
+                old = comps.get(_component(name))
+                if old is None or old[0] < c.version:
+                    comps[_component(name)] = (c.version, c.sigs, 0)
+            if ts != self.last_update or comps != self.components:
+                self.last_update, self.components = ts, comps
+                self._changed()
+
+    def observe_batch(self, files: int, nbytes: int, seconds: float):
+        with self._lock:
+            self.scan_files += files
+            self.scan_bytes += nbytes
+            self.file_latency.observe(seconds / max(files, 1), files)
+            self._changed()
+
+    def observe_scan(self, seconds: float):
+        with self._lock:
+            self.scans += 1
+            self.scan_duration.observe(seconds)
+            self._changed()
+
+    # rendering
+
+    def render(self, openmetrics: bool = True) -> str:
+        """Exposition text; counters are typed per the chosen format."""
+        with self._lock:
+            cached = self._rendered.get(openmetrics)
+            # Ages move with the clock, so cached text is only reused briefly.
+            if cached and cached[0] == self._version and time.time() - cached[2] < 1.0:
+                return cached[1]
+            text = self._render(openmetrics)
+            self._rendered[openmetrics] = (self._version, text, time.time())
+            return text
+
+    def _render(self, openmetrics: bool) -> str:
+        now = time.time()
+        out: List[str] = []
+        def family(name: str, kind: str, help_: str, samples: List[str]):
+            type_name = name if openmetrics or kind != "counter" else name + "_total"
+            out.append(f"# HELP {type_name} {help_}")
+            out.append(f"# TYPE {type_name} {kind}")
+            out.extend(samples)
+
+        family("clamav_daemon_up", "gauge", "Whether clamd is running.",
+               [f"clamav_daemon_up {self.daemon_up}"])
+        family("clamav_current_log_detections", "gauge", "Detections in the current clamd.log generation.",
+               [f"clamav_current_log_detections {self.current_log_detections}"])
+        family("clamav_detections", "counter", "Detections recorded, by signature.",
+               [f"clamav_detections_total{_labels(signature=sig)} {n}"
+                for sig, n in sorted(self.detections.items())])
+        family("clamav_database_version", "gauge", "Signature database version per component.",
+               [f"clamav_database_version{_labels(component=c)} {v[0]}" for c, v in sorted(self.components.items())])
+        family("clamav_database_signatures", "gauge", "Signatures per database component.",
+               [f"clamav_database_signatures{_labels(component=c)} {v[1]}" for c, v in sorted(self.components.items())])
+        family("clamav_database_age_seconds", "gauge", "Age of each database component build.",
+               [f"clamav_database_age_seconds{_labels(component=c)} {int(now - v[2])}"
+                for c, v in sorted(self.components.items()) if v[2]])
+        if self.last_update:
+            family("clamav_last_update_timestamp_seconds", "gauge", "Start of the last freshclam run.",
+                   [f"clamav_last_update_timestamp_seconds {self.last_update}"])
+        family("clamui_scanned_files", "counter", "Files scanned by clamui.",
+               [f"clamui_scanned_files_total {self.scan_files}"])
+        family("clamui_scanned_bytes", "counter", "Bytes scanned by clamui.",
+               [f"clamui_scanned_bytes_total {self.scan_bytes}"])
+        family("clamui_scan_duration_seconds", "histogram", "Wall time of complete scans.",
+               self.scan_duration.render("clamui_scan_duration_seconds"))
+        family("clamui_scan_file_latency_seconds", "histogram", "Per-file scan latency, averaged per batch.",
+               self.file_latency.render("clamui_scan_file_latency_seconds"))
+        if openmetrics:
+            out.append("# EOF")
+        return "\n".join(out) + "\n"
+
+# exporters
+
+def serve_http(metrics: ClamavMetrics, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread; returns the server for shutdown()."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            om = "application/openmetrics-text" in self.headers.get("Accept", "")
+            body = metrics.render(openmetrics=om).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_TYPE if om else PROMETHEUS_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="clamui-metrics", daemon=True).start()
+    return server
+
+def write_textfile(metrics: ClamavMetrics, path: str):
+    """Atomically write Prometheus text format for node_exporter's textfile collector."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(metrics.render(openmetrics=False))
+    os.replace(tmp, path)
+
+def parse_listen(value: str) -> Tuple[str, int]:
+    """``HOST:PORT`` or ``PORT``; binds to localhost unless told otherwise."""
+    host, _, port = value.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
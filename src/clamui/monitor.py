@@ -0,0 +1,57 @@
+from __future__ import annotations
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+from typing import Callable, Iterable, List, Optional
+
+WATCHED_EVENTS = {
+    Gio.FileMonitorEvent.CHANGED,
+    Gio.FileMonitorEvent.CREATED,
+    Gio.FileMonitorEvent.DELETED,
+    Gio.FileMonitorEvent.MOVED_IN,
+    Gio.FileMonitorEvent.MOVED_OUT,
+    Gio.FileMonitorEvent.RENAMED,
+}
+
+class DebouncedFileMonitor:
+    """Watch a set of files and call ``callback`` after activity settles.
+
+    Events are coalesced: the callback fires ``debounce_ms`` after the first
+    event of a burst, and never more often than once per ``min_interval_ms``.
+    Nothing runs while the files are idle, so there is no polling cost.
+    """
+
+    def __init__(self, paths: Iterable[str], callback: Callable[[], None],
+                 debounce_ms: int = 250, min_interval_ms: int = 1000):
+        self.callback = callback
+        self.debounce_ms = debounce_ms
+        self.min_interval_ms = min_interval_ms
+        self._source: Optional[int] = None
+        self._last_fire_us = 0
+        self._monitors: List[Gio.FileMonitor] = []
+        for path in paths:
+            mon = Gio.File.new_for_path(path).monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+            mon.set_rate_limit(self.debounce_ms)
+            mon.connect("changed", self._on_changed)
+            self._monitors.append(mon)
+
+    def cancel(self):
+        for mon in self._monitors:
+            mon.cancel()
+        self._monitors.clear()
+        if self._source is not None:
+            GLib.source_remove(self._source)
+            self._source = None
+
+    def _on_changed(self, _mon, _file, _other, event):
+        if event not in WATCHED_EVENTS or self._source is not None:
+            return
+        since_ms = (GLib.get_monotonic_time() - self._last_fire_us) // 1000
+        delay = max(self.debounce_ms, self.min_interval_ms - since_ms)
+        self._source = GLib.timeout_add(delay, self._fire)
+
+    def _fire(self) -> bool:
+        self._source = None
+        self._last_fire_us = GLib.get_monotonic_time()
+        self.callback()
+        return False
@@ -0,0 +1,252 @@
+"""Content-addressed quarantine with an indexed catalog.
+
+Files are stored once per SHA-256 under ``objects/ab/cdef...`` and
+described by rows in ``catalog.sqlite`` (original path, mode, owner,
+signature, time), so quarantining the same payload twice costs one
+catalog row. On the quarantine's filesystem a file is moved in with a
+rename before it is hashed, which is both O(1) and isolates it from
+further writes (it is renamed back if hashing fails); from other filesystems (or with compression) it is
+copied and hashed in a single pass.
+"""
+from __future__ import annotations
+import gzip, hashlib, os, shutil, sqlite3, stat, tempfile, threading, time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .detections import _prefix_range
+
+DEFAULT_QUARANTINE = "/var/lib/clamav/quarantine"
+CHUNK = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mode INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    gid INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_path ON entries (path, ts);
+CREATE INDEX IF NOT EXISTS entries_sig ON entries (signature, ts);
+CREATE INDEX IF NOT EXISTS entries_sha ON entries (sha256);
+CREATE TABLE IF NOT EXISTS objects (sha256 TEXT PRIMARY KEY, compressed INTEGER NOT NULL);
+"""
+
+class QuarantineError(OSError):
+    """Raised for requests the quarantine refuses, e.g. restoring over an existing file."""
+
+@dataclass(frozen=True)
+class QuarantineEntry:
+    id: int
+    sha256: str
+    path: str
+    mode: int
+    uid: int
+    gid: int
+    size: int
+    signature: str
+    ts: float
+
+    def label(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ts))
+        return f"#{self.id}  {when}  {self.path}  [{self.signature}]  {self.size} B"
+
+_COLUMNS = "id, sha256, path, mode, uid, gid, size, signature, ts"
+
+class QuarantineStore:
+    """Deduplicating quarantine directory. Thread safe."""
+
+    def __init__(self, root: str = DEFAULT_QUARANTINE, compress: bool = False):
+        self.root = root
+        self.compress = compress
+        self.objects = os.path.join(root, "objects")
+        self.tmp = os.path.join(root, "tmp")
+        for d in (self.objects, self.tmp):
+            os.makedirs(d, mode=0o700, exist_ok=True)
+        self.dev = os.stat(root).st_dev
+        self._db = sqlite3.connect(os.path.join(root, "catalog.sqlite"), check_same_thread=False,
+                                   isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self.tmp, f"{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}")
+
+    # quarantine
+
+    def add(self, path: str, signature: str) -> QuarantineEntry:
+        """Move ``path`` into quarantine; raises OSError if it cannot be read or removed."""
+        st = os.lstat(path)
+        if not stat.S_ISREG(st.st_mode):
+            raise QuarantineError(f"Not a regular file: {path}")
+        tmp = self._tmp_path()
+        compressed = False
+        if st.st_dev == self.dev and not self.compress:
+            os.rename(path, tmp)
+            try:
+                digest = self._hash(tmp)
+            except BaseException:
+                os.rename(tmp, path)            # leave the file where it was
+                raise
+        else:
+            try:
+                digest, compressed = self._copy_in(path, tmp), self.compress
+                os.unlink(path)
+            except BaseException:
+                try: os.unlink(tmp)             # don't leave a stray copy in the vault
+                except FileNotFoundError: pass
+                raise
+        os.chmod(tmp, 0o400)
+
+        obj = self._object_path(digest)
+        with self._lock:
+            row = self._db.execute("SELECT compressed FROM objects WHERE sha256 = ?", (digest,)).fetchone()
+            if row is not None and os.path.exists(obj):
+                os.unlink(tmp)                  # same payload already stored
+                compressed = bool(row[0])
+            else:
+                os.makedirs(os.path.dirname(obj), mode=0o700, exist_ok=True)
+                os.replace(tmp, obj)
+            self._db.execute("BEGIN")
+            self._db.execute("INSERT OR REPLACE INTO objects VALUES (?, ?)", (digest, int(compressed)))
+            cur = self._db.execute(
+                "INSERT INTO entries (sha256, path, mode, uid, gid, size, signature, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, os.path.abspath(path), stat.S_IMODE(st.st_mode), st.st_uid, st.st_gid,
+                 st.st_size, signature, time.time()))
+            self._db.execute("COMMIT")
+            row_id = cur.lastrowid
+        return self.get(row_id)
+
+    @staticmethod
+    def _hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _copy_in(self, src: str, dst: str) -> str:
+        """Copy ``src`` to ``dst`` (gzipped if configured), hashing the plain bytes."""
+        h = hashlib.sha256()
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(src, "rb") as fin, open(fd, "wb") as raw:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) if self.compress else raw
+            for chunk in iter(lambda: fin.read(CHUNK), b""):
+                h.update(chunk)
+                out.write(chunk)
+            if out is not raw:
+                out.close()
+        return h.hexdigest()
+
+    # catalog
+
+    def get(self, entry_id: int) -> Optional[QuarantineEntry]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM entries WHERE id = ?", (entry_id,)).fetchone()
+        return QuarantineEntry(*row) if row else None
+
+    @staticmethod
+    def _where(query: str) -> Tuple[str, tuple]:
+        """Filter on an original path prefix (``/...``), a SHA-256 prefix (``sha:``) or a signature prefix."""
+        if not query:
+            return "", ()
+        if query.startswith("sha:"):
+            clause, rng = _prefix_range("sha256", query[4:].lower())
+        else:
+            clause, rng = _prefix_range("path" if query.startswith("/") else "signature", query)
+        return " WHERE " + clause, rng
+
+    def list(self, offset: int = 0, limit: int = 200, query: str = "") -> List[QuarantineEntry]:
+        """One page of entries, newest first."""
+        where, args = self._where(query)
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM entries{where} ORDER BY ts DESC, id DESC "
+                                    f"LIMIT ? OFFSET ?", args + (limit, offset)).fetchall()
+        return [QuarantineEntry(*r) for r in rows]
+
+    def count(self, query: str = "") -> int:
+        where, args = self._where(query)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM entries{where}", args).fetchone()[0]
+
+    # restore / purge
+
+    def restore(self, entry_id: int, dest: Optional[str] = None, overwrite: bool = False) -> str:
+        """Write the file back to ``dest`` (default: its original path) and drop the entry."""
+        entry = self.get(entry_id)
+        if entry is None:
+            raise QuarantineError(f"No quarantine entry #{entry_id}")
+        dest = dest or entry.path
+        if os.path.lexists(dest) and not overwrite:
+            raise QuarantineError(f"Refusing to overwrite {dest}")
+        obj = self._object_path(entry.sha256)
+        with self._lock:
+            row = self._db.execute("SELECT compressed FROM objects WHERE sha256 = ?", (entry.sha256,)).fetchone()
+        compressed = bool(row and row[0])
+        directory = os.path.dirname(dest) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A fresh O_EXCL name in the destination directory: never a symlink
+        # planted in advance, and on the same filesystem for the final rename.
+        fd, tmp = tempfile.mkstemp(prefix=".clamui-restore-", dir=directory)
+        try:
+            with (gzip.open(obj, "rb") if compressed else open(obj, "rb")) as fin, open(fd, "wb") as fout:
+                shutil.copyfileobj(fin, fout, CHUNK)
+                if os.geteuid() == 0:
+                    os.fchown(fout.fileno(), entry.uid, entry.gid)     # chown clears setuid bits
+                os.fchmod(fout.fileno(), entry.mode)
+            os.replace(tmp, dest)
+        except BaseException:
+            try: os.unlink(tmp)
+            except FileNotFoundError: pass
+            raise
+        self._drop([entry_id])
+        return dest
+
+    def purge(self, entry_ids: Optional[List[int]] = None, older_than: Optional[float] = None) -> int:
+        """Delete entries by id and/or age; objects go once no entry refers to them."""
+        clauses, args = [], []
+        if entry_ids is not None:
+            clauses.append(f"id IN ({','.join('?' * len(entry_ids))})"); args += entry_ids
+        if older_than is not None:
+            clauses.append("ts < ?"); args.append(older_than)
+        if not clauses or entry_ids == []:
+            return 0
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                f"SELECT id FROM entries WHERE {' AND '.join(clauses)}", args).fetchall()]
+        return self._drop(ids)
+
+    def _drop(self, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            self._db.execute("BEGIN")
+            shas = [r[0] for r in self._db.execute(
+                f"SELECT DISTINCT sha256 FROM entries WHERE id IN ({marks})", ids).fetchall()]
+            self._db.execute(f"DELETE FROM entries WHERE id IN ({marks})", ids)
+            orphans = [s for s in shas if not self._db.execute(
+                "SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1", (s,)).fetchone()]
+            self._db.executemany("DELETE FROM objects WHERE sha256 = ?", [(s,) for s in orphans])
+            self._db.execute("COMMIT")
+        for s in orphans:
+            obj = self._object_path(s)
+            try: os.unlink(obj)
+            except FileNotFoundError: pass
+            try: os.rmdir(os.path.dirname(obj))
+            except OSError: pass            # still holds other objects
+        return len(ids)
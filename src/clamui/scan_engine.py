@@ -0,0 +1,331 @@
+from __future__ import annotations
+import os, queue, subprocess, tempfile, threading, time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .clamd import ClamdClient, ClamdError, ScanResult, parse_reply
+from .tracing import span
+from .verdict_cache import FileKey, VerdictCache, db_version_from_banner
+from .utils import kill_group, spawn_group
+from .walker import WalkFilter, WalkStats, scan_tree
+
+Batch = List[Tuple[str, int, FileKey]]
+
+@dataclass(frozen=True)
+class ScanStats:
+    """Progress counters for a running scan; immutable so it can cross threads."""
+    started: float
+    files: int = 0
+    bytes: int = 0
+    infected: int = 0
+    errors: int = 0
+    skipped: int = 0
+    failed_batches: int = 0         # batches with no usable verdict; they hold the checkpoint back
+    discovered_files: int = 0
+    discovered_bytes: int = 0
+    walk_done: bool = False
+    finished: bool = False
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started, 1e-6)
+
+    @property
+    def files_per_s(self) -> float:
+        return self.files / self.elapsed
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / self.elapsed / (1 << 20)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds left, known only once the walk has sized the whole tree."""
+        if not self.walk_done or self.bytes == 0:
+            return None
+        return (self.discovered_bytes - self.bytes) / (self.bytes / self.elapsed)
+
+    def summary(self) -> str:
+        eta = f"{self.eta:.0f} s" if self.eta is not None else "estimating"
+        return (f"{self.files}/{self.discovered_files} files ({self.skipped} cached), {self.infected} infected, "
+                f"{self.files_per_s:.0f} files/s, {self.mb_per_s:.1f} MB/s, ETA {eta}"
+                + (f", {self.failed_batches} batches failed" if self.failed_batches else ""))
+
+def walk_files(root: str, after: Optional[str] = None,
+               filters: Optional[WalkFilter] = None) -> Iterator[Tuple[str, int, FileKey]]:
+    """Yield ``(path, size, key)`` for every regular file below ``root`` that passes ``filters``."""
+    return scan_tree(root, filters, after)
+
+class ParallelScanner:
+    """Scan a tree with a pool of workers.
+
+    The calling thread walks the tree and feeds batches into a bounded queue;
+    ``workers`` threads each drain it through their own clamd session (or a
+    ``clamscan --file-list`` subprocess when ``clamscan`` is given and clamd
+    is down, with larger batches since every clamscan loads the signature
+    database). With a ``cache``, files already known clean under the
+    current signature version are skipped. Results that are not OK are
+    reported through ``on_result``, throttled stats through ``on_progress``
+    and per-batch ``(files, bytes, seconds)`` timings through ``on_batch``,
+    all from worker threads. ``throttle(files, bytes)`` is called before
+    each batch is queued and may block to pace the scan; ``on_checkpoint``
+    gets the last path up to which every file has been scanned, which
+    ``run(root, after=...)`` accepts to resume, with the files and infected
+    counts up to it; a batch in which every file came back as an error
+    (clamd or clamscan failed) is counted in ``failed_batches`` and holds
+    the checkpoint back for the rest of the run. ``filters`` prune the walk
+    (see ``walker.WalkFilter``); what was left out is counted in
+    ``walk_stats``. clamscan batches run in their own process group capped
+    at ``memory_limit`` bytes, and ``cancel`` kills them.
+    """
+
+    def __init__(self, address: str, workers: int = 0, batch_size: int = 64,
+                 clamscan: Optional[str] = None, clamscan_batch_size: int = 4096,
+                 on_result: Optional[Callable[[ScanResult], None]] = None,
+                 on_progress: Optional[Callable[[ScanStats], None]] = None,
+                 progress_interval: float = 0.5, cache: Optional[VerdictCache] = None,
+                 on_batch: Optional[Callable[[int, int, float], None]] = None,
+                 throttle: Optional[Callable[[int, int], None]] = None,
+                 on_checkpoint: Optional[Callable[[str, int, int], None]] = None,
+                 filters: Optional[WalkFilter] = None, memory_limit: int = 0):
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.clamscan = clamscan
+        self.clamscan_batch_size = clamscan_batch_size
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.cache = cache
+        self.on_batch = on_batch
+        self.throttle = throttle
+        self.on_checkpoint = on_checkpoint
+        self.filters = filters
+        self.walk_stats = WalkStats()
+        self.memory_limit = memory_limit
+        self._procs: Set[subprocess.Popen] = set()
+        self.stats = ScanStats(started=time.monotonic())
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._last_progress = 0.0
+        self._done: Dict[int, Tuple[str, int, int]] = {}   # finished batches beyond the watermark
+        self._watermark = -1
+        self._marked = (0, 0)                   # files, infected up to the watermark
+        self._held: Optional[int] = None        # first failed batch; the watermark stops before it
+
+    def cancel(self):
+        self._cancel.set()
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            kill_group(proc)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _update(self, force: bool = False, flags: Optional[dict] = None, **counts: int):
+        """Add ``counts`` to the stats, set ``flags``, and maybe report progress."""
+        with self._lock:
+            changes = {k: getattr(self.stats, k) + v for k, v in counts.items()}
+            changes.update(flags or {})
+            self.stats = replace(self.stats, **changes)
+            now = time.monotonic()
+            if not force and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+            stats = self.stats
+        if self.on_progress:
+            self.on_progress(stats)
+
+    def _batches(self, root: str, size: int, after: Optional[str] = None) -> Iterator[Batch]:
+        batch: Batch = []
+        for entry in scan_tree(root, self.filters, after, self.walk_stats):
+            if self._cancel.is_set():
+                return
+            batch.append(entry)
+            if len(batch) >= size:
+                self._update(discovered_files=len(batch), discovered_bytes=sum(e[1] for e in batch))
+                yield batch
+                batch = []
+        if batch:
+            self._update(discovered_files=len(batch), discovered_bytes=sum(e[1] for e in batch))
+            yield batch
+
+    def _complete(self, seq: int, batch: Batch, infected: int):
+        """Advance the checkpoint over batches that are finished in walk order."""
+        with self._lock:
+            if self._held is not None and seq > self._held:
+                return                  # can never be reached; don't keep it around
+            self._done[seq] = (batch[-1][0], len(batch), infected)
+            last = None
+            files, n_infected = self._marked
+            while self._watermark + 1 in self._done:
+                self._watermark += 1
+                last, n, i = self._done.pop(self._watermark)
+                files += n; n_infected += i
+            self._marked = (files, n_infected)
+        if last is not None and self.on_checkpoint:
+            self._notify(self.on_checkpoint, last, files, n_infected)
+
+    def _hold(self, seq: int):
+        """Stop the checkpoint before failed batch ``seq``; drop what lies beyond it."""
+        with self._lock:
+            if self._held is None or seq < self._held:
+                self._held = seq
+                for s in [s for s in self._done if s > seq]:
+                    del self._done[s]
+
+    # Both scanners return one result per batch entry, in batch order.
+
+    def _scan_batch_clamd(self, client: ClamdClient, batch: Batch) -> List[ScanResult]:
+        results = []
+        for path, _size, _key in batch:
+            if self._cancel.is_set():
+                break
+            results.append(replace(client.scan_file(path), path=path))
+        return results
+
+    def _scan_batch_clamscan(self, batch: Batch) -> List[ScanResult]:
+        with tempfile.NamedTemporaryFile("wb", prefix="clamui-", suffix=".lst") as fl:
+            fl.write(b"\n".join(os.fsencode(e[0]) for e in batch)); fl.flush()
+            proc = spawn_group([self.clamscan, "--stdout", "--no-summary", f"--file-list={fl.name}"],
+                               self.memory_limit, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               encoding="utf-8", errors="surrogateescape")
+            with self._lock:
+                self._procs.add(proc)
+            try:
+                out, _err = proc.communicate()
+            finally:
+                with self._lock:
+                    self._procs.discard(proc)
+        verdicts: Dict[str, ScanResult] = {}
+        for line in out.splitlines():
+            if line.endswith(": Empty file"):
+                verdicts[line[:-12]] = ScanResult(line[:-12], "OK"); continue
+            try: r = parse_reply(line)
+            except ClamdError: continue
+            verdicts[r.path] = r
+        # Files without a verdict were not scanned, e.g. clamscan died at the memory cap.
+        missing = ScanResult("", "ERROR", f"no verdict, clamscan exited with {proc.returncode}")
+        return [verdicts.get(e[0]) or replace(missing, path=e[0]) for e in batch]
+
+    def _worker(self, q: "queue.Queue[Optional[Tuple[int, Batch]]]", use_clamd: bool,
+                cache: Optional[VerdictCache]):
+        client = ClamdClient(self.address) if use_clamd else None
+        try:
+            while True:
+                item = q.get()
+                if item is None:
+                    return
+                seq, batch = item
+                if self._cancel.is_set():
+                    continue
+                try:
+                    self._scan_batch(seq, batch, client, cache)
+                except Exception as err:
+                    # A worker must outlive any one batch, or run() waits on it forever.
+                    print(f"Scan batch failed: {err!r}")
+                    self._update(files=len(batch), errors=len(batch), failed_batches=1)
+                    self._hold(seq)
+        finally:
+            if client:
+                client.close()
+
+    def _scan_batch(self, seq: int, batch: Batch, client: Optional[ClamdClient],
+                    cache: Optional[VerdictCache]):
+        todo = batch
+        if cache is not None:
+            todo = [e for e, hit in zip(batch, cache.unchanged(e[2] for e in batch)) if not hit]
+        t0 = time.monotonic()
+        try:
+            with span("scan.batch", files=len(todo), clamd=bool(client)):
+                results = (self._scan_batch_clamd(client, todo) if client
+                           else self._scan_batch_clamscan(todo)) if todo else []
+        except Exception as err:
+            if client:
+                client.close()          # the session may be mid-reply; start a fresh one
+            results = [ScanResult(e[0], "ERROR", str(err) or repr(err)) for e in todo]
+        bad = [r for r in results if r.status != "OK"]
+        if self._cancel.is_set():
+            # Possibly a partial batch: report findings, but neither cache nor checkpoint it.
+            for r in bad:
+                if r.infected:
+                    self._notify(self.on_result, r)
+            return
+        failed = bool(todo) and all(r.status == "ERROR" for r in results)
+        if cache is not None:
+            # Results line up with ``todo``; only an explicit OK is cached as clean.
+            cache.mark_clean(e[2] for e, r in zip(todo, results) if r.status == "OK")
+        for r in bad:
+            self._notify(self.on_result, r)
+        infected = sum(1 for r in bad if r.infected)
+        self._update(files=len(batch), bytes=sum(e[1] for e in batch),
+                     skipped=len(batch) - len(todo), infected=infected,
+                     errors=sum(1 for r in bad if r.status == "ERROR"), failed_batches=int(failed))
+        if failed:
+            self._hold(seq)
+        else:
+            self._complete(seq, batch, infected)
+        if todo:
+            self._notify(self.on_batch, len(todo), sum(e[1] for e in todo), time.monotonic() - t0)
+
+    @staticmethod
+    def _notify(callback: Optional[Callable], *args):
+        """Call an observer; a broken one must not change verdicts or counts."""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as err:
+            print(f"Scan callback {getattr(callback, '__name__', callback)!r} failed: {err!r}")
+
+    @staticmethod
+    def _put(q: "queue.Queue", item, threads: List[threading.Thread]):
+        """``q.put`` that gives up when no worker is left to take the item."""
+        while True:
+            try:
+                return q.put(item, timeout=0.5)
+            except queue.Full:
+                if not any(t.is_alive() for t in threads):
+                    raise ClamdError("all scan workers have stopped")
+
+    def run(self, root: str, after: Optional[str] = None) -> ScanStats:
+        """Scan ``root`` (resuming after path ``after``) and block until every worker is done."""
+        with span("scan", root=root):
+            return self._run(root, after)
+
+    def _run(self, root: str, after: Optional[str]) -> ScanStats:
+        use_clamd = ClamdClient(self.address).ping()
+        if not use_clamd and not self.clamscan:
+            raise ClamdError(f"clamd is not responding at {self.address}")
+        cache = self.cache if use_clamd else None
+        if cache is not None:
+            # Verdicts are only valid for the signature version that made them.
+            with ClamdClient(self.address) as client:
+                version = db_version_from_banner(client.version())
+            if version: cache.set_db_version(version)
+            else: cache = None
+        q: "queue.Queue[Optional[Tuple[int, Batch]]]" = queue.Queue(maxsize=self.workers * 2)
+        threads = [threading.Thread(target=self._worker, args=(q, use_clamd, cache),
+                                    name=f"clamui-scan-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            size = self.batch_size if use_clamd else self.clamscan_batch_size
+            for seq, batch in enumerate(self._batches(root, size, after)):
+                if self.throttle:
+                    self.throttle(len(batch), sum(e[1] for e in batch))
+                self._put(q, (seq, batch), threads)
+            self._update(force=True, flags={"walk_done": not self.cancelled})
+        finally:
+            for _ in threads:
+                try:
+                    self._put(q, None, threads)
+                except ClamdError:
+                    break
+            for t in threads:
+                t.join()
+        self._update(force=True, flags={"finished": True})
+        return self.stats
@@ -0,0 +1,22 @@
+from __future__ import annotations
+import os
+from typing import List
+
+from .clamd import ClamdClient, ClamdError, ScanResult
+
+def scan_with_clamd(address: str, path: str, multiscan: bool = True) -> List[ScanResult]:
+    """Scan ``path`` through a running clamd.
+
+    Regular files are streamed with INSTREAM so clamd does not need read
+    access to the user's files; directories are handed to MULTISCAN (or
+    CONTSCAN). Raises ``ClamdError`` when clamd is not reachable, so callers
+    can fall back to spawning ``clamscan``.
+    """
+    client = ClamdClient(address)
+    if not client.ping():
+        raise ClamdError(f"clamd is not responding at {address}")
+    if os.path.isdir(path):
+        return client.multiscan(path) if multiscan else client.contscan(path)
+    with client, open(path, "rb") as fh:
+        res = client.instream(fh)
+    return [ScanResult(path, res.status, res.detail)]
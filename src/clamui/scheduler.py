@@ -0,0 +1,209 @@
+"""Recurring, resumable and throttled scans of the configured watch-dirs.
+
+Progress of each root is checkpointed to a small JSON state file (the last
+path up to which everything was scanned, see ``ParallelScanner``), so a
+scan interrupted by a reboot or a cancel resumes where it stopped. Scans
+are paced by a files/s and MB/s budget, pause during quiet hours, and the
+process can lower its CPU and I/O priority. The dashboard follows the same
+state file to show progress.
+"""
+from __future__ import annotations
+import ctypes, ctypes.util, json, os, platform, threading, time
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .clamd import ScanResult
+from .scan_engine import ParallelScanner, ScanStats
+from .verdict_cache import VerdictCache
+from .walker import WalkFilter
+
+DEFAULT_STATE = os.path.join(os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state")),
+                             "clamui", "schedule.json")
+CHECKPOINT_INTERVAL = 5.0
+IOPRIO_CLASS_IDLE, IOPRIO_CLASS_SHIFT, IOPRIO_WHO_PROCESS = 3, 13, 1
+_SYS_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "riscv64": 30, "i686": 289, "armv7l": 314}
+
+@dataclass(frozen=True)
+class RootState:
+    """Persistent scan state of one root."""
+    after: Optional[str] = None             # checkpoint of an unfinished scan
+    last_complete: float = 0.0
+    status: str = "idle"                    # idle | running | paused | cancelled | done | error
+    progress: str = ""
+    files: int = 0                          # totals of the current cycle, across resumes
+    infected: int = 0
+    after_files: int = 0                    # totals up to ``after``, where a resume starts counting
+    after_infected: int = 0
+    updated: float = 0.0
+
+def load_state(path: str = DEFAULT_STATE) -> Dict[str, RootState]:
+    try:
+        with open(path) as fh:
+            return {root: RootState(**d) for root, d in json.load(fh).items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+def save_state(states: Dict[str, RootState], path: str = DEFAULT_STATE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump({root: asdict(st) for root, st in states.items()}, fh)
+    os.replace(tmp, path)
+
+def parse_quiet_hours(value: str) -> List[Tuple[int, int]]:
+    """``"08:00-18:00, 22:30-23:00"`` as minute-of-day ranges; ranges may wrap midnight."""
+    out = []
+    for part in value.replace(";", ",").split(","):
+        if "-" not in part:
+            continue
+        start, end = (p.strip().split(":") for p in part.split("-", 1))
+        out.append((int(start[0]) * 60 + int(start[1] if len(start) > 1 else 0),
+                    int(end[0]) * 60 + int(end[1] if len(end) > 1 else 0)))
+    return out
+
+def in_quiet_hours(windows: List[Tuple[int, int]], now: Optional[float] = None) -> bool:
+    t = time.localtime(now)
+    minute = t.tm_hour * 60 + t.tm_min
+    return any(a <= minute < b if a <= b else (minute >= a or minute < b) for a, b in windows)
+
+def lower_priority(nice: int = 10, io_idle: bool = True):
+    """Lower CPU and I/O priority; call before starting threads, which inherit it.
+
+    clamd reads the files itself, so this covers the walk and clamscan
+    fallbacks; the rate budget is what paces clamd.
+    """
+    if nice:
+        try: os.nice(nice)
+        except OSError as e: print(f"Unable to renice: {e}")
+    nr = _SYS_IOPRIO_SET.get(platform.machine())
+    if io_idle and nr is not None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if libc.syscall(nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) < 0:
+            print(f"Unable to set idle I/O priority: {os.strerror(ctypes.get_errno())}")
+
+class RateLimiter:
+    """Token bucket over files and bytes that also holds scans in quiet hours."""
+
+    def __init__(self, files_per_s: float = 0, mb_per_s: float = 0,
+                 quiet_hours: List[Tuple[int, int]] = (), cancel: Optional[threading.Event] = None,
+                 on_pause: Optional[Callable[[bool], None]] = None):
+        self.files_per_s = files_per_s
+        self.bytes_per_s = mb_per_s * (1 << 20)
+        self.quiet_hours = list(quiet_hours)
+        self.cancel = cancel or threading.Event()
+        self.on_pause = on_pause
+        self._t = time.monotonic()
+
+    def __call__(self, files: int, nbytes: int):
+        if self.quiet_hours and in_quiet_hours(self.quiet_hours):
+            if self.on_pause: self.on_pause(True)
+            while in_quiet_hours(self.quiet_hours) and not self.cancel.wait(30):
+                pass
+            if self.on_pause: self.on_pause(False)
+            self._t = time.monotonic()
+        # Each batch books its cost on a virtual clock; sleep while it runs ahead.
+        cost = max(files / self.files_per_s if self.files_per_s else 0,
+                   nbytes / self.bytes_per_s if self.bytes_per_s else 0)
+        now = time.monotonic()
+        self._t = max(self._t, now - 1.0) + cost        # at most 1 s of burst credit
+        if self._t > now:
+            self.cancel.wait(self._t - now)
+
+class ScanScheduler:
+    """Scans ``roots`` every ``interval`` seconds, resuming unfinished cycles first."""
+
+    def __init__(self, roots: List[str], address: str, interval: float = 86400,
+                 state_path: str = DEFAULT_STATE, files_per_s: float = 0, mb_per_s: float = 0,
+                 quiet_hours: List[Tuple[int, int]] = (), workers: int = 2, batch_size: int = 64,
+                 clamscan: Optional[str] = None, cache: Optional[VerdictCache] = None,
+                 on_result: Optional[Callable[[ScanResult], None]] = None,
+                 filters: Optional[WalkFilter] = None):
+        self.roots = roots
+        self.address = address
+        self.interval = interval
+        self.state_path = state_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.clamscan = clamscan
+        self.cache = cache
+        self.on_result = on_result
+        self.filters = filters
+        self.states = load_state(state_path)
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._saved = 0.0
+        self.limiter = RateLimiter(files_per_s, mb_per_s, quiet_hours, self._cancel)
+        self.scanner: Optional[ParallelScanner] = None
+
+    def cancel(self):
+        """Stop at the next batch; the checkpoint is kept for the next run."""
+        self._cancel.set()
+        if self.scanner is not None:
+            self.scanner.cancel()
+
+    def _set(self, root: str, force: bool = False, **changes):
+        with self._lock:
+            self.states[root] = replace(self.states.get(root, RootState()), updated=time.time(), **changes)
+            if force or time.monotonic() - self._saved >= CHECKPOINT_INTERVAL:
+                self._saved = time.monotonic()
+                try:
+                    save_state(self.states, self.state_path)
+                except OSError as e:
+                    print(f"Unable to save scan checkpoint: {e}")
+
+    def next_due(self, root: str) -> float:
+        st = self.states.get(root, RootState())
+        return time.time() if st.after else st.last_complete + self.interval
+
+    def scan(self, root: str) -> ScanStats:
+        st = self.states.get(root, RootState())
+        base_files, base_infected = (st.after_files, st.after_infected) if st.after else (0, 0)
+        self.limiter.on_pause = lambda paused: self._set(root, force=True,
+                                                         status="paused" if paused else "running")
+        self.scanner = ParallelScanner(
+            self.address, workers=self.workers, batch_size=self.batch_size, clamscan=self.clamscan,
+            cache=self.cache, on_result=self.on_result, throttle=self.limiter, progress_interval=2.0,
+            on_progress=lambda s: self._set(root, progress=s.summary(), files=base_files + s.files,
+                                            infected=base_infected + s.infected),
+            on_checkpoint=lambda path, files, infected: self._set(
+                root, after=path, after_files=base_files + files, after_infected=base_infected + infected),
+            filters=self.filters)
+        self._set(root, force=True, status="running")
+        try:
+            stats = self.scanner.run(root, after=st.after)
+        except KeyboardInterrupt:
+            self._set(root, force=True, status="cancelled")
+            raise
+        except Exception as e:
+            self._set(root, force=True, status="error", progress=str(e))
+            raise
+        totals = dict(files=base_files + stats.files, infected=base_infected + stats.infected,
+                      progress=stats.summary())
+        if self.scanner.cancelled:
+            self._set(root, force=True, status="cancelled", **totals)
+        elif stats.failed_batches:
+            # Not a complete cycle: keep the checkpoint and stay due for a retry.
+            self._set(root, force=True, status="error", **totals)
+        else:
+            self._set(root, force=True, status="done", after=None, after_files=0, after_infected=0,
+                      last_complete=time.time(), **totals)
+        return stats
+
+    def run_once(self) -> int:
+        """Scan every root that is due; returns how many were scanned."""
+        n = 0
+        for root in sorted(self.roots, key=self.next_due):
+            if self._cancel.is_set() or self.next_due(root) > time.time():
+                continue
+            try:
+                self.scan(root)
+                n += 1
+            except Exception as e:
+                print(f"Scheduled scan of {root} failed: {e}")
+        return n
+
+    def run_forever(self):
+        while not self._cancel.is_set():
+            self.run_once()
+            wait = min((self.next_due(r) for r in self.roots), default=time.time() + 3600) - time.time()
+            self._cancel.wait(min(max(wait, 60), 3600))
@@ -0,0 +1,165 @@
+"""Unit state from systemd over D-Bus, pushed instead of polled.
+
+``UnitWatcher`` resolves each unit once, subscribes to systemd's
+``PropertiesChanged`` signals for it and reports a ``UnitStatus`` whenever
+ActiveState or SubState changes. Service counters (restarts, memory, CPU)
+do not emit change signals, so they are fetched with one ``GetAll`` call
+per state change or on ``refresh``. Everything is asynchronous on the
+GLib main loop; no process is forked.
+"""
+from __future__ import annotations
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional
+
+SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+MANAGER_IFACE = "org.freedesktop.systemd1.Manager"
+UNIT_IFACE = "org.freedesktop.systemd1.Unit"
+SERVICE_IFACE = "org.freedesktop.systemd1.Service"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+UNSET = (1 << 64) - 1           # systemd's "not available" for counters
+
+@dataclass(frozen=True)
+class UnitStatus:
+    unit: str
+    active_state: str = "unknown"
+    sub_state: str = ""
+    n_restarts: int = 0
+    memory: Optional[int] = None            # bytes
+    cpu_ns: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return self.active_state in ("active", "reloading")
+
+    def summary(self) -> str:
+        parts = [f"{self.active_state} ({self.sub_state})" if self.sub_state else self.active_state]
+        if self.n_restarts:
+            parts.append(f"{self.n_restarts} restart{'s' if self.n_restarts != 1 else ''}")
+        if self.memory is not None:
+            parts.append(f"{self.memory / (1 << 20):.0f} MiB")
+        if self.cpu_ns is not None:
+            parts.append(f"CPU {self.cpu_ns / 1e9:.1f} s")
+        return " · ".join(parts)
+
+def _counter(props: Dict[str, object], key: str) -> Optional[int]:
+    value = props.get(key)
+    return None if value is None or value == UNSET else int(value)
+
+class UnitWatcher:
+    """Push-based status of a few systemd units.
+
+    ``on_change`` is called on the main loop with a ``UnitStatus``;
+    ``on_error`` once if the system bus or systemd is unavailable, so the
+    caller can fall back to polling, and ``on_unit_error(unit, message)``
+    for a unit that cannot be followed (e.g. it does not exist) while the
+    others still are.
+    """
+
+    def __init__(self, units: Iterable[str], on_change: Callable[[UnitStatus], None],
+                 on_error: Optional[Callable[[str], None]] = None,
+                 bus_type: Gio.BusType = Gio.BusType.SYSTEM,
+                 on_unit_error: Optional[Callable[[str, str], None]] = None):
+        self.units = list(units)
+        self.on_change = on_change
+        self.on_error = on_error
+        self.on_unit_error = on_unit_error
+        self.status: Dict[str, UnitStatus] = {}
+        self._proxies: Dict[str, Gio.DBusProxy] = {}
+        self._bus: Optional[Gio.DBusConnection] = None
+        self._cancellable = Gio.Cancellable()
+        self._failed = False
+        Gio.bus_get(bus_type, self._cancellable, self._on_bus)
+
+    def get(self, unit: str) -> Optional[UnitStatus]:
+        """Last known status, or None until systemd has answered. Safe from any thread."""
+        return self.status.get(unit)
+
+    def close(self):
+        self._cancellable.cancel()
+        self._proxies.clear()
+
+    def refresh(self):
+        """Re-read the service counters, which systemd does not push."""
+        for unit in self._proxies:
+            self._fetch_service(unit)
+
+    def _fail(self, message: str):
+        if not self._failed:
+            self._failed = True
+            if self.on_error:
+                self.on_error(message)
+
+    def _unit_failed(self, unit: str, message: str):
+        if self.on_unit_error:
+            self.on_unit_error(unit, message)
+
+    def _on_bus(self, _src, result):
+        try:
+            self._bus = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            return self._fail(f"system bus unavailable: {e.message}")
+        # Without a subscriber systemd does not broadcast unit changes.
+        self._bus.call(SYSTEMD_BUS_NAME, SYSTEMD_PATH, MANAGER_IFACE, "Subscribe", None, None,
+                       Gio.DBusCallFlags.NONE, -1, self._cancellable, self._on_subscribed, None)
+        for unit in self.units:
+            self._bus.call(SYSTEMD_BUS_NAME, SYSTEMD_PATH, MANAGER_IFACE, "LoadUnit",
+                           GLib.Variant("(s)", (unit,)), GLib.VariantType("(o)"),
+                           Gio.DBusCallFlags.NONE, -1, self._cancellable, self._on_unit_path, unit)
+
+    def _on_subscribed(self, bus, result, _data):
+        try:
+            bus.call_finish(result)
+        except GLib.Error as e:
+            if not e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                self._fail(f"systemd unavailable: {e.message}")
+
+    def _on_unit_path(self, bus, result, unit: str):
+        try:
+            (path,) = bus.call_finish(result).unpack()
+        except GLib.Error as e:
+            return self._unit_failed(unit, e.message)
+        Gio.DBusProxy.new(bus, Gio.DBusProxyFlags.NONE, None, SYSTEMD_BUS_NAME, path, UNIT_IFACE,
+                          self._cancellable, self._on_proxy, unit)
+
+    def _on_proxy(self, _src, result, unit: str):
+        try:
+            proxy = Gio.DBusProxy.new_finish(result)
+        except GLib.Error as e:
+            return self._unit_failed(unit, e.message)
+        self._proxies[unit] = proxy
+        proxy.connect("g-properties-changed", lambda _p, changed, _inv: self._on_changed(unit, changed))
+        self._fetch_service(unit)
+
+    def _on_changed(self, unit: str, changed: GLib.Variant):
+        keys = changed.keys()
+        if "ActiveState" in keys or "SubState" in keys:
+            self._fetch_service(unit)
+
+    def _fetch_service(self, unit: str):
+        proxy = self._proxies.get(unit)
+        if proxy is None:
+            return
+        self._bus.call(SYSTEMD_BUS_NAME, proxy.get_object_path(), PROPERTIES_IFACE, "GetAll",
+                       GLib.Variant("(s)", (SERVICE_IFACE,)), GLib.VariantType("(a{sv})"),
+                       Gio.DBusCallFlags.NONE, -1, self._cancellable, self._on_service, unit)
+
+    def _on_service(self, bus, result, unit: str):
+        try:
+            (props,) = bus.call_finish(result).unpack()
+        except GLib.Error:
+            props = {}              # not a service unit, or it went away
+        proxy = self._proxies.get(unit)
+        if proxy is None:
+            return
+        def prop(name: str) -> str:
+            v = proxy.get_cached_property(name)
+            return v.unpack() if v is not None else ""
+        status = UnitStatus(unit, prop("ActiveState") or "unknown", prop("SubState"),
+                            int(props.get("NRestarts", 0)), _counter(props, "MemoryCurrent"),
+                            _counter(props, "CPUUsageNSec"))
+        self.status[unit] = status
+        self.on_change(status)
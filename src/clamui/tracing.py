@@ -0,0 +1,163 @@
+"""Timing spans around the hot paths.
+
+Disabled, a span is one global check and a shared no-op context manager.
+``CLAMUI_TRACE=/path/trace.json`` (or ``clamui --trace PATH``) writes every
+span as a Chrome trace event, viewable in Perfetto or chrome://tracing;
+``enable()`` without a path only keeps recent latencies for
+``span_stats``, which feeds the dashboard's performance panel.
+"""
+from __future__ import annotations
+import atexit, functools, json, os, threading, time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, TextIO
+
+TRACE_ENV = "CLAMUI_TRACE"
+FLUSH_EVENTS = 256
+
+@dataclass(frozen=True)
+class SpanStats:
+    """Latencies of one span name over the recent window, in milliseconds."""
+    name: str
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    def label(self) -> str:
+        return (f"{self.name:<22} {self.count:>6}×  p50 {self.p50:7.2f}  p95 {self.p95:7.2f}  "
+                f"p99 {self.p99:7.2f}  max {self.max:7.2f} ms")
+
+class Recorder:
+    """Keeps the last ``window`` durations per span and streams trace events to ``path``."""
+
+    def __init__(self, path: Optional[str] = None, window: int = 512):
+        self.window = window
+        self.samples: Dict[str, Deque[int]] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._threads: Dict[int, str] = {}
+        self._pid = os.getpid()
+        self._fh: Optional[TextIO] = None
+        self._first = True
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._fh = open(path, "w")
+            self._fh.write("[\n")
+            atexit.register(self.close)
+
+    def add(self, name: str, start_ns: int, dur_ns: int, args: Dict[str, Any]):
+        tid = threading.get_native_id()
+        with self._lock:
+            q = self.samples.get(name)
+            if q is None:
+                q = self.samples[name] = deque(maxlen=self.window)
+            q.append(dur_ns)
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if self._fh is None:
+                return
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+                self._pending.append(json.dumps({"name": "thread_name", "ph": "M", "pid": self._pid,
+                                                 "tid": tid, "args": {"name": self._threads[tid]}}))
+            ev = {"name": name, "ph": "X", "ts": start_ns // 1000, "dur": dur_ns // 1000,
+                  "pid": self._pid, "tid": tid}
+            if args:
+                ev["args"] = args
+            self._pending.append(json.dumps(ev, default=str))
+            if len(self._pending) >= FLUSH_EVENTS:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._fh is None or not self._pending:
+            return
+        self._fh.write(("" if self._first else ",\n") + ",\n".join(self._pending))
+        self._fh.flush()
+        self._first = False
+        self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.write("\n]\n")
+                self._fh.close()
+                self._fh = None
+
+    def stats(self) -> List[SpanStats]:
+        with self._lock:
+            snap = [(name, self.counts[name], sorted(q)) for name, q in self.samples.items()]
+        out = []
+        for name, count, durs in snap:
+            pct = lambda p: durs[min(len(durs) - 1, int(p * len(durs)))] / 1e6
+            out.append(SpanStats(name, count, pct(0.50), pct(0.95), pct(0.99), durs[-1] / 1e6))
+        return sorted(out, key=lambda s: s.name)
+
+_recorder: Optional[Recorder] = None
+
+class _NullSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, **args): pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "t0")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name; self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def set(self, **args):
+        """Attach arguments known only inside the span, e.g. a row count."""
+        self.args.update(args)
+
+    def __exit__(self, *exc):
+        rec = _recorder
+        if rec is not None:
+            rec.add(self.name, self.t0, time.perf_counter_ns() - self.t0, self.args)
+        return False
+
+def span(name: str, **args):
+    """``with span("parse", lines=n): ...``; a no-op unless tracing is enabled."""
+    return _NULL_SPAN if _recorder is None else _Span(name, args)
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator form of ``span``, named after the function by default."""
+    def deco(fn):
+        label = name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _recorder is None:
+                return fn(*a, **kw)
+            with _Span(label, {}):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+def enabled() -> bool:
+    return _recorder is not None
+
+def enable(trace_path: Optional[str] = None, window: int = 512) -> Recorder:
+    """Start recording; with ``trace_path`` also write Chrome trace events there."""
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(trace_path, window)
+    return _recorder
+
+def span_stats() -> List[SpanStats]:
+    return _recorder.stats() if _recorder is not None else []
+
+if os.environ.get(TRACE_ENV):
+    enable(os.path.expanduser(os.environ[TRACE_ENV]))
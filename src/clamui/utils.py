@@ -1,8 +1,7 @@
 from __future__ import annotations
-import json, os, subprocess, configparser
+import os, configparser
 from pathlib import Path
 from typing import Optional, List, Tuple
-from gi.repository import GLib
 
 CONF_ETC = Path("/home/code/clamui/clamui.conf")
 
@@ -16,6 +15,15 @@ def load_conf() -> configparser.ConfigParser:
 
 # helpers
 
+def parse_list(value: str) -> List[str]:
+    """Parse a bracketed, comma separated list such as ``watch-dirs``.
+
+    Accepts the multi-line form used in clamui.conf, including quotes and a
+    trailing comma.
+    """
+    items = value.strip().strip("[]").replace("\n", ",").split(",")
+    return [i.strip().strip('"').strip("'") for i in items if i.strip().strip('"').strip("'")]
+
 def which(cmd: str) -> Optional[str]:
     for p in os.environ.get("PATH", "").split(":"):
         full = os.path.join(p, cmd)
@@ -24,9 +32,43 @@ def which(cmd: str) -> Optional[str]:
     return None
 
 def try_run(cmd: List[str], timeout: float = 3.0) -> Tuple[int, str, str]:
+    import subprocess   # lazy: keeps the headless status command light
     try:
         cp = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=False)
         return cp.returncode, cp.stdout.strip(), cp.stderr.strip()
     except Exception as e:
         return 1, "", str(e)
 
+
+def spawn_group(cmd: List[str], memory_limit: int = 0, **kwargs):
+    """Start ``cmd`` in a new process group, so it can be killed with its children.
+
+    ``memory_limit`` caps the address space in bytes. A preexec_fn is
+    unsafe in threaded programs, so util-linux ``prlimit`` sets the limit
+    and then execs ``cmd`` (same pid, same process group). Without it the
+    limit is applied to the child right after the fork, which is only best
+    effort: the child may already be past exec by then.
+    """
+    import resource, shutil, subprocess
+    wrapper = shutil.which("prlimit") if memory_limit else None
+    if wrapper:
+        cmd = [wrapper, f"--as={memory_limit}", "--"] + list(cmd)
+    proc = subprocess.Popen(cmd, start_new_session=True, **kwargs)
+    if memory_limit and not wrapper:
+        try:
+            resource.prlimit(proc.pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (OSError, AttributeError, ValueError) as e:
+            print(f"Unable to limit memory of {cmd[0]}: {e}")
+    return proc
+
+def kill_group(proc, grace: float = 2.0):
+    """SIGTERM the process group of ``proc``, then SIGKILL it if still running after ``grace``."""
+    import signal, threading
+    def send(sig):
+        if proc.poll() is None:
+            try: os.killpg(proc.pid, sig)
+            except (ProcessLookupError, PermissionError): pass
+    send(signal.SIGTERM)
+    t = threading.Timer(grace, send, (signal.SIGKILL,))
+    t.daemon = True
+    t.start()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import os, sqlite3, threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# (st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns)
+FileKey = Tuple[int, int, int, int, int]
+
+DEFAULT_CACHE = Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "clamui" / "verdicts.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    dev INTEGER NOT NULL, ino INTEGER NOT NULL,
+    size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, ctime_ns INTEGER NOT NULL,
+    db_version TEXT NOT NULL,
+    PRIMARY KEY (dev, ino)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def file_key(st: os.stat_result) -> FileKey:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+def db_version_from_banner(banner: str) -> Optional[str]:
+    """Extract the signature version from ``ClamAV 1.4.3/27790/Sat Oct 18 ...``."""
+    parts = banner.split("/")
+    return parts[1] if len(parts) > 1 and parts[1].isdigit() else None
+
+class VerdictCache:
+    """Persistent cache of clean verdicts keyed on file identity and DB version.
+
+    Only clean results are stored: a file is skipped on a rescan when its
+    device, inode, size, mtime and ctime are unchanged and it was scanned
+    with the same signature database version. Switching to a new database
+    version drops every entry recorded under an older one.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.db_version: Optional[str] = None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def set_db_version(self, version: str):
+        """Select the signature version; entries from other versions are purged."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key='db_version'").fetchone()
+            if row is None or row[0] != version:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.execute("DELETE FROM verdicts WHERE db_version != ?", (version,))
+                    self._db.execute("INSERT OR REPLACE INTO meta VALUES ('db_version', ?)", (version,))
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._db.execute("COMMIT")
+            self.db_version = version
+
+    def unchanged(self, keys: Iterable[FileKey]) -> List[bool]:
+        """For each key, whether it is known clean under the current DB version."""
+        if self.db_version is None:
+            return [False for _k in keys]
+        with self._lock:
+            cur = self._db.cursor()
+            return [cur.execute(
+                "SELECT 1 FROM verdicts WHERE dev=? AND ino=? AND size=? AND mtime_ns=? "
+                "AND ctime_ns=? AND db_version=?", (*k, self.db_version)).fetchone() is not None
+                for k in keys]
+
+    def mark_clean(self, keys: Iterable[FileKey]):
+        if self.db_version is None:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(*k, self.db_version) for k in keys])
+            except BaseException:
+                self._db.execute("ROLLBACK")    # don't leave the shared connection in a transaction
+                raise
+            self._db.execute("COMMIT")
@@ -0,0 +1,185 @@
+"""Pre-filtering tree walker.
+
+Built on ``os.scandir`` so directory entries come with their type and
+excluded names are rejected before any ``stat``. Skips what scanning
+cannot profit from: excluded globs, files above ``max_size``, special
+files, pseudo filesystems (/proc, /sys, ...), other filesystems with
+``one_filesystem``, and extra links to an already yielded inode.
+"""
+from __future__ import annotations
+import fnmatch, os, re
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+
+from .verdict_cache import FileKey, file_key
+
+PSEUDO_FS = frozenset((
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts", "devtmpfs",
+    "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs", "proc", "pstore", "rpc_pipefs",
+    "securityfs", "selinuxfs", "sysfs", "tracefs"))
+
+def _compile(globs: Sequence[str]) -> Optional[Pattern[str]]:
+    """One regex for all globs. A glob with a ``/`` matches the full path, others the name."""
+    if not globs:
+        return None
+    parts = [fnmatch.translate(g) if "/" in g else r"(?:.*/)?" + fnmatch.translate(g) for g in globs]
+    return re.compile("|".join(f"(?:{p})" for p in parts))
+
+def pseudo_mounts(mountinfo: str = "/proc/self/mountinfo") -> Set[str]:
+    """Mount points of pseudo filesystems, from ``mountinfo``."""
+    out = set()
+    try:
+        with open(mountinfo) as fh:
+            for line in fh:
+                pre, _sep, post = line.partition(" - ")
+                fields = pre.split()
+                if len(fields) > 4 and post.split()[:1] and post.split()[0] in PSEUDO_FS:
+                    out.add(fields[4].replace("\\040", " "))
+    except OSError:
+        pass
+    return out
+
+@dataclass
+class WalkFilter:
+    """What to leave out of a walk; build once, reuse for many walks."""
+    include: Sequence[str] = ()             # if set, only matching files are yielded
+    exclude: Sequence[str] = ()             # matching files and directories are skipped
+    max_size: int = 0                       # bytes; 0 = unlimited
+    one_filesystem: bool = False
+    skip_pseudo_fs: bool = True
+    dedup_hardlinks: bool = True
+    _include: Optional[Pattern[str]] = field(init=False, repr=False, default=None)
+    _exclude: Optional[Pattern[str]] = field(init=False, repr=False, default=None)
+    _pseudo: Set[str] = field(init=False, repr=False, default_factory=set)
+
+    def __post_init__(self):
+        self._include = _compile(self.include)
+        self._exclude = _compile(self.exclude)
+        self._pseudo = pseudo_mounts() if self.skip_pseudo_fs else set()
+
+    def excluded(self, path: str) -> bool:
+        return bool(self._exclude and self._exclude.match(path))
+
+    def included(self, path: str) -> bool:
+        return self._include is None or bool(self._include.match(path))
+
+    def skip_dir(self, path: str) -> bool:
+        return path in self._pseudo or self.excluded(path)
+
+@dataclass
+class WalkStats:
+    files: int = 0
+    dirs: int = 0
+    excluded: int = 0
+    too_large: int = 0
+    special: int = 0
+    hardlinks: int = 0
+    other_fs: int = 0
+    errors: int = 0
+
+def _walk_key(root: str, path: str) -> Tuple[Tuple[int, str], ...]:
+    """Position of ``path`` in walk order: a directory's files, then its sorted subdirectories."""
+    parts = os.path.relpath(path, root).split(os.sep)
+    return tuple((1, p) for p in parts[:-1]) + ((0, parts[-1]),)
+
+def scan_tree(root: str, filters: Optional[WalkFilter] = None, after: Optional[str] = None,
+              stats: Optional[WalkStats] = None) -> Iterator[Tuple[str, int, FileKey]]:
+    """Yield ``(path, size, key)`` for the regular files below ``root`` that pass ``filters``.
+
+    The order is deterministic (sorted, files before subdirectories), so a
+    scan can resume ``after`` the last path it completed: subtrees that
+    sort before it are pruned without being listed.
+    """
+    f = filters or WalkFilter(skip_pseudo_fs=False, dedup_hardlinks=False)
+    stats = stats if stats is not None else WalkStats()
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        st = os.stat(root)
+        yield root, st.st_size, file_key(st)
+        return
+    root_dev = os.stat(root).st_dev
+    seen: Set[Tuple[int, int]] = set()
+    resume = _walk_key(root, after) if after else None
+    # Depth-first over (dir, key); children are pushed in reverse to pop in order.
+    stack: List[Tuple[str, Tuple[Tuple[int, str], ...]]] = [(root, ())]
+    while stack:
+        dirpath, here = stack.pop()
+        try:
+            with os.scandir(dirpath) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            stats.errors += 1
+            continue
+        stats.dirs += 1
+        nxt = resume[len(here)] if resume is not None and resume[:len(here)] == here else None
+        subdirs = []
+        for entry in entries:
+            path = entry.path
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_dir:
+                    if nxt is not None and (1, entry.name) < nxt:
+                        continue                # already scanned before the checkpoint
+                    if f.skip_dir(path):
+                        stats.excluded += 1
+                        continue
+                    if f.one_filesystem and entry.stat(follow_symlinks=False).st_dev != root_dev:
+                        stats.other_fs += 1
+                        continue
+                    subdirs.append(entry)
+                    continue
+                if nxt is not None and (0, entry.name) <= nxt:
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    stats.special += 1          # symlinks, sockets, fifos, devices
+                    continue
+                if f.excluded(path) or not f.included(path):
+                    stats.excluded += 1
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                stats.errors += 1
+                continue
+            if f.max_size and st.st_size > f.max_size:
+                stats.too_large += 1
+                continue
+            if f.dedup_hardlinks and st.st_nlink > 1:
+                ident = (st.st_dev, st.st_ino)
+                if ident in seen:
+                    stats.hardlinks += 1
+                    continue
+                seen.add(ident)
+            stats.files += 1
+            yield path, st.st_size, file_key(st)
+        for entry in reversed(subdirs):
+            stack.append((entry.path, here + ((1, entry.name),)))
+
+def filter_from_conf(conf) -> WalkFilter:
+    """``WalkFilter`` from the ``[scan]`` section of clamui.conf."""
+    from .utils import parse_list
+    return WalkFilter(include=parse_list(conf.get("scan", "include", fallback="")),
+                      exclude=parse_list(conf.get("scan", "exclude", fallback="")),
+                      max_size=conf_size(conf, "scan", "max-size"),
+                      one_filesystem=conf.getboolean("scan", "one-filesystem", fallback=False),
+                      skip_pseudo_fs=conf.getboolean("scan", "skip-pseudo-fs", fallback=True),
+                      dedup_hardlinks=conf.getboolean("scan", "dedup-hardlinks", fallback=True))
+
+_SIZE = re.compile(r"(\d+(?:\.\d*)?|\.\d+)\s*([KMGT]?)(I?B)?", re.IGNORECASE)
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+def parse_size(value: str) -> int:
+    """``"512M"``, ``"512MB"``, ``"2GiB"``, ``"4096"`` as bytes (binary units); empty or 0 means unlimited."""
+    value = value.strip()
+    if not value:
+        return 0
+    m = _SIZE.fullmatch(value)
+    if m is None:
+        raise ValueError(f"invalid size {value!r}, expected e.g. 4096, 512M or 2GiB")
+    return int(float(m.group(1)) * _UNITS[m.group(2).upper()])
+
+def conf_size(conf, section: str, key: str) -> int:
+    """``parse_size`` of a clamui.conf option; the error names the option."""
+    try:
+        return parse_size(conf.get(section, key, fallback=""))
+    except ValueError as e:
+        raise ValueError(f"[{section}] {key}: {e}") from None
@@ -0,0 +1,288 @@
+from __future__ import annotations
+import ctypes, ctypes.util, os, queue, select, struct, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .clamd import ClamdClient, ScanResult
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+EVENT_HEADER = struct.Struct("iIII")
+
+class Inotify:
+    """Thin ctypes wrapper around the Linux inotify syscalls."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Return pending ``(wd, mask, name)`` events without blocking."""
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+@dataclass(frozen=True)
+class WatchStats:
+    watched_dirs: int = 0
+    pending: int = 0            # changed files waiting to settle or for queue space
+    queued: int = 0             # files in the bounded scan queue
+    scanned: int = 0
+    infected: int = 0
+    dropped: int = 0            # changes discarded because the pending set was full
+    overflows: int = 0          # kernel inotify queue overflows
+    lag: float = 0.0            # age of the oldest change not yet scanned, in seconds
+
+    def summary(self) -> str:
+        return (f"Watching {self.watched_dirs} directories\n"
+                f"Queue: {self.queued} queued, {self.pending} pending\n"
+                f"Scan lag: {self.lag:.1f} s\n"
+                f"Scanned: {self.scanned}, infected: {self.infected}"
+                + (f"\nDropped: {self.dropped}, overflows: {self.overflows}"
+                   if self.dropped or self.overflows else ""))
+
+class TreeWatcher:
+    """Watch directory trees and feed changed files to a bounded scan queue.
+
+    Bursts are coalesced in an ordered pending set keyed by path, so repeated
+    writes to one file collapse into a single scan once the file has been
+    quiet for ``settle`` seconds. Settled files move to a queue of at most
+    ``queue_size`` entries; when it is full they stay pending (where further
+    writes are still deduplicated) until the scan workers catch up. The
+    pending set itself is capped at ``max_pending`` paths.
+    """
+
+    def __init__(self, roots: Iterable[str], address: str, workers: int = 2,
+                 settle: float = 2.0, queue_size: int = 1024, max_pending: int = 100000,
+                 on_result: Optional[Callable[[ScanResult], None]] = None,
+                 on_stats: Optional[Callable[[WatchStats], None]] = None,
+                 stats_interval: float = 1.0):
+        self.roots = [r for r in roots if os.path.isdir(r)]
+        self.address = address
+        self.workers = workers
+        self.settle = settle
+        self.max_pending = max_pending
+        self.on_result = on_result
+        self.on_stats = on_stats
+        self.stats_interval = stats_interval
+        self._queue: "queue.Queue[Optional[Tuple[str, float]]]" = queue.Queue(maxsize=queue_size)
+        # path -> (first_seen, last_seen), least recently written first
+        self._pending: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._inflight: Dict[str, float] = {}
+        self._wds: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._counts = {"scanned": 0, "infected": 0, "dropped": 0, "overflows": 0}
+        self._last_stats: Optional[WatchStats] = None
+        self._last_report = 0.0
+        self._inotify: Optional[Inotify] = None
+        self._wake_r, self._wake_w = os.pipe()
+
+    def start(self):
+        self._inotify = Inotify()
+        self._threads = [threading.Thread(target=self._watch_loop, name="clamui-watch", daemon=True)]
+        self._threads += [threading.Thread(target=self._scan_loop, name=f"clamui-watch-scan-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def _wake(self):
+        try: os.write(self._wake_w, b"x")
+        except OSError: pass
+
+    def stop(self):
+        self._stop.set()
+        self._wake()
+        for _ in range(self.workers):
+            try: self._queue.put_nowait(None)
+            except queue.Full: pass
+        for t in self._threads:
+            t.join(timeout=2)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        os.close(self._wake_r); os.close(self._wake_w)
+
+    # watching
+
+    def _add_tree(self, root: str, now: Optional[float] = None):
+        """Watch ``root`` and its subdirectories.
+
+        With ``now`` (a directory created or moved in), the regular files
+        already inside are queued too: they were written before the watch
+        existed and will never raise an event of their own.
+        """
+        for dirpath, dirs, files in os.walk(root):
+            if self._stop.is_set():
+                return
+            try:
+                self._wds[self._inotify.add_watch(dirpath, WATCH_MASK)] = dirpath
+            except OSError as e:
+                print(f"Cannot watch {dirpath}: {e}")
+                dirs[:] = []
+                continue
+            if now is not None:
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    if os.path.isfile(path) and not os.path.islink(path):
+                        self._touch(path, now)
+
+    def _touch(self, path: str, now: float):
+        with self._lock:
+            first = self._pending.get(path, (now, now))[0]
+            if path not in self._pending and len(self._pending) >= self.max_pending:
+                self._counts["dropped"] += 1
+                return
+            self._pending[path] = (first, now)
+            self._pending.move_to_end(path)     # keeps the map ordered by last write
+
+    def _dispatch(self, now: float):
+        """Move settled paths into the scan queue while it has room."""
+        with self._lock:
+            while self._pending:
+                path, (first, last) = next(iter(self._pending.items()))
+                if now - last < self.settle:
+                    break           # every later entry was written even more recently
+                try:
+                    self._queue.put_nowait((path, first))
+                except queue.Full:
+                    break           # back-pressure: keep the rest pending
+                del self._pending[path]
+
+    def _watch_loop(self):
+        for root in self.roots:
+            self._add_tree(root)
+        fd = self._inotify.fd
+        self._report(force=True)
+        while not self._stop.is_set():
+            # Sleep indefinitely when idle; tick only while work is outstanding.
+            if self._pending:
+                timeout: Optional[float] = min(self.settle / 2, self.stats_interval)
+            elif self._queue.qsize() or self._inflight:
+                timeout = self.stats_interval
+            else:
+                timeout = None
+            ready, _, _ = select.select([fd, self._wake_r], [], [], timeout)
+            now = time.monotonic()
+            if self._wake_r in ready:
+                os.read(self._wake_r, 4096)
+            if fd in ready:
+                for wd, mask, name in self._inotify.read():
+                    if mask & IN_Q_OVERFLOW:
+                        with self._lock: self._counts["overflows"] += 1
+                        continue
+                    if mask & IN_IGNORED:
+                        self._wds.pop(wd, None)
+                        continue
+                    base = self._wds.get(wd)
+                    if base is None or not name:
+                        continue
+                    path = os.path.join(base, name)
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            self._add_tree(path, now)
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        self._touch(path, now)
+            self._dispatch(now)
+            self._report(force=True)
+
+    # scanning
+
+    def _scan_loop(self):
+        client = ClamdClient(self.address)
+        try:
+            while not self._stop.is_set():
+                item = self._queue.get()
+                if item is None:
+                    return
+                path, first = item
+                with self._lock: self._inflight[path] = first
+                result = ScanResult(path, "ERROR", "scan did not finish")
+                try:
+                    result = client.scan_file(path)
+                except Exception as e:      # any failure is this file's error, not the worker's
+                    client.close()
+                    result = ScanResult(path, "ERROR", str(e))
+                finally:
+                    with self._lock:
+                        self._inflight.pop(path, None)
+                        self._counts["scanned"] += 1
+                        if result.infected:
+                            self._counts["infected"] += 1
+                        drained = not self._inflight and self._queue.empty()
+                if result.status != "OK" and self.on_result:
+                    try:
+                        self.on_result(result)
+                    except Exception as e:
+                        print(f"Cannot report {path}: {e}")
+                if drained:
+                    self._wake()        # let the watch loop publish final stats and refill
+                else:
+                    self._report()
+        finally:
+            client.close()
+
+    def stats(self) -> WatchStats:
+        now = time.monotonic()
+        with self._lock:
+            # The least recently written pending file; one rewritten all along may be older.
+            head = next(iter(self._pending.values()), None)
+            oldest = ([head[0]] if head else []) + list(self._inflight.values())
+            with self._queue.mutex:
+                queued = self._queue.queue[0] if self._queue.queue else None
+            if queued:
+                oldest.append(queued[1])
+            return WatchStats(watched_dirs=len(self._wds), pending=len(self._pending),
+                              queued=self._queue.qsize(),
+                              lag=(now - min(oldest)) if oldest else 0.0, **self._counts)
+
+    def _report(self, force: bool = False):
+        """Publish stats if they changed, at most once per ``stats_interval``."""
+        if not self.on_stats:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.stats_interval:
+            return
+        stats = self.stats()
+        if stats != self._last_stats:
+            self._last_report = now
+            self._last_stats = stats
+            self.on_stats(stats)
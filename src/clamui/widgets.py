@@ -1,8 +1,14 @@
 from __future__ import annotations
-import gi
+import gi, sqlite3, threading
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, Gdk
-from typing import Optional, Iterable
+from gi.repository import Gtk, Gdk, Gio, GLib, Pango
+from typing import Callable, Dict, Optional, Iterable, List, Sequence, Tuple
+
+from .clamd import ScanResult
+from .collector import CoalescingWorker
+from .detections import DetectionStore
+from .journal import query_journal
+from .tracing import span, span_stats, traced
 
 #.sidebar  { background: rgba(0,0,0,0.12); border-radius: 16px; padding: 12px; }
 #.sidebar .btn { margin: 6px 0; }
@@ -54,24 +60,269 @@ class IconSideBar(Gtk.Box):
             b.set_child(Gtk.Image.new_from_icon_name(icon))
             self.append(b)
 
-class SimpleList(Gtk.ScrolledWindow):
+def compute_splices(old: Sequence[str], new: Sequence[str]) -> List[Tuple[int, int, Sequence[str]]]:
+    """Return ``(position, n_removed, added)`` splices that turn ``old`` into ``new``.
+
+    Recognises the two shapes produced by the dashboard cheaply: growth at
+    the tail (detections) and a ring buffer that drops lines at the head
+    while appending at the tail (daemon log). Anything else falls back to a
+    single replace-all splice.
+    """
+    n_old, n_new = len(old), len(new)
+    if n_old == 0 or n_new == 0:
+        return [(0, n_old, new)] if n_old or n_new else []
+    if n_new >= n_old and new[:n_old] == old:
+        return [(n_old, 0, new[n_old:])] if n_new > n_old else []
+    # Head dropped: find k such that old[k:] is a prefix of new.
+    k = 0
+    while True:
+        try:
+            k = old.index(new[0], k + 1)
+        except ValueError:
+            break
+        if n_old - k <= n_new and new[:n_old - k] == old[k:]:
+            ops: List[Tuple[int, int, Sequence[str]]] = [(0, k, ())]
+            if n_new > n_old - k:
+                ops.append((n_old - k, 0, new[n_old - k:]))
+            return ops
+    return [(0, n_old, new)]
+
+class VirtualList(Gtk.ScrolledWindow):
+    """Recycling list view backed by a ``Gio.ListStore`` of strings.
+
+    Only visible rows have widgets; ``set_items`` applies the minimal
+    splices to the model instead of rebuilding it.
+    """
+
     def __init__(self, height = 300):
         super().__init__()
         self.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-        self.listbox = Gtk.ListBox()
         self.set_size_request(-1, height)
-        self.set_child(self.listbox)
+        self.store = Gio.ListStore(item_type=Gtk.StringObject)
+        self._items: List[str] = []
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", lambda _f, item: item.set_child(Gtk.Label(xalign=0)))
+        factory.connect("bind", lambda _f, item: item.get_child().set_label(item.get_item().get_string()))
+        self.view = Gtk.ListView(model=Gtk.NoSelection(model=self.store), factory=factory)
+        self.set_child(self.view)
 
     def set_items(self, items: Iterable[str]):
-        # GTK4: remove children via first/next
-        child = self.listbox.get_first_child()
-        while child is not None:
-            nxt = child.get_next_sibling()
-            self.listbox.remove(child)
-            child = nxt
-        for s in items:
-            self.listbox.append(Gtk.Label(label=s, xalign=0))
-        self.listbox.show()
+        new = list(items)
+        with span("VirtualList.set_items", rows=len(new)):
+            for pos, n_removed, added in compute_splices(self._items, new):
+                self.store.splice(pos, n_removed, [Gtk.StringObject.new(s) for s in added])
+        self._items = new
+
+    def append_items(self, items: Sequence[str], limit: Optional[int] = None):
+        """Append ``items``, dropping rows from the head beyond ``limit``."""
+        self.store.splice(len(self._items), 0, [Gtk.StringObject.new(s) for s in items])
+        self._items.extend(items)
+        excess = len(self._items) - limit if limit else 0
+        if excess > 0:
+            self.store.splice(0, excess, [])
+            del self._items[:excess]
+
+class DetectionHistory(Gtk.Box):
+    """Paginated, filterable view over a ``DetectionStore``.
+
+    The filter matches a path prefix when it starts with ``/`` and a
+    signature prefix otherwise; both are answered from the store's indexes.
+    Queries, including the counts, run on one worker thread. Reloads are
+    debounced by ``delay_ms`` and coalesced while a query runs, so a burst
+    of new detections costs one query rather than one per row.
+    """
+
+    def __init__(self, store: DetectionStore, page_size: int = 200, height: int = 200,
+                 delay_ms: int = 250):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.store = store
+        self.page_size = page_size
+        self.delay_ms = delay_ms
+        self.page = 0
+        self.total = 0
+        self._generation = 0
+        self._params = (0, 0, "")             # generation, page, query for the worker
+        self._timer: Optional[int] = None
+        self._worker = CoalescingWorker(self._query, lambda shown: GLib.idle_add(self._show, *shown))
+
+        bar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.search = Gtk.SearchEntry(placeholder_text="Filter by /path prefix or signature")
+        self.search.set_hexpand(True)
+        self.search.connect("search-changed", lambda _e: self.reload(first_page=True))
+        self.btn_prev = Gtk.Button(icon_name="go-previous-symbolic")
+        self.btn_prev.connect("clicked", lambda _b: self._turn(-1))
+        self.btn_next = Gtk.Button(icon_name="go-next-symbolic")
+        self.btn_next.connect("clicked", lambda _b: self._turn(1))
+        self.lbl_page = Gtk.Label()
+        for w in (self.search, self.btn_prev, self.lbl_page, self.btn_next):
+            bar.append(w)
+
+        self.list = VirtualList(height=height)
+        self.lbl_counts = Gtk.Label(xalign=0, wrap=True)
+        self.append(bar); self.append(self.list); self.append(self.lbl_counts)
+
+    def _turn(self, delta: int):
+        self.page = max(0, self.page + delta)
+        self.reload()
+
+    def reload(self, first_page: bool = False) -> bool:
+        if first_page:
+            self.page = 0
+        self._generation += 1
+        if self._timer is None:
+            self._timer = GLib.timeout_add(self.delay_ms, self._start_query)
+        return False
+
+    def _start_query(self) -> bool:
+        self._timer = None
+        self._params = (self._generation, self.page, self.search.get_text().strip())
+        self._worker.request()
+        return False
+
+    @traced("DetectionHistory.query")
+    def _query(self):
+        generation, page, query = self._params
+        try:
+            total = self.store.count(query)
+            last_page = max(0, (total - 1) // self.page_size)
+            page = min(page, last_page)
+            rows = [d.label() for d in self.store.query(page * self.page_size, self.page_size, query)]
+            counts = self.store.counts_by_signature(limit=5)
+        except sqlite3.Error as e:
+            total, rows, counts = 0, [f"Unable to read detection history: {e}"], []
+        return generation, page, total, rows, counts
+
+    def _show(self, generation: int, page: int, total: int, rows: List[str],
+              counts: List[Tuple[str, int]]) -> bool:
+        if generation != self._generation:      # drop results of superseded queries
+            return False
+        self.page, self.total = page, total
+        last_page = max(0, (total - 1) // self.page_size)
+        self.list.set_items(rows)
+
+        start = self.page * self.page_size
+        self.lbl_page.set_text(f"{start + 1 if rows else 0}-{start + len(rows)} of {self.total}")
+        self.btn_prev.set_sensitive(self.page > 0)
+        self.btn_next.set_sensitive(self.page < last_page)
+        self.lbl_counts.set_markup("<b>TOP SIGNATURES:</b> " + (
+            ", ".join(f"{GLib.markup_escape_text(sig)} ({n})" for sig, n in counts) or "none"))
+        return False
+
+class ActionHistory(Gtk.Box):
+    """Newest remediation actions from the action journal, filterable.
+
+    Queries run on a worker thread and only read the journal batches needed
+    for one page (see ``query_journal``).
+    """
+    ACTIONS = ("all", "deleted", "quarantined", "ignored")
+
+    def __init__(self, journal_path: str, limit: int = 200, height: int = 160):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.journal_path = journal_path
+        self.limit = limit
+        self._generation = 0
+
+        bar = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.search = Gtk.SearchEntry(placeholder_text="Filter by /path prefix or signature")
+        self.search.set_hexpand(True)
+        self.search.connect("search-changed", lambda _e: self.reload())
+        self.action = Gtk.DropDown.new_from_strings(list(self.ACTIONS))
+        self.action.connect("notify::selected", lambda *_a: self.reload())
+        bar.append(self.search); bar.append(self.action)
+        self.list = VirtualList(height=height)
+        self.append(bar); self.append(self.list)
+
+    def reload(self):
+        self._generation += 1
+        action = self.ACTIONS[self.action.get_selected()]
+        threading.Thread(target=self._query, daemon=True, args=(
+            self._generation, self.search.get_text().strip(), None if action == "all" else action)).start()
+
+    def _query(self, generation: int, query: str, action: Optional[str]):
+        try:
+            with span("query_journal"):
+                rows = [r.label() for r in query_journal(self.journal_path, query=query, action=action,
+                                                         limit=self.limit)]
+        except OSError as e:
+            rows = [f"Unable to read {self.journal_path}: {e}"]
+        GLib.idle_add(self._show, generation, rows)
+
+    def _show(self, generation: int, rows: List[str]) -> bool:
+        if generation == self._generation:      # drop results of superseded queries
+            self.list.set_items(rows or ["No remediation actions recorded"])
+        return False
+
+class JobsPanel(Gtk.Box):
+    """Non-modal list of scan jobs, one row each with Details and Cancel buttons.
+
+    Rows are created on first sight of a job and updated in place; the
+    callbacks receive the job id.
+    """
+
+    def __init__(self, on_cancel: Callable[[int], None], on_details: Callable[[int], None],
+                 on_clear: Callable[[], List[int]], height: int = 120):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.on_cancel = on_cancel
+        self.on_details = on_details
+        self._rows: Dict[int, Tuple[Gtk.ListBoxRow, Gtk.Label, Gtk.Button]] = {}
+        scroller = Gtk.ScrolledWindow()
+        scroller.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroller.set_size_request(-1, height)
+        self.listbox = Gtk.ListBox(selection_mode=Gtk.SelectionMode.NONE)
+        self.listbox.set_placeholder(Gtk.Label(label="No scans. Use Scan to queue files or folders."))
+        scroller.set_child(self.listbox)
+        btn_clear = Gtk.Button(label="Clear finished")
+        btn_clear.set_halign(Gtk.Align.END)
+        btn_clear.connect("clicked", lambda _b: self._remove(on_clear()))
+        self.append(scroller); self.append(btn_clear)
+
+    def update(self, job) -> bool:
+        entry = self._rows.get(job.id)
+        if entry is None:
+            box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+            label = Gtk.Label(xalign=0, hexpand=True, ellipsize=Pango.EllipsizeMode.MIDDLE)
+            btn_details = Gtk.Button(label="Details")
+            btn_details.connect("clicked", lambda _b, i=job.id: self.on_details(i))
+            btn_cancel = Gtk.Button(icon_name="process-stop-symbolic", tooltip_text="Cancel")
+            btn_cancel.connect("clicked", lambda _b, i=job.id: self.on_cancel(i))
+            for w in (label, btn_details, btn_cancel):
+                box.append(w)
+            row = Gtk.ListBoxRow(child=box)
+            self.listbox.append(row)
+            entry = self._rows[job.id] = (row, label, btn_cancel)
+        _row, label, btn_cancel = entry
+        label.set_text(job.label())
+        label.set_tooltip_text(job.summary or job.progress or job.target)
+        btn_cancel.set_sensitive(not job.done)
+        return False
+
+    def _remove(self, ids: List[int]):
+        for i in ids:
+            entry = self._rows.pop(i, None)
+            if entry is not None:
+                self.listbox.remove(entry[0])
+
+class PerfPanel(Gtk.Box):
+    """Recent span latencies and percentiles from ``tracing``, refreshed every few seconds."""
+
+    def __init__(self, interval: int = 2, height: int = 160):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.list = VirtualList(height=height)
+        self.list.add_css_class("monospace")
+        self.append(self.list)
+        self._source = GLib.timeout_add_seconds(interval, self.update)
+        self.update()
+
+    def update(self) -> bool:
+        rows = [s.label() for s in span_stats()]
+        self.list.set_items(rows or ["No spans recorded yet"])
+        return True
+
+    def stop(self):
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
 
 class CommonStatusBadge(Gtk.Box):
     def __init__(self):
@@ -109,3 +360,78 @@ class CommonStatusBadge(Gtk.Box):
         emoji = status_config.get(status, status_config["unknown"])
         self.emoji_label.set_markup(f'<span size="300%">{emoji}</span>')
         self.details_label.set_text(details)        
+
+class ScanResultsWindow(Gtk.Window):
+    """Non-modal, growing view of a running scan.
+
+    Results are buffered and flushed to the list a few times per second, and
+    only the most recent ``max_rows`` findings are kept, so a scan producing
+    millions of lines stays in bounded memory.
+    """
+
+    def __init__(self, parent: Gtk.Window, path: str, max_rows: int = 10000,
+                 flush_ms: int = 200):
+        super().__init__(transient_for=parent, modal=False)
+        self.set_title(f"Scan: {path}"); self.set_default_size(640, 420)
+        self.max_rows = max_rows
+        self.flush_ms = flush_ms
+        self.clean = self.infected = self.errors = 0
+        self._pending: List[str] = []
+        self._source: Optional[int] = None
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8,
+                      margin_top=12, margin_bottom=12, margin_start=12, margin_end=12)
+        self.lbl_status = Gtk.Label(label="Scanning...", xalign=0)
+        self.lbl_counters = Gtk.Label(xalign=0)
+        self.list_results = VirtualList(height=280)
+        self.list_results.set_vexpand(True)
+        self.lbl_summary = Gtk.Label(xalign=0, selectable=True)
+        btn_close = Gtk.Button(label="Close")
+        btn_close.set_halign(Gtk.Align.END)
+        btn_close.connect("clicked", lambda _b: self.close())
+        for w in (self.lbl_status, self.lbl_counters, self.list_results, self.lbl_summary, btn_close):
+            box.append(w)
+        self.set_child(box)
+        self._update_counters()
+
+    def _update_counters(self):
+        self.lbl_counters.set_markup(
+            f"<b>Scanned:</b> {self.clean + self.infected + self.errors}   "
+            f"<b>Infected:</b> {self.infected}   <b>Errors:</b> {self.errors}")
+
+    def _schedule(self):
+        if self._source is None:
+            self._source = GLib.timeout_add(self.flush_ms, self._flush)
+
+    def _flush(self) -> bool:
+        self._source = None
+        if self._pending:
+            self.list_results.append_items(self._pending, limit=self.max_rows)
+            self._pending = []
+        self._update_counters()
+        return False
+
+    def count_clean(self, n: int = 1):
+        self.clean += n
+        self._schedule()
+
+    def add_result(self, r: ScanResult) -> bool:
+        if r.status == "OK":
+            self.clean += 1
+        else:
+            if r.infected: self.infected += 1
+            else: self.errors += 1
+            self._pending.append(f"{r.path}: {r.detail} {r.status}")
+            del self._pending[:-self.max_rows]
+        self._schedule()
+        return False
+
+    def set_progress(self, text: str) -> bool:
+        self.lbl_status.set_text(text)
+        return False
+
+    def finish(self, summary: str) -> bool:
+        self._flush()
+        self.lbl_status.set_text("Scan finished")
+        self.lbl_summary.set_text(summary)
+        return False
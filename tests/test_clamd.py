@@ -0,0 +1,108 @@
+import io, os, sys, textwrap, time
+
+import pytest
+
+from fake_clamd import FakeClamd
+from generators import EICAR
+from clamui.clamd import ClamdClient, ClamdError, ScanResult, parse_reply
+from clamui.jobs import JobManager
+from clamui.scan_engine import ParallelScanner
+from clamui.scanner import scan_with_clamd
+
+@pytest.fixture
+def clamd():
+    with FakeClamd() as fc:
+        yield fc
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "clean.txt").write_bytes(b"hello")
+    (tmp_path / "sub" / "eicar.com").write_bytes(EICAR)
+    # Not valid UTF-8: os.walk/scandir hand this out surrogate-escaped.
+    odd = os.path.join(str(tmp_path), os.fsdecode(b"odd-\xff.bin"))
+    with open(odd, "wb") as fh:
+        fh.write(EICAR)
+    return tmp_path, odd
+
+@pytest.fixture
+def fake_clamscan(tmp_path_factory):
+    """A clamscan stand-in that flags files containing EICAR, like the real one with --stdout."""
+    script = tmp_path_factory.mktemp("bin") / "clamscan"
+    script.write_text(f"#!{sys.executable}\n" + textwrap.dedent("""\
+        import os, sys
+        EICAR = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+        paths = [a for a in sys.argv[1:] if not a.startswith("-")]
+        for a in sys.argv[1:]:
+            if a.startswith("--file-list="):
+                with open(a.split("=", 1)[1], "rb") as fh:
+                    paths += [os.fsdecode(p) for p in fh.read().split(b"\\n") if p]
+        out = sys.stdout.buffer
+        for p in paths:
+            with open(p, "rb") as fh:
+                hit = EICAR in fh.read()
+            out.write(os.fsencode(p) + (b": Eicar-Signature FOUND\\n" if hit else b": OK\\n"))
+        sys.exit(1 if hit else 0)
+        """))
+    script.chmod(0o755)
+    return str(script)
+
+def test_parse_reply():
+    assert parse_reply("/a b: Eicar-Signature FOUND") == ScanResult("/a b", "FOUND", "Eicar-Signature")
+    assert parse_reply("/x: OK") == ScanResult("/x", "OK")
+    assert parse_reply("/y: lstat() failed. ERROR") == ScanResult("/y", "ERROR", "lstat() failed.")
+    assert parse_reply("/a: b/c: Can't open file or directory ERROR") == \
+        ScanResult("/a: b/c", "ERROR", "Can't open file or directory")
+    assert parse_reply("/a: b: lstat() failed: No such file or directory. ERROR") == \
+        ScanResult("/a: b", "ERROR", "lstat() failed: No such file or directory.")
+    with pytest.raises(ClamdError):
+        parse_reply("garbage")
+
+def test_session_reuses_connection(clamd, tree):
+    root, _odd = tree
+    with ClamdClient(clamd.path) as client:
+        assert client.version().startswith("ClamAV")
+        for _ in range(3):
+            assert client.scan_file(str(root / "clean.txt")).status == "OK"
+        assert client.scan_file(str(root / "sub" / "eicar.com")).infected
+    assert clamd.connections == 1
+
+def test_instream(clamd):
+    with ClamdClient(clamd.path) as client:
+        assert client.instream(io.BytesIO(b"x" * 200000 + EICAR)).infected
+        assert client.instream(io.BytesIO(b"clean")).status == "OK"
+
+def test_multiscan_reply_parsing(clamd, tree):
+    root, odd = tree
+    results = ClamdClient(clamd.path).multiscan(str(root))
+    assert {r.path for r in results} == {str(root / "sub" / "eicar.com"), odd}
+    assert all(r.infected and r.detail == "Eicar-Signature" for r in results)
+
+def test_non_utf8_path_round_trips(clamd, tree):
+    _root, odd = tree
+    with ClamdClient(clamd.path) as client:
+        r = client.scan_file(odd)
+    assert r.infected and r.path == odd
+
+def test_scan_with_clamd_raises_when_down(tmp_path):
+    with pytest.raises(ClamdError):
+        scan_with_clamd(str(tmp_path / "missing.ctl"), str(tmp_path))
+
+def test_clamscan_fallback_for_trees(tmp_path, tree, fake_clamscan):
+    root, odd = tree
+    found = []
+    scanner = ParallelScanner(str(tmp_path / "missing.ctl"), workers=2, clamscan=fake_clamscan,
+                              on_result=found.append)
+    stats = scanner.run(str(root))
+    assert stats.files == 3 and stats.infected == 2 and stats.errors == 0
+    assert {r.path for r in found} == {str(root / "sub" / "eicar.com"), odd}
+
+def test_clamscan_fallback_for_files(tmp_path, tree, fake_clamscan):
+    root, _odd = tree
+    manager = JobManager(str(tmp_path / "missing.ctl"), clamscan=fake_clamscan)
+    job = manager.submit(str(root / "sub" / "eicar.com"))
+    for _ in range(200):
+        if job.done:
+            break
+        time.sleep(0.02)
+    assert job.state == "done" and job.infected == 1
@@ -0,0 +1,69 @@
+import json, os
+
+import pytest
+
+from fake_clamd import FakeClamd
+from clamui import cli, utils
+from clamui.detections import Detection, DetectionStore
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """A clamui.conf pointing every path into ``tmp_path``."""
+    def configure(socket: str):
+        conf = tmp_path / "clamui.conf"
+        conf.write_text(f"[logs]\nclamd-log={tmp_path}/clamd.log\nfreshclam-log={tmp_path}/freshclam.log\n"
+                        f"[clamd]\nsocket={socket}\n[paths]\ndatabase-dir={tmp_path}/db\n"
+                        f"[history]\ndb={tmp_path}/history.sqlite\n")
+        monkeypatch.setattr(utils, "CONF_ETC", conf)
+    (tmp_path / "clamd.log").write_text("")
+    return configure
+
+def run_status(capsys, *args):
+    rc = cli.status_main(["--json", *args])
+    return rc, json.loads(capsys.readouterr().out)
+
+def test_daemon_down(tmp_path, env, capsys):
+    env(str(tmp_path / "missing.ctl"))
+    rc, status = run_status(capsys)
+    assert rc == cli.EXIT_DAEMON_DOWN
+    assert status["daemon"]["active"] is False and status["health"] == "unknown"
+    assert set(status) == {"time", "daemon", "health", "detections", "database", "last_update", "errors"}
+
+def test_healthy_without_history(tmp_path, env, capsys):
+    with FakeClamd() as fc:
+        env(fc.path)
+        rc, status = run_status(capsys)
+    assert rc == cli.EXIT_OK and status["health"] == "healthy"
+    assert status["daemon"]["engine"].startswith("ClamAV")
+    assert status["detections"]["total"] == 0
+    assert any(e.startswith("history:") for e in status["errors"])
+    assert not (tmp_path / "history.sqlite").exists()
+
+def test_infected_from_saved_state_without_writing(tmp_path, env, capsys):
+    store = DetectionStore(tmp_path / "history.sqlite")
+    store.add([Detection(1.0, "/a", "Eicar", "clamd"), Detection(2.0, "/b", "Eicar", "scan")])
+    st = os.stat(tmp_path / "clamd.log")
+    store.set_meta("clamd_log_state", f"{st.st_dev}:{st.st_ino}:0")
+    store.set_meta("clamd_log_infected", "1")
+    store.close()
+    (tmp_path / "clamd.log").write_text("Sat Jan  6 10:00:00 2024 -> /c: Other FOUND\n")
+    with FakeClamd() as fc:
+        env(fc.path)
+        rc, status = run_status(capsys, "--recent", "1")
+    assert rc == cli.EXIT_INFECTED and status["health"] == "infected"
+    d = status["detections"]
+    assert d["current_log"] == 1 and d["total"] == 2 and d["by_signature"] == {"Eicar": 2}
+    assert [r["path"] for r in d["recent"]] == ["/b"]
+    # The new log line was not ingested and nothing was recorded.
+    store = DetectionStore(tmp_path / "history.sqlite")
+    assert store.count() == 2 and store.get_meta("clamd_log_state") == f"{st.st_dev}:{st.st_ino}:0"
+
+def test_saved_count_ignored_after_rotation(tmp_path, env, capsys):
+    store = DetectionStore(tmp_path / "history.sqlite")
+    store.set_meta("clamd_log_state", "0:0:0")
+    store.set_meta("clamd_log_infected", "4")
+    store.close()
+    with FakeClamd() as fc:
+        env(fc.path)
+        rc, status = run_status(capsys)
+    assert rc == cli.EXIT_OK and status["detections"]["current_log"] == 0
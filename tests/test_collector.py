@@ -0,0 +1,27 @@
+from clamui import collector
+from clamui.collector import StatusCollector
+from clamui.detections import DetectionStore
+
+def test_systemctl_fallback_uses_configured_unit(tmp_path, monkeypatch):
+    calls = []
+    def try_run(cmd):
+        calls.append(cmd)
+        return 0, "active", ""
+    monkeypatch.setattr(collector, "try_run", try_run)
+    c = StatusCollector(str(tmp_path / "clamd.log"), str(tmp_path / "freshclam.log"),
+                        DetectionStore(":memory:"), daemon_probe=lambda: None, daemon_unit="clamd@scan")
+    assert c.daemon_active()
+    assert calls == [["systemctl", "is-active", "clamd@scan"]]
+
+def test_detections_before_the_tail_window_are_ingested(tmp_path):
+    log = tmp_path / "clamd.log"
+    lines = [f"Mon Nov 13 10:00:{i % 60:02d} 2023 -> /tmp/f{i}: Eicar-Test-Signature FOUND\n"
+             for i in range(500)]
+    log.write_text("".join(lines))
+    history = DetectionStore(":memory:")
+    c = StatusCollector(str(log), str(tmp_path / "freshclam.log"), history, daemon_probe=lambda: True)
+    c.clamd_tail.backfill = 1000
+    snap = c.collect()
+    assert c.clamd_tail.skipped > 0
+    assert len(c.clamd_tail.lines) < 500
+    assert snap.infected == 500 and history.count() == 500
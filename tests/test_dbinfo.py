@@ -0,0 +1,22 @@
+from clamui.dbinfo import CVD_HEADER_SIZE, CvdInfo, read_cvd_header
+
+def write_cvd(path, header: str, body: bytes = b"\x1f\x8b" + b"\0" * 64):
+    path.write_bytes(header.encode().ljust(CVD_HEADER_SIZE, b" ") + body)
+    return str(path)
+
+def test_header_fields(tmp_path):
+    path = write_cvd(tmp_path / "daily.cvd",
+                     "ClamAV-VDB:14 Nov 2023 07:37 -0500:27093:2075432:90:"
+                     "6d5d0d8c2a7e8a8c1b3d0e4f0a1b2c3d:dsigPLACEHOLDER:raynman:1699965449")
+    assert read_cvd_header(path) == CvdInfo("daily.cvd", "14 Nov 2023 07:37 -0500", 27093, 2075432,
+                                            90, "raynman", 1699965449)
+
+def test_header_without_stime(tmp_path):
+    path = write_cvd(tmp_path / "main.cvd", "ClamAV-VDB:16 Sep 2021 08:32 -0400:62:6647427:90:md5:dsig:sigmgr")
+    info = read_cvd_header(path)
+    assert (info.version, info.sigs, info.builder, info.stime) == (62, 6647427, "sigmgr", 0)
+
+def test_not_a_database(tmp_path):
+    assert read_cvd_header(write_cvd(tmp_path / "daily.cld", "SQLite format 3")) is None
+    assert read_cvd_header(write_cvd(tmp_path / "bad.cvd", "ClamAV-VDB:x:y:z")) is None
+    assert read_cvd_header(str(tmp_path / "missing.cvd")) is None
@@ -0,0 +1,13 @@
+import sqlite3
+
+import pytest
+
+from clamui.detections import Detection, DetectionStore
+
+def test_failed_insert_rolls_back(tmp_path):
+    store = DetectionStore(tmp_path / "history.sqlite")
+    with pytest.raises(sqlite3.Error):
+        store.add([Detection(1.0, "/a", "Eicar"), Detection(2.0, "/b", object())])
+    assert not store._db.in_transaction and store.count() == 0
+    assert store.add([Detection(1.0, "/a", "Eicar"), Detection(1.0, "/a", "Eicar")]) == 1
+    assert store.count() == 1
@@ -0,0 +1,13 @@
+import os
+
+from clamui.journal import ActionJournal
+
+def test_rotation_without_backups_starts_over(tmp_path):
+    path = str(tmp_path / "actions.jsonl")
+    journal = ActionJournal(path, max_bytes=200, backups=0, batch_size=1, fsync=False)
+    for i in range(10):
+        journal.record(f"/tmp/f{i}", "Eicar-Test-Signature", "quarantine")
+    assert sorted(os.listdir(tmp_path)) == ["actions.jsonl", "actions.jsonl.idx"]
+    assert os.path.getsize(path) <= 200
+    with open(path + ".idx") as fh:
+        assert fh.readline().split()[1] == "0"
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from generators import FRESHCLAM_BLOCK, generate_clamd_log, generate_freshclam_log
+from clamui.log_parser import (UPDATE_MARKER, parse_detection_buffer, parse_detection_file,
+                               parse_detections, parse_freshclam_file, read_last_update_block)
+
+LOG = (b"Mon Nov 13 10:00:00 2023 -> /tmp/a: Eicar-Test-Signature FOUND\n"
+       b"Mon Nov 13 10:00:01 2023 -> /tmp/b: Clean line\n"
+       b"Mon Nov 13 10:00:02 2023 -> /tmp/c: Win.Test-1 FOUND\n")
+
+def test_end_stops_the_scan():
+    second = LOG.index(b"Mon Nov 13 10:00:02")
+    assert [r.path for r in parse_detection_buffer(LOG, end=second)] == ["/tmp/a"]
+    assert [r.path for r in parse_detection_buffer(LOG, offset=second)] == ["/tmp/c"]
+
+def last_block(lines):
+    marker = max(i for i, l in enumerate(lines) if UPDATE_MARKER.decode() in l)
+    return lines[marker:]
+
+@pytest.mark.parametrize("chunk", [7, 100, 333, 1 << 16])
+def test_reverse_read_matches_a_forward_read(tmp_path, chunk):
+    path = str(tmp_path / "freshclam.log")
+    generate_freshclam_log(path, 20)
+    with open(path) as fh:
+        lines = fh.read().splitlines()
+    assert read_last_update_block(path, chunk) == last_block(lines)
+
+def test_reverse_read_of_a_single_block(tmp_path):
+    path = str(tmp_path / "freshclam.log")
+    generate_freshclam_log(path, 1)
+    with open(path) as fh:
+        lines = fh.read().splitlines()
+    assert read_last_update_block(path, 16) == lines[1:]
+
+def test_reverse_read_without_a_marker(tmp_path):
+    path = tmp_path / "freshclam.log"
+    path.write_text("".join(f"line {i}\n" for i in range(100)))
+    assert read_last_update_block(str(path), 16) == [f"line {i}" for i in range(100)]
+    assert read_last_update_block(str(path), 16, max_bytes=40) == [f"line {i}" for i in range(95, 100)]
+
+def test_freshclam_summary_is_cached_until_the_file_changes(tmp_path):
+    path = str(tmp_path / "freshclam.log")
+    generate_freshclam_log(path, 2)
+    first = parse_freshclam_file(path)
+    assert parse_freshclam_file(path) is first
+    assert first.components["daily.cld"].version == 27000
+    with open(path, "a") as fh:
+        fh.write(FRESHCLAM_BLOCK.format(stamp="Tue Nov 14 22:13:20 2023", daily=27001))
+    second = parse_freshclam_file(path)
+    assert second.last_update == "Tue Nov 14 22:13:20 2023"
+    assert second.components["daily.cld"].version == 27001
+    generate_freshclam_log(path + ".new", 2)
+    os.replace(path + ".new", path)         # same size, new inode
+    assert parse_freshclam_file(path) == first
+
+def test_buffer_parse_matches_the_line_parser(tmp_path):
+    path = str(tmp_path / "clamd.log")
+    hits = generate_clamd_log(path, 0.2, 0.01)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    records = parse_detection_buffer(data)
+    assert len(records) == hits
+    assert records == parse_detections(data.decode().splitlines())
+    assert parse_detection_file(path) == records
+
+def test_stamped_only_skips_lines_without_logtime():
+    buf = (b"/tmp/x: Eicar-Test-Signature FOUND\n" + LOG +
+           b"/tmp/y: Win.Test-2 FOUND")                   # unterminated last line
+    assert [r.path for r in parse_detection_buffer(buf)] == ["/tmp/x", "/tmp/a", "/tmp/c", "/tmp/y"]
+    stamped = parse_detection_buffer(buf, stamped_only=True)
+    assert [(r.path, r.signature) for r in stamped] == [("/tmp/a", "Eicar-Test-Signature"),
+                                                        ("/tmp/c", "Win.Test-1")]
+    assert stamped[1].ts - stamped[0].ts == 2
@@ -0,0 +1,24 @@
+import gzip, os
+
+from clamui.log_set import LogSet
+
+STAMPED = "Sat Jan  6 10:00:00 2024 -> /home/u/eicar.com: Eicar-Signature FOUND\n"
+UNSTAMPED = "/home/u/other.com: Eicar-Signature FOUND\n"
+
+def test_compressed_generation_is_not_duplicated(tmp_path):
+    log = tmp_path / "clamd.log"
+    log.write_text("")
+    (tmp_path / "clamd.log.1").write_text(STAMPED + UNSTAMPED)
+    store = set()
+    seen = []
+    def sink(records):
+        seen.extend(records); store.update(tuple(r) for r in records)
+    logs = LogSet(str(log))
+    assert logs.ingest(sink) == 1
+    # logrotate compresses .1 into a new file with a new inode
+    with gzip.open(tmp_path / "clamd.log.2.gz", "wb") as fh:
+        fh.write((tmp_path / "clamd.log.1").read_bytes())
+    os.unlink(tmp_path / "clamd.log.1")
+    assert logs.ingest(sink) == 1
+    assert logs.ingest(sink) == 0
+    assert len(store) == 1 and [r.path for r in seen] == ["/home/u/eicar.com"] * 2
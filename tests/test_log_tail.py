@@ -0,0 +1,39 @@
+import os
+
+from clamui.log_tail import LogTail
+
+def test_rotation_keeps_lines_written_before_it(tmp_path):
+    path = str(tmp_path / "clamd.log")
+    with open(path, "w") as fh:
+        fh.write("one\n")
+    tail = LogTail(path)
+    assert tail.poll() == (True, ["one"])
+    with open(path, "a") as fh:
+        fh.write("two\nthree")                  # last line not yet terminated
+    os.replace(path, path + ".1")
+    with open(path, "w") as fh:
+        fh.write("four\n")
+    assert tail.poll() == (True, ["two", "three", "four"])
+    st = os.stat(path + ".1")
+    assert tail.rotated == (st.st_dev, st.st_ino, st.st_size)
+    assert list(tail.lines) == ["four"]
+
+def test_first_poll_of_large_log_starts_near_eof(tmp_path):
+    path = str(tmp_path / "clamd.log")
+    with open(path, "w") as fh:
+        fh.writelines(f"line {i}\n" for i in range(1000))
+    tail = LogTail(path, backfill=100)
+    reset, lines = tail.poll()
+    assert reset and lines == [f"line {i}" for i in range(989, 1000)]
+    assert tail.skipped == os.path.getsize(path) - 11 * len("line 999\n")
+    with open(path, "a") as fh:
+        fh.write("more\n")
+    assert tail.poll() == (False, ["more"])
+
+def test_small_log_is_read_whole(tmp_path):
+    path = str(tmp_path / "clamd.log")
+    with open(path, "w") as fh:
+        fh.write("one\ntwo\n")
+    tail = LogTail(path, backfill=100)
+    assert tail.poll() == (True, ["one", "two"])
+    assert tail.skipped == 0
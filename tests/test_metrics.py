@@ -0,0 +1,62 @@
+from clamui import metrics as metrics_mod
+from clamui.detections import Detection, DetectionStore
+from clamui.metrics import ClamavMetrics
+
+def test_detections_count_inserted_rows_from_every_source(tmp_path):
+    store = DetectionStore(tmp_path / "history.sqlite")
+    store.add([Detection(1.0, "/a", "Eicar", "clamd")])
+    m = ClamavMetrics(store)
+    assert m.detections == {"Eicar": 1}
+    store.add([Detection(1.0, "/a", "Eicar", "clamd"),         # duplicate, ignored by the store
+               Detection(2.0, "/b", "Eicar", "scan"), Detection(3.0, "/c", "Trojan", "watch")])
+    m.sync_detections(store)
+    m.sync_detections(store)
+    assert m.detections == {"Eicar": 2, "Trojan": 1}
+
+def test_signature_series_overflow_into_other(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_mod, "MAX_SIGNATURE_SERIES", 2)
+    store = DetectionStore(tmp_path / "history.sqlite")
+    store.add([Detection(float(i), f"/f{i}", sig, "scan")
+               for i, sig in enumerate(["A", "A", "A", "B", "B", "C"])])
+    m = ClamavMetrics(store)
+    assert m.detections == {"A": 3, "B": 2, "other": 1}
+    store.add([Detection(9.0, "/g", "D", "scan"), Detection(10.0, "/h", "A", "scan")])
+    m.sync_detections(store)
+    assert m.detections == {"A": 4, "B": 2, "other": 2}
+
+def test_render_formats(tmp_path):
+    store = DetectionStore(tmp_path / "history.sqlite")
+    store.add([Detection(1.0, "/a", 'Odd"Sig\\1', "scan")])
+    m = ClamavMetrics(store)
+    m.set_daemon(True, 3)
+    m.observe_batch(10, 4096, 0.02)
+    m.observe_scan(2.0)
+    text = m.render()
+    assert text.endswith("# EOF\n")
+    assert "# TYPE clamav_detections counter" in text
+    assert 'clamav_detections_total{signature="Odd\\"Sig\\\\1"} 1' in text
+    assert "clamav_daemon_up 1" in text and "clamav_current_log_detections 3" in text
+    assert 'clamui_scan_file_latency_seconds_bucket{le="0.001"} 0' in text
+    assert 'clamui_scan_file_latency_seconds_bucket{le="0.0025"} 10' in text
+    assert 'clamui_scan_file_latency_seconds_bucket{le="+Inf"} 10' in text
+    assert 'clamui_scan_duration_seconds_bucket{le="1.0"} 0' in text
+    assert "clamui_scan_duration_seconds_count 1" in text
+    prom = m.render(openmetrics=False)
+    assert "# EOF" not in prom and "# TYPE clamav_detections_total counter" in prom
+    # Every sample belongs to the family declared above it.
+    family = None
+    for line in prom.splitlines():
+        if line.startswith("# TYPE "):
+            family = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.startswith(family.rsplit("_total", 1)[0])
+
+def test_render_is_reused_until_something_changes():
+    m = ClamavMetrics()
+    first = m.render()
+    assert m.render() is first
+    m.set_daemon(True, 0)
+    second = m.render()
+    assert "clamav_daemon_up 1" in second
+    m.set_daemon(True, 0)                   # same values: no new version
+    assert m.render() is second
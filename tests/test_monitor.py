@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("gi")
+from gi.repository import Gio, GLib
+from clamui.monitor import DebouncedFileMonitor
+
+CHANGED = Gio.FileMonitorEvent.CHANGED
+
+def run_loop(ms, until=lambda: False):
+    loop = GLib.MainLoop()
+    GLib.timeout_add(ms, loop.quit)
+    def check():
+        if until():
+            loop.quit()
+        return True
+    GLib.timeout_add(10, check)
+    loop.run()
+
+def test_bursts_are_coalesced_and_spaced(tmp_path):
+    calls = []
+    mon = DebouncedFileMonitor([str(tmp_path / "clamd.log")], lambda: calls.append(GLib.get_monotonic_time()),
+                               debounce_ms=20, min_interval_ms=300)
+    for _ in range(5):
+        mon._on_changed(None, None, None, CHANGED)
+    mon._on_changed(None, None, None, Gio.FileMonitorEvent.ATTRIBUTE_CHANGED)
+    run_loop(150)
+    assert len(calls) == 1
+    mon._on_changed(None, None, None, CHANGED)
+    run_loop(150)
+    assert len(calls) == 1                  # held back by min_interval_ms
+    run_loop(1000, lambda: len(calls) == 2)
+    assert len(calls) == 2 and calls[1] - calls[0] >= 300_000
+    mon.cancel()
+
+def test_appends_to_a_watched_file_fire(tmp_path):
+    path = tmp_path / "clamd.log"
+    path.write_text("one\n")
+    calls = []
+    mon = DebouncedFileMonitor([str(path)], lambda: calls.append(1), debounce_ms=20, min_interval_ms=0)
+    run_loop(50)
+    with open(path, "a") as fh:
+        fh.write("two\n")
+    run_loop(3000, lambda: calls)
+    mon.cancel()
+    assert calls
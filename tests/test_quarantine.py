@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from generators import EICAR
+from clamui.quarantine import QuarantineError, QuarantineStore
+
+@pytest.fixture
+def store(tmp_path):
+    s = QuarantineStore(str(tmp_path / "quarantine"))
+    yield s
+    s.close()
+
+def test_add_and_restore(tmp_path, store):
+    victim = tmp_path / "eicar.com"
+    victim.write_bytes(EICAR); victim.chmod(0o640)
+    entry = store.add(str(victim), "Eicar-Signature")
+    assert not victim.exists() and store.count() == 1
+    victim.write_bytes(b"new")
+    with pytest.raises(QuarantineError):
+        store.restore(entry.id)
+    victim.unlink()
+    assert store.restore(entry.id) == str(victim)
+    assert victim.read_bytes() == EICAR and victim.stat().st_mode & 0o777 == 0o640
+    assert store.count() == 0 and sorted(os.listdir(tmp_path)) == ["eicar.com", "quarantine"]
+
+def test_restore_does_not_follow_planted_symlink(tmp_path, store):
+    victim, target = tmp_path / "eicar.com", tmp_path / "target"
+    victim.write_bytes(EICAR)
+    entry = store.add(str(victim), "Eicar-Signature")
+    target.write_bytes(b"keep")
+    os.symlink(target, victim)
+    with pytest.raises(QuarantineError):
+        store.restore(entry.id)
+    store.restore(entry.id, overwrite=True)
+    assert target.read_bytes() == b"keep"
+    assert not victim.is_symlink() and victim.read_bytes() == EICAR
+    assert sorted(os.listdir(tmp_path)) == ["eicar.com", "quarantine", "target"]
+
+def test_failed_hash_leaves_file_in_place(tmp_path, store, monkeypatch):
+    victim = tmp_path / "eicar.com"
+    victim.write_bytes(EICAR)
+    def boom(_path):
+        raise OSError("read error")
+    monkeypatch.setattr(QuarantineStore, "_hash", staticmethod(boom))
+    with pytest.raises(OSError):
+        store.add(str(victim), "Eicar-Signature")
+    assert victim.read_bytes() == EICAR and store.count() == 0
+
+def test_failed_unlink_leaves_no_copy_behind(tmp_path, monkeypatch):
+    store = QuarantineStore(str(tmp_path / "quarantine"), compress=True)      # forces the copy path
+    victim = tmp_path / "eicar.com"
+    victim.write_bytes(EICAR)
+    real_unlink = os.unlink
+    def unlink(path, *a, **kw):
+        if str(path) == str(victim):
+            raise PermissionError(1, "Operation not permitted", str(path))
+        return real_unlink(path, *a, **kw)
+    monkeypatch.setattr(os, "unlink", unlink)
+    with pytest.raises(PermissionError):
+        store.add(str(victim), "Eicar-Signature")
+    assert victim.read_bytes() == EICAR and store.count() == 0
+    assert os.listdir(store.tmp) == [] and os.listdir(store.objects) == []
+    store.close()
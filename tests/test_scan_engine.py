@@ -0,0 +1,71 @@
+import sqlite3, threading
+
+from fake_clamd import FakeClamd
+from generators import generate_tree
+from clamui.scan_engine import ParallelScanner
+from clamui.verdict_cache import VerdictCache
+
+class BrokenCache:
+    def set_db_version(self, version):
+        pass
+
+    def unchanged(self, keys):
+        raise sqlite3.OperationalError("database is locked")
+
+def test_failing_batches_do_not_hang_the_scan(tmp_path):
+    generate_tree(str(tmp_path), 200, 0, fanout=4, size=64)
+    checkpoints = []
+    with FakeClamd() as fc:
+        scanner = ParallelScanner(fc.path, workers=2, batch_size=4, cache=BrokenCache(),
+                                  on_checkpoint=lambda *c: checkpoints.append(c))
+        t = threading.Thread(target=scanner.run, args=(str(tmp_path),), daemon=True)
+        t.start(); t.join(10)
+    assert not t.is_alive()
+    assert scanner.stats.files == 200 and scanner.stats.errors == 200
+    assert scanner.stats.failed_batches == 50 and checkpoints == []
+
+def test_broken_observers_do_not_change_verdicts(tmp_path):
+    generate_tree(str(tmp_path), 100, 10, fanout=4, size=64)
+    def boom(*_a):
+        raise RuntimeError("boom")
+    checkpoints = []
+    with FakeClamd() as fc:
+        stats = ParallelScanner(fc.path, workers=2, batch_size=4, on_batch=boom, on_result=boom,
+                                on_checkpoint=lambda *c: checkpoints.append(c)).run(str(tmp_path))
+    assert (stats.files, stats.infected, stats.errors, stats.failed_batches) == (100, 10, 0, 0)
+    assert len(checkpoints) >= 1
+
+def test_cache_skips_only_clean_files(tmp_path):
+    root = tmp_path / "tree"
+    generate_tree(str(root), 100, 5, fanout=4, size=64)
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"))
+    with FakeClamd() as fc:
+        first = ParallelScanner(fc.path, workers=2, batch_size=8, cache=cache).run(str(root))
+        found = []
+        second = ParallelScanner(fc.path, workers=2, batch_size=8, cache=cache,
+                                 on_result=found.append).run(str(root))
+    assert first.infected == second.infected == 5
+    assert second.skipped == 95 and len(found) == 5
+
+class FirstBatchFails(BrokenCache):
+    def __init__(self):
+        self.calls = 0
+
+    def unchanged(self, keys):
+        self.calls += 1
+        if self.calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return [False for _k in keys]
+
+    def mark_clean(self, keys):
+        pass
+
+def test_batches_beyond_a_failed_one_are_not_kept(tmp_path):
+    generate_tree(str(tmp_path), 100, 0, fanout=4, size=64)
+    checkpoints = []
+    with FakeClamd() as fc:
+        scanner = ParallelScanner(fc.path, workers=1, batch_size=4, cache=FirstBatchFails(),
+                                  on_checkpoint=lambda *c: checkpoints.append(c))
+        stats = scanner.run(str(tmp_path))
+    assert stats.failed_batches == 1 and stats.files == 100
+    assert checkpoints == [] and scanner._done == {}
@@ -0,0 +1,44 @@
+import sys
+
+from fake_clamd import FakeClamd
+from generators import generate_tree
+from clamui.scan_engine import ParallelScanner
+from clamui.scheduler import RootState, ScanScheduler, load_state, save_state
+
+def test_cycle_completes(tmp_path):
+    root, state = tmp_path / "tree", str(tmp_path / "schedule.json")
+    generate_tree(str(root), 50, 2, fanout=4, size=64)
+    with FakeClamd() as fc:
+        stats = ScanScheduler([str(root)], fc.path, state_path=state, batch_size=8).scan(str(root))
+    st = load_state(state)[str(root)]
+    assert stats.failed_batches == 0 and st.status == "done"
+    assert st.after is None and st.last_complete > 0 and st.files == 50 and st.infected == 2
+
+def test_failed_batches_are_not_a_completed_cycle(tmp_path):
+    root, state = tmp_path / "tree", str(tmp_path / "schedule.json")
+    generate_tree(str(root), 50, 0, fanout=4, size=64)
+    broken = tmp_path / "clamscan"
+    broken.write_text(f"#!{sys.executable}\nimport sys\nsys.exit(2)\n")
+    broken.chmod(0o755)
+    sched = ScanScheduler([str(root)], str(tmp_path / "missing.ctl"), state_path=state,
+                          clamscan=str(broken))
+    stats = sched.scan(str(root))
+    st = load_state(state)[str(root)]
+    assert stats.failed_batches == 1 and stats.errors == 50
+    assert st.status == "error" and st.after is None and st.last_complete == 0
+    assert sched.next_due(str(root)) <= sched.interval
+
+def test_resume_counts_only_up_to_the_checkpoint(tmp_path):
+    root, state = tmp_path / "tree", str(tmp_path / "schedule.json")
+    generate_tree(str(root), 50, 2, fanout=4, size=64)
+    checkpoints = []
+    with FakeClamd() as fc:
+        ParallelScanner(fc.path, workers=1, batch_size=8,
+                        on_checkpoint=lambda *c: checkpoints.append(c)).run(str(root))
+        after, files, infected = checkpoints[2]
+        # Interrupted after the scan had gone past the checkpoint.
+        save_state({str(root): RootState(after=after, status="cancelled", files=40, infected=2,
+                                         after_files=files, after_infected=infected)}, state)
+        ScanScheduler([str(root)], fc.path, state_path=state, batch_size=8).scan(str(root))
+    st = load_state(state)[str(root)]
+    assert st.status == "done" and (st.files, st.infected) == (50, 2)
@@ -0,0 +1,144 @@
+"""UnitWatcher against a private bus with a stand-in for systemd's manager."""
+import os, shutil, subprocess, time
+
+import pytest
+
+pytest.importorskip("gi")
+DBUS_DAEMON = shutil.which("dbus-daemon")
+if DBUS_DAEMON is None:
+    pytest.skip("dbus-daemon is not installed", allow_module_level=True)
+
+from gi.repository import Gio, GLib
+from clamui.systemd import (MANAGER_IFACE, PROPERTIES_IFACE, SERVICE_IFACE, SYSTEMD_BUS_NAME,
+                            SYSTEMD_PATH, UNIT_IFACE, UNSET, UnitWatcher)
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={dir}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+INTROSPECTION = f"""<node>
+  <interface name="{MANAGER_IFACE}">
+    <method name="Subscribe"/>
+    <method name="LoadUnit"><arg type="s" direction="in"/><arg type="o" direction="out"/></method>
+  </interface>
+  <interface name="{UNIT_IFACE}">
+    <property name="ActiveState" type="s" access="read"/>
+    <property name="SubState" type="s" access="read"/>
+  </interface>
+  <interface name="{SERVICE_IFACE}">
+    <property name="NRestarts" type="u" access="read"/>
+    <property name="MemoryCurrent" type="t" access="read"/>
+    <property name="CPUUsageNSec" type="t" access="read"/>
+  </interface>
+</node>"""
+UNIT_PATH = "/org/freedesktop/systemd1/unit/clamav_2ddaemon_2eservice"
+
+class FakeSystemd:
+    """Answers LoadUnit for one unit and serves its Unit and Service properties."""
+
+    def __init__(self, conn: Gio.DBusConnection):
+        self.conn = conn
+        self.subscribed = False
+        self.props = {"ActiveState": GLib.Variant("s", "active"), "SubState": GLib.Variant("s", "running"),
+                      "NRestarts": GLib.Variant("u", 2), "MemoryCurrent": GLib.Variant("t", 64 << 20),
+                      "CPUUsageNSec": GLib.Variant("t", UNSET)}
+        node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+        conn.register_object(SYSTEMD_PATH, node.lookup_interface(MANAGER_IFACE), self._call, None, None)
+        for iface in (UNIT_IFACE, SERVICE_IFACE):
+            conn.register_object(UNIT_PATH, node.lookup_interface(iface), None, self._get, None)
+        conn.call_sync("org.freedesktop.DBus", "/org/freedesktop/DBus", "org.freedesktop.DBus",
+                       "RequestName", GLib.Variant("(su)", (SYSTEMD_BUS_NAME, 4)), None,
+                       Gio.DBusCallFlags.NONE, -1, None)
+
+    def _call(self, _conn, _sender, _path, _iface, method, params, invocation):
+        if method == "Subscribe":
+            self.subscribed = True
+            invocation.return_value(None)
+        elif params.unpack()[0] == "clamav-daemon.service":
+            invocation.return_value(GLib.Variant("(o)", (UNIT_PATH,)))
+        else:
+            invocation.return_dbus_error("org.freedesktop.systemd1.NoSuchUnit", "no such unit")
+
+    def _get(self, _conn, _sender, _path, _iface, name):
+        return self.props[name]
+
+    def set_state(self, active: str, sub: str):
+        self.props.update(ActiveState=GLib.Variant("s", active), SubState=GLib.Variant("s", sub))
+        self.conn.emit_signal(None, UNIT_PATH, PROPERTIES_IFACE, "PropertiesChanged", GLib.Variant(
+            "(sa{sv}as)", (UNIT_IFACE, {"ActiveState": self.props["ActiveState"],
+                                        "SubState": self.props["SubState"]}, [])))
+
+@pytest.fixture(scope="module")
+def bus(tmp_path_factory):
+    """One private bus per module: Gio caches the session bus connection per process."""
+    tmp = tmp_path_factory.mktemp("bus")
+    conf = tmp / "bus.conf"
+    conf.write_text(BUS_CONFIG.format(dir=tmp))
+    proc = subprocess.Popen([DBUS_DAEMON, "--nofork", "--print-address", f"--config-file={conf}"],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        address = proc.stdout.readline().strip()
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setenv("DBUS_SESSION_BUS_ADDRESS", address)
+            yield address
+    finally:
+        proc.terminate(); proc.wait(5)
+
+@pytest.fixture
+def service_conn(bus):
+    conn = Gio.DBusConnection.new_for_address_sync(
+        bus, Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION,
+        None, None)
+    yield conn
+    conn.close_sync(None)
+
+def spin(cond, timeout: float = 5.0) -> bool:
+    ctx = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        if not ctx.iteration(False):
+            time.sleep(0.005)
+    return cond()
+
+def test_initial_fetch_and_property_changes(service_conn):
+    systemd = FakeSystemd(service_conn)
+    seen, errors, unit_errors = [], [], []
+    watcher = UnitWatcher(["clamav-daemon.service", "missing.service"], seen.append, errors.append,
+                          bus_type=Gio.BusType.SESSION,
+                          on_unit_error=lambda unit, msg: unit_errors.append(unit))
+    try:
+        assert spin(lambda: seen and unit_errors)
+        first = watcher.get("clamav-daemon.service")
+        assert systemd.subscribed
+        assert (first.active_state, first.sub_state, first.n_restarts) == ("active", "running", 2)
+        assert first.memory == 64 << 20 and first.cpu_ns is None
+        # A missing unit is not a bus failure.
+        assert unit_errors == ["missing.service"] and errors == []
+
+        systemd.set_state("failed", "failed")
+        assert spin(lambda: watcher.get("clamav-daemon.service").active_state == "failed")
+        assert watcher.get("clamav-daemon.service").sub_state == "failed"
+        assert not watcher.get("clamav-daemon.service").active and len(seen) == 2
+    finally:
+        watcher.close()
+
+def test_missing_systemd_is_reported_once(bus):
+    errors = []
+    watcher = UnitWatcher(["clamav-daemon.service", "clamav-freshclam.service"], lambda _s: None,
+                          errors.append, bus_type=Gio.BusType.SESSION)
+    try:
+        assert spin(lambda: errors)
+        spin(lambda: False, timeout=0.2)
+        assert len(errors) == 1 and errors[0].startswith("systemd unavailable")
+    finally:
+        watcher.close()
@@ -0,0 +1,46 @@
+import json, threading
+
+from clamui import tracing
+from clamui.tracing import FLUSH_EVENTS, Recorder, span, traced
+
+def test_percentiles_over_the_window():
+    rec = Recorder(window=100)
+    for ms in range(1, 201):
+        rec.add("parse", 0, ms * 1_000_000, {})
+    (st,) = rec.stats()
+    assert (st.name, st.count) == ("parse", 200)
+    assert (st.p50, st.p95, st.p99, st.max) == (151.0, 196.0, 200.0, 200.0)
+
+def test_trace_file_is_valid_json(tmp_path):
+    path = tmp_path / "trace" / "out.json"
+    rec = Recorder(str(path))
+    for i in range(FLUSH_EVENTS + 10):
+        rec.add("scan.batch", i * 1000, 500, {"files": i, "root": tmp_path})
+    t = threading.Thread(target=rec.add, args=("collect", 0, 2000, {}), name="worker")
+    t.start(); t.join()
+    rec.close()
+    events = json.loads(path.read_text())
+    spans = [e for e in events if e["ph"] == "X"]
+    names = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert len(spans) == FLUSH_EVENTS + 11 and len(names) == 2
+    assert "worker" in names.values()
+    assert spans[0] == {"name": "scan.batch", "ph": "X", "ts": 0, "dur": 0, "pid": spans[0]["pid"],
+                        "tid": spans[0]["tid"], "args": {"files": 0, "root": str(tmp_path)}}
+
+def test_empty_trace_is_valid_json(tmp_path):
+    path = tmp_path / "out.json"
+    Recorder(str(path)).close()
+    assert json.loads(path.read_text()) == []
+
+def test_spans_record_only_when_enabled(monkeypatch):
+    @traced()
+    def work():
+        with span("inner") as sp:
+            sp.set(rows=3)
+    monkeypatch.setattr(tracing, "_recorder", None)
+    work()
+    assert tracing.span_stats() == []
+    monkeypatch.setattr(tracing, "_recorder", Recorder())
+    work(); work()
+    assert [(s.name, s.count) for s in tracing.span_stats()] == [
+        ("inner", 2), ("test_spans_record_only_when_enabled.<locals>.work", 2)]
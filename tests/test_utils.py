@@ -0,0 +1,21 @@
+import resource, subprocess, sys
+
+from clamui.utils import kill_group, spawn_group
+
+PRINT_LIMIT = "import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0])"
+
+def test_memory_limit_is_set_before_exec():
+    limit = 1 << 30
+    proc = spawn_group([sys.executable, "-c", PRINT_LIMIT], limit, stdout=subprocess.PIPE, text=True)
+    out, _ = proc.communicate(timeout=30)
+    assert int(out) == limit
+
+def test_no_limit_by_default():
+    proc = spawn_group([sys.executable, "-c", PRINT_LIMIT], stdout=subprocess.PIPE, text=True)
+    out, _ = proc.communicate(timeout=30)
+    assert int(out) == resource.getrlimit(resource.RLIMIT_AS)[0]
+
+def test_kill_group_stops_wrapped_command():
+    proc = spawn_group([sys.executable, "-c", "import time; time.sleep(60)"], 1 << 30)
+    kill_group(proc, grace=1.0)
+    assert proc.wait(timeout=5) != 0
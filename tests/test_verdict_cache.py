@@ -0,0 +1,15 @@
+import sqlite3
+
+import pytest
+
+from clamui.verdict_cache import VerdictCache
+
+def test_failed_write_rolls_back(tmp_path):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"))
+    cache.set_db_version("27790")
+    with pytest.raises(sqlite3.Error):
+        cache.mark_clean([(1, 2, 3, 4, 5), (1, 3, 3, 4)])   # second key is short
+    assert not cache._db.in_transaction
+    assert cache.unchanged([(1, 2, 3, 4, 5)]) == [False]
+    cache.mark_clean([(1, 2, 3, 4, 5)])
+    assert cache.unchanged([(1, 2, 3, 4, 5)]) == [True]
@@ -0,0 +1,22 @@
+import configparser
+
+import pytest
+
+from clamui.walker import filter_from_conf, parse_size
+
+@pytest.mark.parametrize("value, size", [
+    ("", 0), ("0", 0), ("4096", 4096), ("512M", 512 << 20), ("512MB", 512 << 20),
+    ("2GiB", 2 << 30), ("1.5k", 1536), ("3 tb", 3 << 40), ("100B", 100)])
+def test_parse_size(value, size):
+    assert parse_size(value) == size
+
+@pytest.mark.parametrize("value", ["lots", "5X", "M", "-1G", "2GiBB"])
+def test_parse_size_rejects(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+def test_filter_error_names_the_option():
+    conf = configparser.ConfigParser()
+    conf.read_string("[scan]\nmax-size=half a gig\n")
+    with pytest.raises(ValueError, match=r"^\[scan\] max-size: invalid size 'half a gig'"):
+        filter_from_conf(conf)
@@ -0,0 +1,61 @@
+import os, time
+
+from fake_clamd import FakeClamd
+from generators import EICAR
+from clamui.watcher import TreeWatcher
+
+def wait_for(cond, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_directory_moved_in_is_scanned(tmp_path):
+    watched, outside = tmp_path / "watched", tmp_path / "outside"
+    watched.mkdir(); (outside / "deep").mkdir(parents=True)
+    (outside / "deep" / "eicar.com").write_bytes(EICAR)
+    (outside / "clean.txt").write_bytes(b"hello")
+    found = []
+    with FakeClamd() as fc:
+        watcher = TreeWatcher([str(watched)], fc.path, settle=0.05, on_result=found.append)
+        watcher.start()
+        try:
+            assert wait_for(lambda: watcher.stats().watched_dirs == 1)
+            os.rename(outside, watched / "moved")
+            assert wait_for(lambda: watcher.stats().scanned == 2)
+        finally:
+            watcher.stop()
+    assert [r.path for r in found] == [str(watched / "moved" / "deep" / "eicar.com")]
+
+def test_failing_callback_keeps_worker_alive(tmp_path):
+    def on_result(_r):
+        raise RuntimeError("boom")
+    with FakeClamd() as fc:
+        watcher = TreeWatcher([str(tmp_path)], fc.path, workers=1, settle=0.05, on_result=on_result)
+        watcher.start()
+        try:
+            assert wait_for(lambda: watcher.stats().watched_dirs == 1)
+            for i in range(3):
+                (tmp_path / f"eicar{i}.com").write_bytes(EICAR)
+            assert wait_for(lambda: watcher.stats().scanned == 3)
+            assert watcher.stats().infected == 3 and not watcher._inflight
+        finally:
+            watcher.stop()
+
+def test_dispatch_stops_at_first_unsettled_file(tmp_path):
+    watcher = TreeWatcher([str(tmp_path)], "unused", settle=1.0, queue_size=2)
+    try:
+        watcher._touch("/a", 0.0)
+        watcher._touch("/b", 0.5)
+        watcher._touch("/a", 0.9)       # rewritten: now the most recent
+        watcher._touch("/c", 1.2)
+        watcher._dispatch(1.6)
+        assert list(watcher._queue.queue) == [("/b", 0.5)]
+        assert list(watcher._pending) == ["/a", "/c"]
+        watcher._dispatch(2.5)
+        assert list(watcher._queue.queue) == [("/b", 0.5), ("/a", 0.0)]
+        assert list(watcher._pending) == ["/c"]     # settled, but the queue is full
+    finally:
+        watcher.stop()
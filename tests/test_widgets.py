@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("gi")
+try:
+    from clamui.widgets import compute_splices
+except (ImportError, ValueError) as e:      # no GTK 4 typelibs
+    pytest.skip(str(e), allow_module_level=True)
+
+def apply(old, ops):
+    out = list(old)
+    for pos, n_removed, added in ops:
+        out[pos:pos + n_removed] = added
+    return out
+
+@pytest.mark.parametrize("old, new", [
+    ([], []), ([], ["a"]), (["a"], []), (["a", "b"], ["a", "b"]),
+    (["a", "b"], ["a", "b", "c"]),
+    (["a", "b", "c"], ["b", "c", "d"]),
+    (["a", "b", "a", "c"], ["a", "c", "d"]),       # repeated head line
+    (["a", "b", "c"], ["x", "y"]),
+])
+def test_splices_rebuild_new(old, new):
+    assert apply(old, compute_splices(old, new)) == new
+
+def test_common_shapes_touch_only_the_ends():
+    old = [str(i) for i in range(100)]
+    assert compute_splices(old, old + ["100"]) == [(100, 0, ["100"])]
+    assert compute_splices(old, old[10:] + ["100"]) == [(0, 10, ()), (90, 0, ["100"])]
+    assert compute_splices(old, old) == []